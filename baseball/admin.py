@@ -1,5 +1,5 @@
 from django.contrib import admin
-from .models import Player
+from .models import Player, PlayerDescription
 
 # Register your models here.
 
@@ -9,3 +9,9 @@ class PlayerAdmin(admin.ModelAdmin):
     list_display = ("name", "position", "games", "at_bat", "hits", "home_runs", "rbi")
     search_fields = ("name", "position")
     list_filter = ("position",)
+
+
+@admin.register(PlayerDescription)
+class PlayerDescriptionAdmin(admin.ModelAdmin):
+    list_display = ("player", "prompt_hash", "created_at")
+    search_fields = ("player__name",)
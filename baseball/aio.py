@@ -0,0 +1,80 @@
+"""Async helpers for the description endpoint.
+
+Both the HTTP client and the in-flight call table are kept per event loop.
+The app is served over ASGI (uvicorn, see the Dockerfile), where there is a
+single long-lived loop, so one client pools connections for every request
+and concurrent requests coalesce. Under WSGI Django runs each async view
+in its own loop, which gets its own client that ``close_client`` shuts when
+the view is done.
+"""
+
+import asyncio
+import weakref
+
+import httpx
+
+try:
+    import h2  # noqa: F401
+
+    HTTP2_AVAILABLE = True
+except ImportError:
+    HTTP2_AVAILABLE = False
+
+MAX_CONNECTIONS = 100
+MAX_KEEPALIVE_CONNECTIONS = 20
+KEEPALIVE_EXPIRY = 30
+TIMEOUT = httpx.Timeout(15, connect=5)
+
+_clients = weakref.WeakKeyDictionary()
+
+
+def get_client() -> httpx.AsyncClient:
+    """Return the pooled keep-alive client for the running event loop."""
+    loop = asyncio.get_running_loop()
+    client = _clients.get(loop)
+    if client is None or client.is_closed:
+        client = httpx.AsyncClient(
+            http2=HTTP2_AVAILABLE,
+            timeout=TIMEOUT,
+            limits=httpx.Limits(
+                max_connections=MAX_CONNECTIONS,
+                max_keepalive_connections=MAX_KEEPALIVE_CONNECTIONS,
+                keepalive_expiry=KEEPALIVE_EXPIRY,
+            ),
+        )
+        _clients[loop] = client
+    return client
+
+
+async def close_client() -> None:
+    """Close the running loop's client, if it has one."""
+    client = _clients.pop(asyncio.get_running_loop(), None)
+    if client is not None:
+        await client.aclose()
+
+
+class SingleFlight:
+    """Coalesce concurrent calls with the same key into one in-flight task.
+
+    Every caller awaiting a key gets the shared result (or exception); the
+    task is forgotten as soon as it finishes, so nothing is cached here.
+    """
+
+    def __init__(self):
+        self._calls = weakref.WeakKeyDictionary()
+
+    async def do(self, key, fn):
+        loop = asyncio.get_running_loop()
+        calls = self._calls.setdefault(loop, {})
+        task = calls.get(key)
+        if task is None:
+            task = loop.create_task(fn())
+            calls[key] = task
+
+            def forget(t):
+                if calls.get(key) is t:
+                    del calls[key]
+
+            task.add_done_callback(forget)
+        # A cancelled caller must not cancel the call others are waiting on
+        return await asyncio.shield(task)
@@ -0,0 +1,115 @@
+"""Circuit breaker for calls to slow or flaky upstreams.
+
+State lives in the Django cache so every worker sharing the cache backend
+sees the same circuit. Calls are counted in a fixed window; once at least
+``min_calls`` have been made and the share of failed or slow ones reaches
+``failure_rate``, the circuit opens for ``open_seconds``. After that a
+single probe is let through (half-open): success closes the circuit,
+failure opens it again. Calls that started before the circuit opened and
+finish while it is open don't count either way.
+
+The API is async (the LLM view is) and only makes cache ``aget``/``aadd``/
+``aincr``/``aset`` calls, cheap enough for the request path.
+"""
+
+import time
+import uuid
+
+from django.core.cache import cache
+
+
+class CircuitBreaker:
+    def __init__(
+        self,
+        name,
+        failure_rate=0.5,
+        min_calls=5,
+        window=60,
+        slow_call=5.0,
+        open_seconds=30,
+    ):
+        self.name = name
+        self.failure_rate = failure_rate
+        self.min_calls = min_calls
+        self.window = window
+        self.slow_call = slow_call
+        self.open_seconds = open_seconds
+        prefix = f"breaker:{name}"
+        self._open_key = f"{prefix}:open_until"
+        self._probe_key = f"{prefix}:probe"
+        self._calls_key = f"{prefix}:calls"
+        self._failures_key = f"{prefix}:failures"
+
+    async def astate(self) -> str:
+        open_until = await cache.aget(self._open_key)
+        if open_until is None:
+            return "closed"
+        return "open" if time.time() < open_until else "half-open"
+
+    async def aallow(self):
+        """Return a ticket for a call upstream, or False to skip it.
+
+        Pass the ticket to ``arecord_success``/``arecord_failure``; only
+        the probe's ticket can close (or re-open) the circuit.
+        """
+        open_until = await cache.aget(self._open_key)
+        if open_until is None:
+            return True
+        if time.time() < open_until:
+            return False
+        # Half-open: only the first caller to claim the probe slot goes through
+        ticket = uuid.uuid4().hex
+        if await cache.aadd(self._probe_key, ticket, timeout=self.open_seconds):
+            return ticket
+        return False
+
+    async def arecord_success(self, duration: float, ticket=True) -> None:
+        """Record a completed call; calls slower than ``slow_call`` count as failures."""
+        if duration > self.slow_call:
+            await self.arecord_failure(ticket)
+            return
+        if await cache.aget(self._open_key) is not None:
+            if await self._is_probe(ticket):
+                await cache.adelete_many([self._open_key, self._probe_key])
+                await self._areset_window()
+            return
+        await self._acount(failed=False)
+
+    async def arecord_failure(self, ticket=True) -> None:
+        if await cache.aget(self._open_key) is not None:
+            if await self._is_probe(ticket):
+                await self._atrip()
+            return
+        calls, failures = await self._acount(failed=True)
+        if calls >= self.min_calls and failures / calls >= self.failure_rate:
+            await self._atrip()
+
+    async def _is_probe(self, ticket) -> bool:
+        return isinstance(ticket, str) and await cache.aget(self._probe_key) == ticket
+
+    async def _atrip(self) -> None:
+        await cache.aset(
+            self._open_key,
+            time.time() + self.open_seconds,
+            timeout=self.open_seconds + self.window,
+        )
+        await cache.adelete(self._probe_key)
+        await self._areset_window()
+
+    async def _areset_window(self) -> None:
+        await cache.adelete_many([self._calls_key, self._failures_key])
+
+    async def _acount(self, failed: bool):
+        if await cache.aadd(self._calls_key, 0, timeout=self.window):
+            await cache.aset(self._failures_key, 0, timeout=self.window)
+        try:
+            calls = await cache.aincr(self._calls_key)
+            failures = (
+                await cache.aincr(self._failures_key)
+                if failed
+                else await cache.aget(self._failures_key, 0)
+            )
+        except ValueError:
+            # Window expired between add and incr; start a fresh one
+            return 0, 0
+        return calls, failures
@@ -0,0 +1,242 @@
+"""Per-view query budgets.
+
+A view declares the most queries one request may run with a
+``query_budget`` attribute (or the ``query_budget`` decorator).
+``QueryBudgetMiddleware`` counts each request's queries and, depending on
+``QUERY_BUDGET_MODE``:
+
+- ``raise``: reports ``QueryBudgetExceeded``, listing every query with the
+  stack that ran it, as an exception of the request, so the test client
+  raises it in the test hitting the view (the default under the test
+  runner). The response itself goes out unchanged: the request's writes
+  may already be committed;
+- ``log``: logs a warning (the default otherwise). Only the count is kept,
+  so it costs an integer increment per query; with ``DEBUG`` on the
+  queries are kept too and the warning lists the repeated ones;
+- ``off``: does nothing.
+
+Transaction control (``BEGIN``, ``COMMIT``, savepoints) doesn't count, nor
+do callbacks registered with ``on_commit()``, which run after the view's
+own work. Work that grows with what the request changed, such as rank
+updates per edited stat, adds to the budget with ``allow()``, and bulk
+writes split in batches with ``allow_batches()``. ``track()``
+and ``repeated()`` also work on their own, e.g. in a shell or a test, to
+find the queries a request runs more than once.
+"""
+
+import logging
+import re
+import traceback
+from collections import Counter
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+from django.conf import settings
+from django.core.signals import got_request_exception
+from django.db import connections, router, transaction
+
+logger = logging.getLogger("baseball")
+
+# Every log being tracked, innermost last (tracking can nest)
+_current = ContextVar("query_logs", default=())
+# Savepoint statements start with these too
+_TRANSACTION_CONTROL = ("BEGIN", "COMMIT", "ROLLBACK", "SAVEPOINT", "RELEASE SAVEPOINT")
+# "IN (%s, %s, %s)" of any length is the same query shape
+_PLACEHOLDER_RUN = re.compile(r"%s(?:, %s)+")
+# Left out of query stacks
+_INSTRUMENTATION = ("budgets.py", "metrics.py", "middleware.py")
+
+
+class QueryBudgetExceeded(AssertionError):
+    pass
+
+
+class QueryLog:
+    """Number of queries run while tracking.
+
+    With ``detail`` the queries themselves (``(sql, params)``) are kept as
+    well, and with ``keep_stacks`` the stacks that ran them.
+    """
+
+    __slots__ = ("count", "queries", "stacks", "detail", "keep_stacks", "allowance")
+
+    def __init__(self, keep_stacks=False, detail=True):
+        self.count = 0
+        self.queries = []
+        self.stacks = []
+        self.detail = detail or keep_stacks
+        self.keep_stacks = keep_stacks
+        # Queries allowed on top of the view's budget, see allow()
+        self.allowance = 0
+
+    def __len__(self):
+        return self.count
+
+
+def is_transaction_control(sql: str) -> bool:
+    return sql.startswith(_TRANSACTION_CONTROL)
+
+
+def db_wrapper(execute, sql, params, many, context):
+    """Execute wrapper adding queries to every ``QueryLog`` being tracked."""
+    logs = _current.get()
+    if logs and not is_transaction_control(sql):
+        stack = None
+        for log in logs:
+            log.count += 1
+            if not log.detail:
+                continue
+            log.queries.append((sql, params))
+            if log.keep_stacks:
+                stack = stack or _caller_stack()
+                log.stacks.append(stack)
+    return execute(sql, params, many, context)
+
+
+def install(connection):
+    if db_wrapper not in connection.execute_wrappers:
+        connection.execute_wrappers.append(db_wrapper)
+
+
+@contextmanager
+def track(keep_stacks=False, detail=True):
+    """Record the queries run inside the block (across ``sync_to_async``).
+
+    ``detail=False`` only counts them.
+    """
+    log = QueryLog(keep_stacks, detail)
+    token = _current.set((*_current.get(), log))
+    try:
+        yield log
+    finally:
+        _current.reset(token)
+
+
+@contextmanager
+def untracked():
+    """Leave the queries run inside the block out of every log being tracked."""
+    token = _current.set(())
+    try:
+        yield
+    finally:
+        _current.reset(token)
+
+
+def on_commit(func, using=None) -> None:
+    """``transaction.on_commit`` for ``func``, its queries left out of budgets."""
+
+    def run():
+        with untracked():
+            func()
+
+    transaction.on_commit(run, using=using)
+
+
+def allow(queries: int) -> None:
+    """Let the request being tracked run ``queries`` more than its budget."""
+    for log in _current.get():
+        log.allowance += queries
+
+
+def allow_batches(model, objs, fields, batch_size=None) -> None:
+    """``allow()`` the statements a bulk write of ``objs`` takes beyond one.
+
+    Django splits bulk writes in batches of at most ``batch_size`` objects,
+    fewer on backends capping a statement's parameters (SQLite).
+    """
+    if not objs:
+        return
+    ops = connections[router.db_for_write(model)].ops
+    size = max(ops.bulk_batch_size(fields, objs), 1)
+    if batch_size:
+        size = min(size, batch_size)
+    allow(-(-len(objs) // size) - 1)
+
+
+def query_budget(limit: int):
+    """Decorator setting ``query_budget`` on a view function or class."""
+
+    def decorate(view):
+        view.query_budget = limit
+        return view
+
+    return decorate
+
+
+def budget_for(request):
+    """The ``query_budget`` of the view that handled ``request``, if any."""
+    match = getattr(request, "resolver_match", None)
+    if match is None:
+        return None
+    view = getattr(match.func, "view_class", match.func)
+    return getattr(view, "query_budget", None)
+
+
+def repeated(queries) -> list:
+    """``(count, sql)`` for query shapes run more than once, most first.
+
+    Queries are grouped by their SQL with placeholders, so the same lookup
+    with different ids (a typical N+1) counts as one shape.
+    """
+    shapes = Counter(_PLACEHOLDER_RUN.sub("%s, ...", sql) for sql, _ in queries)
+    return [(n, sql) for sql, n in shapes.most_common() if n > 1]
+
+
+def report(log) -> str:
+    """Human-readable list of the queries in ``log``, repeated shapes first."""
+    lines = [f"  {n}x {sql}" for n, sql in repeated(log.queries)]
+    if lines:
+        lines.insert(0, "Repeated queries:")
+        lines.append("")
+    lines.append("Queries:")
+    for i, (sql, params) in enumerate(log.queries):
+        lines.append(f"  {i + 1}. {sql} {params!r}")
+        if i < len(log.stacks):
+            lines.extend("     " + line for line in log.stacks[i])
+    return "\n".join(lines)
+
+
+def check(request, log, mode) -> None:
+    """Report ``log`` holding more queries than the view's budget, per ``mode``."""
+    budget = budget_for(request)
+    if budget is None or len(log) <= budget + log.allowance:
+        return
+    budget += log.allowance
+    message = (
+        f"{request.method} {request.path} ran {len(log)} queries, "
+        f"budget is {budget}"
+    )
+    if mode == "raise":
+        try:
+            raise QueryBudgetExceeded(f"{message}\n{report(log)}")
+        except QueryBudgetExceeded:
+            # The test client re-raises this; Django's handler isn't involved
+            got_request_exception.send(sender=None, request=request)
+        return
+    if not log.detail:
+        message += "; set DEBUG or QUERY_BUDGET_MODE=raise to list the queries"
+        logger.warning(message, extra={"event": "query.budget"})
+        return
+    logger.warning(
+        "%s; repeated: %s",
+        message,
+        repeated(log.queries),
+        extra={"event": "query.budget"},
+    )
+
+
+def _caller_stack():
+    """The project's frames of the current stack, innermost last."""
+    root = str(settings.BASE_DIR)
+    frames = [
+        frame
+        for frame in traceback.extract_stack()
+        if frame.filename.startswith(root)
+        and "site-packages" not in frame.filename
+        and not frame.filename.endswith(_INSTRUMENTATION)
+    ]
+    return [
+        line.rstrip("\n")
+        for frame in traceback.format_list(frames[-6:])
+        for line in frame.splitlines()
+    ]
@@ -0,0 +1,107 @@
+"""Vectorized derivation and consistency checks of the rate stats.
+
+Counting stats are loaded into float64 NumPy arrays (missing values become
+NaN) and the rate stats are computed for all rows at once:
+
+- ``batting_average`` = H / AB
+- ``slugging_percentage`` = (1B + 2*2B + 3*3B + 4*HR) / AB
+- ``on_base_plus_slugging`` = OBP + SLG
+
+OBP itself needs hit-by-pitch and sacrifice flies, which the feed doesn't
+have, so it is only used as an input. Stored values are rounded to three
+places, so a row is inconsistent when a stored rate differs from the
+computed one by more than that rounding allows.
+"""
+
+from decimal import Decimal
+
+import numpy as np
+
+from .models import Player
+
+COUNT_FIELDS = ["at_bat", "hits", "doubles", "triples", "home_runs"]
+RATE_FIELDS = ["batting_average", "slugging_percentage", "on_base_plus_slugging"]
+INPUT_FIELDS = [*COUNT_FIELDS, "on_base_percentage", *RATE_FIELDS]
+
+# Largest difference explained by rounding: half a unit in the third place,
+# plus another unit for OPS, which adds two rounded values
+TOLERANCE = {
+    "batting_average": 0.0005,
+    "slugging_percentage": 0.0005,
+    "on_base_plus_slugging": 0.0015,
+}
+_EPSILON = 1e-9
+_THOUSANDTH = Decimal("0.001")
+
+
+def to_arrays(rows, fields=INPUT_FIELDS) -> dict:
+    """Turn ``values_list`` tuples (in ``fields`` order) into one array per field."""
+    if not rows:
+        return {f: np.empty(0) for f in fields}
+    columns = zip(*rows)
+    return {f: np.array(col, dtype=np.float64) for f, col in zip(fields, columns)}
+
+
+def load_table(queryset=None):
+    """Return ``(ids, arrays)`` for every player in ``queryset`` (default: all)."""
+    queryset = Player.objects.all() if queryset is None else queryset
+    rows = list(queryset.order_by("id").values_list("id", *INPUT_FIELDS))
+    arrays = to_arrays(rows, ["id", *INPUT_FIELDS])
+    return arrays.pop("id").astype(np.int64), arrays
+
+
+def compute(arrays) -> dict:
+    """Compute the rate stats; NaN where an input is missing or AB is zero."""
+    ab = arrays["at_bat"]
+    hits = arrays["hits"]
+    doubles, triples, home_runs = (
+        arrays["doubles"],
+        arrays["triples"],
+        arrays["home_runs"],
+    )
+    singles = hits - doubles - triples - home_runs
+    total_bases = singles + 2 * doubles + 3 * triples + 4 * home_runs
+    with np.errstate(divide="ignore", invalid="ignore"):
+        avg = np.where(ab > 0, hits / ab, np.nan)
+        slg = np.where(ab > 0, total_bases / ab, np.nan)
+    # OPS is checked against the stored SLG when there is one, as the feed
+    # computes it from its own (rounded) OBP and SLG
+    stored_slg = arrays["slugging_percentage"]
+    ops = arrays["on_base_percentage"] + np.where(np.isnan(stored_slg), slg, stored_slg)
+    return {
+        "batting_average": avg,
+        "slugging_percentage": slg,
+        "on_base_plus_slugging": ops,
+    }
+
+
+def check(arrays, computed=None) -> dict:
+    """Return a boolean mask per rate field of rows whose stored value is off.
+
+    Rows where either the stored or the computed value is missing are not
+    flagged.
+    """
+    computed = compute(arrays) if computed is None else computed
+    return {
+        f: np.abs(arrays[f] - computed[f]) > TOLERANCE[f] + _EPSILON
+        for f in RATE_FIELDS
+    }
+
+
+def backfill(rows) -> list:
+    """Fill missing rate stats of ``Player`` field dicts in place.
+
+    Returns ``(row, field, stored, computed)`` for every rate that was
+    present but inconsistent; those are left as they are.
+    """
+    arrays = to_arrays([[row.get(f) for f in INPUT_FIELDS] for row in rows])
+    computed = compute(arrays)
+    masks = check(arrays, computed)
+    problems = []
+    for f in RATE_FIELDS:
+        missing = np.isnan(arrays[f]) & ~np.isnan(computed[f])
+        for i in np.flatnonzero(missing):
+            rows[i][f] = Decimal(float(computed[f][i])).quantize(_THOUSANDTH)
+        for i in np.flatnonzero(masks[f]):
+            problems.append((rows[i], f, rows[i][f], computed[f][i]))
+    return problems
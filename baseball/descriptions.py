@@ -0,0 +1,51 @@
+"""Persistent cache for generated player descriptions.
+
+Entries are keyed by player id and a hash of the prompt built from the
+player's stats, so a stats change naturally misses the cache.
+"""
+
+import hashlib
+
+from asgiref.sync import sync_to_async
+from django.db import transaction
+
+from .models import PlayerDescription
+
+
+def prompt_hash(prompt: str) -> str:
+    return hashlib.sha256(prompt.encode("utf-8")).hexdigest()
+
+
+async def aget_cached(player_id: int, prompt: str):
+    return await (
+        PlayerDescription.objects.filter(
+            player_id=player_id, prompt_hash=prompt_hash(prompt)
+        )
+        .values_list("text", flat=True)
+        .afirst()
+    )
+
+
+def store(player, prompt: str, text: str) -> None:
+    """Save a description of ``player`` as read, replacing older versions' ones.
+
+    Only descriptions created before the row's ``updated_at`` go: a slow
+    caller holding an old read must not delete one written since for the
+    newer stats.
+    """
+    key = prompt_hash(prompt)
+    with transaction.atomic():
+        PlayerDescription.objects.filter(
+            player_id=player.pk, created_at__lt=player.updated_at
+        ).exclude(prompt_hash=key).delete()
+        PlayerDescription.objects.update_or_create(
+            player_id=player.pk, prompt_hash=key, defaults={"text": text}
+        )
+
+
+async def astore(player, prompt: str, text: str) -> None:
+    await sync_to_async(store)(player, prompt, text)
+
+
+def invalidate(*player_ids: int) -> None:
+    PlayerDescription.objects.filter(player_id__in=player_ids).delete()
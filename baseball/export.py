@@ -0,0 +1,87 @@
+"""Streaming export of the player table.
+
+Rows are read with ``values_list().iterator()`` (a server-side cursor on
+Postgres) and encoded one at a time through ``FastPlayerSerializer`` and
+plain ``json``, so memory stays flat regardless of table size. The output
+matches what ``PlayerSerializer`` renders to JSON.
+
+Under ASGI the chunks go through ``aiter_chunks``: Django reads a sync
+iterator handed to an async server whole before sending it.
+"""
+
+import json
+
+from asgiref.sync import sync_to_async
+
+from .models import Player
+from .serializers import FastPlayerSerializer, PlayerSerializer
+
+EXPORT_FIELDS = list(PlayerSerializer.Meta.fields)
+
+CONTENT_TYPES = {
+    "ndjson": "application/x-ndjson",
+    "json": "application/json",
+}
+
+_dumps = json.JSONEncoder(separators=(",", ":")).encode
+
+
+def row_encoder(fields):
+    """Return a function that turns a ``values_list`` tuple into a JSON object string."""
+    to_dict = FastPlayerSerializer(fields, json_safe=True).to_representation
+    return lambda row: _dumps(to_dict(row))
+
+
+def iter_rows(fields=None, chunk_size=2000):
+    qs = FastPlayerSerializer(fields).values(Player.objects.order_by("id"))
+    return qs.iterator(chunk_size=chunk_size)
+
+
+def stream_ndjson(rows, fields, batch_size=500):
+    """Yield newline-delimited JSON, ``batch_size`` rows per chunk."""
+    encode = row_encoder(fields)
+    buf = []
+    for row in rows:
+        buf.append(encode(row))
+        if len(buf) >= batch_size:
+            yield "\n".join(buf) + "\n"
+            buf = []
+    if buf:
+        yield "\n".join(buf) + "\n"
+
+
+def stream_json_array(rows, fields, batch_size=500):
+    """Yield a single JSON array, ``batch_size`` rows per chunk."""
+    encode = row_encoder(fields)
+    yield "["
+    buf = []
+    first = True
+    for row in rows:
+        buf.append(encode(row))
+        if len(buf) >= batch_size:
+            yield ("" if first else ",") + ",".join(buf)
+            first = False
+            buf = []
+    if buf:
+        yield ("" if first else ",") + ",".join(buf)
+    yield "]"
+
+
+async def aiter_chunks(chunks):
+    """Async iterator over the sync ``chunks``, pulling one at a time.
+
+    Each chunk is made in the thread that runs sync code for async views,
+    so the database cursor stays on one connection throughout.
+    """
+    pull = sync_to_async(next)
+    try:
+        while (chunk := await pull(chunks, None)) is not None:
+            yield chunk
+    finally:
+        await sync_to_async(chunks.close)()
+
+
+STREAMERS = {
+    "ndjson": stream_ndjson,
+    "json": stream_json_array,
+}
@@ -0,0 +1,70 @@
+"""Local stand-ins for upstream services, for tests and benchmarks."""
+
+import json
+import os
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from unittest import mock
+
+from django.test import override_settings
+
+
+class FakeCompletionServer:
+    """Local stand-in for the chat completion API.
+
+    Counts requests, waits ``delay`` seconds before answering and replies
+    with ``status``; use as a context manager.
+    """
+
+    def __init__(self, text="Fake bio.", delay=0.0, status=200):
+        self.text = text
+        self.delay = delay
+        self.status = status
+        self.requests = 0
+        self._lock = threading.Lock()
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def do_POST(self):
+                self.rfile.read(int(self.headers.get("Content-Length", 0)))
+                with server._lock:
+                    server.requests += 1
+                time.sleep(server.delay)
+                body = json.dumps(
+                    {"choices": [{"message": {"content": server.text}}]}
+                ).encode()
+                try:
+                    self.send_response(server.status)
+                    self.send_header("Content-Type", "application/json")
+                    self.send_header("Content-Length", str(len(body)))
+                    self.end_headers()
+                    self.wfile.write(body)
+                except (BrokenPipeError, ConnectionResetError):
+                    pass  # client gave up (latency budget)
+
+            def log_message(self, *args):
+                pass
+
+        self.httpd = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+
+    @property
+    def url(self):
+        host, port = self.httpd.server_address
+        return f"http://{host}:{port}/v1/chat/completions"
+
+    def __enter__(self):
+        threading.Thread(target=self.httpd.serve_forever, daemon=True).start()
+        self._settings = override_settings(OPENAI_API_URL=self.url)
+        self._settings.enable()
+        self._env = mock.patch.dict(os.environ, {"OPENAI_API_KEY": "test-key"})
+        self._env.start()
+        return self
+
+    def __exit__(self, *exc):
+        self._env.stop()
+        self._settings.disable()
+        self.httpd.shutdown()
+        self.httpd.server_close()
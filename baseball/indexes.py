@@ -0,0 +1,46 @@
+"""Database-specific indexes declared in ``Meta.indexes``."""
+
+from django.contrib.postgres.indexes import GinIndex, OpClass
+from django.db import models
+from django.db.backends.ddl_references import Statement
+
+
+class PostgresGinIndex(GinIndex):
+    """A ``GinIndex`` that other databases skip.
+
+    Keeps the index in Django's model state, so migrations create, rename
+    and drop it, while SQLite (local runs) gets no DDL for it;
+    ``baseball.search`` covers SQLite with an FTS5 table instead.
+    """
+
+    def create_sql(self, model, schema_editor, using="", **kwargs):
+        if schema_editor.connection.vendor != "postgresql":
+            return Statement("")
+        return super().create_sql(model, schema_editor, using=using, **kwargs)
+
+    def remove_sql(self, model, schema_editor, **kwargs):
+        if schema_editor.connection.vendor != "postgresql":
+            return Statement("")
+        return super().remove_sql(model, schema_editor, **kwargs)
+
+
+class PrefixIndex(models.Index):
+    """A B-tree index that serves ``LIKE 'prefix%'`` on its expressions.
+
+    On Postgres the expressions get the ``text_pattern_ops`` operator
+    class, so ``LIKE`` can use the index whatever the database collation.
+    Other databases get a plain index on the same expressions, which
+    ``baseball.search`` queries with a range instead.
+    """
+
+    def create_sql(self, model, schema_editor, using="", **kwargs):
+        index = self
+        if schema_editor.connection.vendor == "postgresql":
+            index = self.clone()
+            index.expressions = tuple(
+                OpClass(expression, name="text_pattern_ops")
+                for expression in self.expressions
+            )
+        return super(PrefixIndex, index).create_sql(
+            model, schema_editor, using=using, **kwargs
+        )
@@ -0,0 +1,70 @@
+"""Server-side leaderboards: top-N players by any stat.
+
+Each stat has a ``(stat, id)`` index (see ``Player.Meta.indexes``). Rows
+with a null stat are excluded, so ``ORDER BY stat DESC, id DESC LIMIT n``
+is a backward scan of that index that stops after ``n`` rows, on both
+Postgres and SQLite.
+"""
+
+from decimal import Decimal, InvalidOperation
+
+from .models import LEADERBOARD_STAT_CODES, Player
+from .serializers import PlayerSerializer
+
+# Stat -> short code used in index names
+STAT_CODES = dict(LEADERBOARD_STAT_CODES)
+STATS = [f for f in PlayerSerializer.Meta.fields if f in STAT_CODES]
+
+DEFAULT_LIMIT = 10
+MAX_LIMIT = 100
+
+
+def index_name(stat: str) -> str:
+    return f"player_lb_{STAT_CODES[stat]}_idx"
+
+
+def _number(stat, raw):
+    try:
+        if stat in PlayerSerializer.DECIMAL_FIELDS:
+            return Decimal(raw)
+        return int(raw)
+    except (InvalidOperation, ValueError):
+        raise ValueError(f"{raw!r} is not a valid value for {stat}")
+
+
+def leaderboard_queryset(params):
+    """Build the leaderboard queryset from query params.
+
+    ``stat`` (default ``hits``), ``order`` (``desc``/``asc``), ``limit``,
+    ``position`` and ``min_<stat>``/``max_<stat>`` ranges for any stat.
+    Raises ``ValueError`` on bad input.
+    """
+    stat = params.get("stat", "hits")
+    if stat not in STAT_CODES:
+        raise ValueError(f"stat must be one of: {', '.join(STATS)}")
+    order = params.get("order", "desc")
+    if order not in ("asc", "desc"):
+        raise ValueError("order must be asc or desc")
+    try:
+        limit = int(params.get("limit", DEFAULT_LIMIT))
+    except ValueError:
+        raise ValueError("limit must be an integer")
+    if limit < 1:
+        raise ValueError("limit must be positive")
+    limit = min(limit, MAX_LIMIT)
+
+    filters = {f"{stat}__isnull": False}
+    if params.get("position"):
+        filters["position"] = params["position"]
+    for key, raw in params.items():
+        bound, _, field = key.partition("_")
+        if bound in ("min", "max") and field:
+            if field not in STAT_CODES:
+                raise ValueError(f"Unknown stat in {key}")
+            lookup = "gte" if bound == "min" else "lte"
+            filters[f"{field}__{lookup}"] = _number(field, raw)
+
+    prefix = "-" if order == "desc" else ""
+    return (
+        Player.objects.filter(**filters).order_by(f"{prefix}{stat}", f"{prefix}id")
+    )[:limit]
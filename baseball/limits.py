@@ -0,0 +1,99 @@
+"""Bounds for the numeric player fields.
+
+``HARD_LIMITS`` are what a value can be at all: counting stats fit the
+integer column, and a rate can't exceed its definition (AVG and OBP are
+shares, SLG is at most four bases per at-bat). The update serializers
+enforce them, at no query cost.
+
+``observed()`` is the smallest and largest value of each field in the
+table, shown by the edit form as a hint; validation doesn't use it. It
+takes one aggregate query and is cached in the ``players`` cache; writes
+stretch the cached bounds to the values they wrote (``widen``) rather
+than invalidating them, and ``load_players`` drops them (``reset``) so
+the next read recomputes. Between loads they may stay wider than the
+data, e.g. after a record holder is edited down.
+"""
+
+from decimal import Decimal
+
+from django.core.cache import caches
+from django.db import models
+from django.db.models import Max, Min
+
+from .models import Player
+
+# Largest value of a PositiveIntegerField on every supported database
+MAX_INT = 2147483647
+RATE_MAX = {
+    "batting_average": Decimal("1.000"),
+    "on_base_percentage": Decimal("1.000"),
+    "slugging_percentage": Decimal("4.000"),
+    "on_base_plus_slugging": Decimal("5.000"),
+}
+CACHE_KEY = "limits:observed"
+
+FIELDS = [
+    f.name
+    for f in Player._meta.concrete_fields
+    if isinstance(f, (models.IntegerField, models.DecimalField)) and not f.primary_key
+]
+
+
+def _hard_limits(field) -> tuple:
+    if isinstance(field, models.DecimalField):
+        step = Decimal(10) ** -field.decimal_places
+        column_max = Decimal(10) ** (field.max_digits - field.decimal_places) - step
+        return (Decimal(0).quantize(step), RATE_MAX.get(field.name, column_max))
+    return (0, MAX_INT)
+
+
+HARD_LIMITS = {name: _hard_limits(Player._meta.get_field(name)) for name in FIELDS}
+
+
+def compute() -> dict:
+    """Return ``{field: (min, max)}``; both are None for an all-null column."""
+    aggregates = {}
+    for field in FIELDS:
+        aggregates[f"{field}__min"] = Min(field)
+        aggregates[f"{field}__max"] = Max(field)
+    values = Player.objects.aggregate(**aggregates)
+    return {f: (values[f"{f}__min"], values[f"{f}__max"]) for f in FIELDS}
+
+
+def observed() -> dict:
+    """``compute()``, cached until the next ``reset`` or the cache's timeout.
+
+    The timeout bounds how long a worker with a process-local cache keeps
+    bounds another process reset.
+    """
+    cache = caches["players"]
+    bounds = cache.get(CACHE_KEY)
+    if bounds is None:
+        bounds = compute()
+        cache.set(CACHE_KEY, bounds)
+    return bounds
+
+
+def widen(*written: dict) -> None:
+    """Stretch the cached observed bounds to include the ``{field: value}`` written."""
+    cache = caches["players"]
+    bounds = cache.get(CACHE_KEY)
+    if bounds is None:
+        return
+    widened = dict(bounds)
+    for values in written:
+        for field, value in values.items():
+            if field not in widened or value is None:
+                continue
+            value = Player._meta.get_field(field).to_python(value)
+            low, high = widened[field]
+            widened[field] = (
+                value if low is None else min(low, value),
+                value if high is None else max(high, value),
+            )
+    if widened != bounds:
+        cache.set(CACHE_KEY, widened)
+
+
+def reset() -> None:
+    caches["players"].delete(CACHE_KEY)
@@ -0,0 +1,72 @@
+"""Logging helpers for the description pipeline.
+
+- ``SampledEventFilter`` keeps a configurable share of records per ``event``
+  (passed as ``extra={"event": ...}``); warnings and errors always pass.
+- ``Truncated`` defers ``str()`` of large values (payloads, response bodies)
+  to formatting time and cuts them to ``DESCRIPTION_LOG_MAX_BODY`` chars.
+  The value may be a zero-argument callable, only called if the record is
+  actually emitted.
+- ``QueuedStreamHandler`` hands records to a background thread that does
+  the actual write, so request threads never block on log I/O.
+"""
+
+import atexit
+import logging
+import queue
+import random
+from logging.handlers import QueueHandler, QueueListener
+
+from django.conf import settings
+
+
+class SampledEventFilter(logging.Filter):
+    def __init__(self, rates=None, name=""):
+        super().__init__(name)
+        self.rates = rates or {}
+
+    def filter(self, record):
+        event = getattr(record, "event", None)
+        if event is None:
+            record.event = "-"
+            return True
+        if record.levelno >= logging.WARNING:
+            return True
+        rate = self.rates.get(event, 1.0)
+        return rate >= 1.0 or (rate > 0 and random.random() < rate)
+
+
+class Truncated:
+    def __init__(self, value, limit=None):
+        self.value = value
+        self.limit = limit
+
+    def __str__(self):
+        value = self.value() if callable(self.value) else self.value
+        text = str(value)
+        limit = self.limit
+        if limit is None:
+            limit = getattr(settings, "DESCRIPTION_LOG_MAX_BODY", 500)
+        if limit and len(text) > limit:
+            return f"{text[:limit]}... [{len(text) - limit} more chars]"
+        return text
+
+
+class QueuedStreamHandler(QueueHandler):
+    """Format on the caller's thread, write to stderr from a listener thread.
+
+    The queue is bounded; when it is full records are dropped (and counted
+    in ``dropped``) rather than blocking the request.
+    """
+
+    def __init__(self, maxsize=10000):
+        super().__init__(queue.Queue(maxsize))
+        self.dropped = 0
+        self.listener = QueueListener(self.queue, logging.StreamHandler())
+        self.listener.start()
+        atexit.register(self.listener.stop)
+
+    def enqueue(self, record):
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            self.dropped += 1
@@ -0,0 +1,71 @@
+import time
+
+import numpy as np
+from django.core.management.base import BaseCommand
+from baseball import derived
+from baseball.synthetic import make_players
+
+DEFAULT_SIZES = [1000, 100000, 1000000]
+# Distinct synthetic players; larger sizes repeat them
+SAMPLE = 10000
+
+
+def _arrays(size):
+    sample = [
+        [getattr(p, f) for f in derived.INPUT_FIELDS]
+        for p in make_players(min(size, SAMPLE))
+    ]
+    return {f: np.resize(col, size) for f, col in derived.to_arrays(sample).items()}
+
+
+def _python_check(arrays):
+    """Row-at-a-time equivalent of ``derived.check``, for comparison."""
+    columns = {f: arrays[f].tolist() for f in derived.INPUT_FIELDS}
+    flagged = 0
+    for i in range(len(columns["hits"])):
+        ab, hits = columns["at_bat"][i], columns["hits"][i]
+        if ab > 0:
+            avg = hits / ab
+            if abs(columns["batting_average"][i] - avg) > 0.0005:
+                flagged += 1
+    return flagged
+
+
+def _best(fn, repeat):
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+class Command(BaseCommand):
+    help = (
+        "Time the vectorized rate computation and consistency check on "
+        "synthetic columns"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--sizes", type=int, nargs="+", default=DEFAULT_SIZES)
+        parser.add_argument("--repeat", type=int, default=5)
+        parser.add_argument(
+            "--python",
+            action="store_true",
+            help="Also time a plain Python loop checking AVG only",
+        )
+
+    def handle(self, *args, **options):
+        repeat = options["repeat"]
+        for size in options["sizes"]:
+            arrays = _arrays(size)
+            elapsed = _best(lambda: derived.check(arrays), repeat)
+            self.stdout.write(
+                f"{size:>10,} rows: compute + check {elapsed * 1000:8.1f} ms "
+                f"({size / elapsed:,.0f} rows/sec, best of {repeat})"
+            )
+            if options["python"]:
+                elapsed = _best(lambda: _python_check(arrays), 1)
+                self.stdout.write(
+                    f"{'':>16}python loop (AVG only) {elapsed * 1000:8.1f} ms"
+                )
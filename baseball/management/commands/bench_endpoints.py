@@ -0,0 +1,300 @@
+import io
+import json
+import os
+import platform
+import resource
+import tempfile
+import time
+import tracemalloc
+from collections import Counter
+from decimal import Decimal
+
+import django
+from django.conf import settings
+from django.core.cache import caches
+from django.core.management import call_command
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+from django.db.models import Max
+from django.test import Client, override_settings
+from django.test.utils import CaptureQueriesContext
+from baseball import limits, rankings
+from baseball.budgets import is_transaction_control
+from baseball.fakes import FakeCompletionServer
+from baseball.models import Player, PlayerDescription, PlayerRank
+from baseball.serializers import PlayerUpdateSerializer
+from baseball.synthetic import make_players, write_feed
+from baseball.versioning import bump_version
+
+# Loading dominates the run time: on SQLite about 40 s for 10,000 players,
+# and well over an hour for 1,000,000
+DEFAULT_SIZES = [1000, 10000, 100000]
+DEFAULT_REQUESTS = 200
+# Requests per scenario traced with tracemalloc (slow, so kept separate)
+MEMORY_REQUESTS = 10
+PAGE_SIZE = 50
+
+
+def _summary(latencies, queries):
+    """Latency percentiles (ms), throughput and query counts of one pass.
+
+    Throughput is sequential: requests per second of time spent in them.
+    """
+    ordered = sorted(latencies)
+
+    def pct(p):
+        return round(ordered[min(len(ordered) - 1, int(p / 100 * len(ordered)))], 3)
+
+    return {
+        "requests": len(ordered),
+        "p50_ms": pct(50),
+        "p90_ms": pct(90),
+        "p99_ms": pct(99),
+        "max_ms": round(ordered[-1], 3),
+        "mean_ms": round(sum(ordered) / len(ordered), 3),
+        "throughput_rps": round(1000 * len(ordered) / sum(ordered), 1),
+        "queries_mean": round(sum(queries) / len(queries), 2),
+        "queries_max": max(queries),
+    }
+
+
+def _query_count(ctx):
+    """Queries run, leaving out transaction control."""
+    return sum(not is_transaction_control(q["sql"]) for q in ctx.captured_queries)
+
+
+def _peak_kib(fn):
+    tracemalloc.start()
+    try:
+        fn()
+        return tracemalloc.get_traced_memory()[1] // 1024
+    finally:
+        tracemalloc.stop()
+
+
+class Command(BaseCommand):
+    help = (
+        "Benchmark the list, description and update endpoints and load_players "
+        "on synthetic players (deleted again after each size), with a local "
+        "fake completion server. Prints JSON."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--sizes",
+            type=int,
+            nargs="+",
+            default=DEFAULT_SIZES,
+            help="Synthetic players per run (default %(default)s)",
+        )
+        parser.add_argument(
+            "--requests",
+            type=int,
+            default=DEFAULT_REQUESTS,
+            help=f"Requests per endpoint scenario (default {DEFAULT_REQUESTS})",
+        )
+        parser.add_argument(
+            "--llm-delay",
+            type=float,
+            default=0.05,
+            help="Seconds the fake completion server waits before answering",
+        )
+        parser.add_argument("--seed", type=int, default=0)
+        parser.add_argument(
+            "--allow-existing",
+            action="store_true",
+            help=(
+                "Run on a database that already has players. Players anyone "
+                "else adds during the run are deleted with the synthetic ones"
+            ),
+        )
+        parser.add_argument("--output", help="Write the JSON here instead of stdout")
+
+    def handle(self, *args, **options):
+        if Player.objects.exists() and not options["allow_existing"]:
+            raise CommandError(
+                "The database has players. The run commits to it and afterwards "
+                "deletes every player added since it started, including any not "
+                "added by the benchmark. Use an empty database, or pass "
+                "--allow-existing."
+            )
+        self.client = Client()
+        self.requests = options["requests"]
+        report = {"meta": self.meta(options), "results": []}
+        # The test client sends Host: testserver
+        hosts = override_settings(ALLOWED_HOSTS=[*settings.ALLOWED_HOSTS, "testserver"])
+        try:
+            with hosts, FakeCompletionServer(delay=options["llm_delay"]) as llm:
+                for size in options["sizes"]:
+                    self.stderr.write(f"{size:,} players ...")
+                    # Requests commit as they do in production; the synthetic
+                    # players (all ids above the current ones) go afterwards
+                    last_id = Player.objects.aggregate(last=Max("id"))["last"] or 0
+                    try:
+                        report["results"].extend(self.run_size(size, options["seed"]))
+                    finally:
+                        self.remove_players_after(last_id)
+                report["meta"]["llm_requests"] = llm.requests
+        finally:
+            caches["players"].clear()
+        report["meta"]["max_rss_kib"] = resource.getrusage(
+            resource.RUSAGE_SELF
+        ).ru_maxrss
+
+        body = json.dumps(report, indent=2)
+        if options["output"]:
+            with open(options["output"], "w") as f:
+                f.write(body + "\n")
+        else:
+            self.stdout.write(body)
+
+    @staticmethod
+    def meta(options):
+        return {
+            "database": connection.vendor,
+            "database_version": (
+                connection.Database.sqlite_version
+                if connection.vendor == "sqlite"
+                else getattr(connection, "pg_version", None)
+            ),
+            "python": platform.python_version(),
+            "django": django.get_version(),
+            "platform": platform.platform(),
+            "requests_per_scenario": options["requests"],
+            "llm_delay_s": options["llm_delay"],
+            "seed": options["seed"],
+        }
+
+    def run_size(self, size, seed):
+        last_id = Player.objects.aggregate(last=Max("id"))["last"] or 0
+        with tempfile.TemporaryDirectory() as tmp:
+            feed = os.path.join(tmp, "players.ndjson")
+            write_feed(feed, make_players(size, seed=seed))
+            results = [
+                self.loader("load_players_initial", feed, size),
+                self.loader("load_players_unchanged", feed, size),
+            ]
+        ids = list(
+            Player.objects.filter(id__gt=last_id)
+            .order_by("id")
+            .values_list("id", flat=True)
+        )
+
+        results.append(self.scenario("list_uncached", self.list_requests(True)))
+        results.append(self.scenario("list_cached", self.list_requests(False)))
+        results.append(self.scenario("description", self.description_requests(ids)))
+        results.append(self.scenario("update", self.update_requests(ids)))
+        for result in results:
+            result["size"] = size
+        return results
+
+    @staticmethod
+    def remove_players_after(last_id):
+        """Delete players above ``last_id`` and rank the remaining ones again."""
+        synthetic = Player.objects.filter(id__gt=last_id)
+        with transaction.atomic():
+            PlayerRank.objects.filter(player__in=synthetic).delete()
+            PlayerDescription.objects.filter(player__in=synthetic).delete()
+            # In one statement: deleting through the ORM would send
+            # pre_delete, and update ranks, once per player
+            with connection.cursor() as cursor:
+                cursor.execute(
+                    f"DELETE FROM {Player._meta.db_table} WHERE id > %s", [last_id]
+                )
+            bump_version()
+            rankings.refresh()
+            transaction.on_commit(limits.reset)
+
+    def loader(self, name, feed, size):
+        out = io.StringIO()
+        with CaptureQueriesContext(connection) as ctx:
+            start = time.perf_counter()
+            call_command("load_players", feed, stdout=out, stderr=io.StringIO())
+            elapsed = time.perf_counter() - start
+        # The summary line, e.g. "Done. Created: 1000, Updated: 0, ..."
+        self.stderr.write(f"  {name}: {out.getvalue().splitlines()[-1]}")
+        return {
+            "scenario": name,
+            "rows": size,
+            "seconds": round(elapsed, 3),
+            "rows_per_sec": round(size / elapsed, 1) if elapsed else None,
+            "queries": _query_count(ctx),
+            "peak_memory_kib": _peak_kib(
+                lambda: call_command(
+                    "load_players", feed, stdout=io.StringIO(), stderr=io.StringIO()
+                )
+            ),
+        }
+
+    def scenario(self, name, requests):
+        """Time ``self.requests`` calls of ``requests``, then trace a few more.
+
+        ``requests`` yields zero-argument callables returning a response.
+        """
+        latencies, queries, statuses, sources = [], [], Counter(), Counter()
+        for _, send in zip(range(self.requests), requests):
+            with CaptureQueriesContext(connection) as ctx:
+                start = time.perf_counter()
+                response = send()
+                latencies.append((time.perf_counter() - start) * 1000)
+            queries.append(_query_count(ctx))
+            statuses[response.status_code] += 1
+            if name == "description" and response.status_code == 200:
+                sources[json.loads(response.content)["source"]] += 1
+
+        def traced():
+            for _, send in zip(range(MEMORY_REQUESTS), requests):
+                send()
+
+        result = {"scenario": name, **_summary(latencies, queries)}
+        result["status_codes"] = {str(k): v for k, v in sorted(statuses.items())}
+        if sources:
+            result["sources"] = dict(sources)
+        result["peak_memory_kib"] = _peak_kib(traced)
+        self.stderr.write(
+            f"  {name}: p50 {result['p50_ms']} ms, p99 {result['p99_ms']} ms"
+        )
+        return result
+
+    def list_requests(self, uncached):
+        """Walk /players/by-hits/ through its ``next`` links, forever."""
+        first = f"/api/baseball/players/by-hits/?limit={PAGE_SIZE}"
+        url = first
+
+        def send():
+            nonlocal url
+            if uncached:
+                caches["players"].clear()
+            response = self.client.get(url)
+            url = json.loads(response.content).get("next") or first
+            return response
+
+        while True:
+            yield send
+
+    def description_requests(self, ids):
+        """Players in turn, so each request misses the description cache."""
+        while True:
+            for pk in ids:
+                yield lambda pk=pk: self.client.get(
+                    f"/api/baseball/players/{pk}/description/"
+                )
+
+    def update_requests(self, ids):
+        """PUT each player with ``games`` one higher.
+
+        The payload is read before the request is timed.
+        """
+        fields = PlayerUpdateSerializer.Meta.fields
+        while True:
+            for pk in ids:
+                data = {
+                    f: float(v) if isinstance(v, Decimal) else v
+                    for f, v in Player.objects.values(*fields).get(pk=pk).items()
+                }
+                data["games"] += 1
+                yield lambda pk=pk, body=json.dumps(data): self.client.put(
+                    f"/api/baseball/players/{pk}/update/",
+                    data=body,
+                    content_type="application/json",
+                )
@@ -0,0 +1,75 @@
+import gzip
+import time
+
+from django.core.management.base import BaseCommand
+from rest_framework.renderers import JSONRenderer
+from baseball import renderers
+from baseball.middleware import brotli
+from baseball.serializers import PlayerSerializer
+from baseball.synthetic import make_players
+
+DEFAULT_SIZES = [1000, 10000, 100000]
+
+
+def _payload(count, as_float):
+    fields = PlayerSerializer.Meta.fields
+    rows = []
+    for i, player in enumerate(make_players(count), start=1):
+        player.id = i
+        row = {f: getattr(player, f) for f in fields}
+        if as_float:
+            for f in PlayerSerializer.DECIMAL_FIELDS:
+                if row[f] is not None:
+                    row[f] = float(row[f])
+        rows.append(row)
+    return {"players": rows, "next": None}
+
+
+def _best(fn, repeat):
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = fn()
+        best = min(best, time.perf_counter() - start)
+    return best, result
+
+
+class Command(BaseCommand):
+    help = (
+        "Compare render time and response size of the stock JSONRenderer and "
+        "FastJSONRenderer on synthetic player lists"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--sizes", type=int, nargs="+", default=DEFAULT_SIZES)
+        parser.add_argument("--repeat", type=int, default=3)
+
+    def handle(self, *args, **options):
+        repeat = options["repeat"]
+        backend = "orjson" if renderers.orjson else "stdlib (orjson not installed)"
+        self.stdout.write(f"FastJSONRenderer backend: {backend}")
+        for size in options["sizes"]:
+            decimals = _payload(size, as_float=False)
+            floats = _payload(size, as_float=True)
+            cases = [
+                ("JSONRenderer, Decimal", JSONRenderer(), decimals),
+                ("FastJSONRenderer, Decimal", renderers.FastJSONRenderer(), decimals),
+                ("FastJSONRenderer, float", renderers.FastJSONRenderer(), floats),
+            ]
+            self.stdout.write(f"\n{size:,} players")
+            body = b""
+            for label, renderer, data in cases:
+                elapsed, body = _best(lambda: renderer.render(data), repeat)
+                self.stdout.write(
+                    f"  {label:<27} {elapsed * 1000:9.1f} ms  {len(body):>12,} bytes"
+                )
+            gz_time, gz = _best(lambda: gzip.compress(body, compresslevel=6), repeat)
+            self.stdout.write(
+                f"  {'gzip (level 6)':<27} {gz_time * 1000:9.1f} ms  {len(gz):>12,} bytes"
+            )
+            if brotli is not None:
+                br_time, br = _best(lambda: brotli.compress(body, quality=5), repeat)
+                self.stdout.write(
+                    f"  {'brotli (quality 5)':<27} {br_time * 1000:9.1f} ms  "
+                    f"{len(br):>12,} bytes"
+                )
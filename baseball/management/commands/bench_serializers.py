@@ -0,0 +1,53 @@
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from rest_framework.renderers import JSONRenderer
+from baseball.models import Player
+from baseball.serializers import FastPlayerSerializer, PlayerSerializer
+from baseball.synthetic import make_players
+
+
+def _slow(qs):
+    return PlayerSerializer(qs, many=True).data
+
+
+def _fast(qs):
+    serializer = FastPlayerSerializer()
+    return serializer.many(serializer.values(qs))
+
+
+class Command(BaseCommand):
+    help = (
+        "Compare PlayerSerializer with FastPlayerSerializer on synthetic players "
+        "(inserted in a transaction that is rolled back)"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--rows", type=int, default=10000)
+        parser.add_argument("--repeat", type=int, default=5)
+
+    def handle(self, *args, **options):
+        rows, repeat = options["rows"], options["repeat"]
+        with transaction.atomic():
+            Player.objects.bulk_create(make_players(rows), batch_size=1000)
+            qs = Player.objects.order_by("id")
+            results = {}
+            for label, serialize in (("PlayerSerializer", _slow), ("Fast", _fast)):
+                best = float("inf")
+                for _ in range(repeat):
+                    start = time.perf_counter()
+                    data = serialize(qs.all())
+                    best = min(best, time.perf_counter() - start)
+                results[label] = (best, JSONRenderer().render(data))
+            transaction.set_rollback(True)
+
+        slow_time, slow_body = results["PlayerSerializer"]
+        fast_time, fast_body = results["Fast"]
+        for label, (elapsed, _) in results.items():
+            self.stdout.write(
+                f"{label:>16}: {elapsed * 1000:8.1f} ms "
+                f"({rows / elapsed:,.0f} rows/sec, best of {repeat})"
+            )
+        self.stdout.write(f"Speedup: {slow_time / fast_time:.1f}x")
+        self.stdout.write(f"Identical output: {slow_body == fast_body}")
@@ -0,0 +1,53 @@
+import time
+
+import numpy as np
+from django.core.management.base import BaseCommand
+from baseball import derived
+from baseball.models import Player
+
+
+class Command(BaseCommand):
+    help = (
+        "Recompute AVG, SLG and OPS from the counting stats for every player "
+        "and list the players whose stored rates don't match"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--limit",
+            type=int,
+            default=50,
+            help="Maximum number of inconsistent players to list (default 50)",
+        )
+
+    def handle(self, *args, **options):
+        start = time.perf_counter()
+        ids, arrays = derived.load_table()
+        loaded = time.perf_counter()
+        computed = derived.compute(arrays)
+        masks = derived.check(arrays, computed)
+        checked = time.perf_counter()
+
+        flagged = np.zeros(len(ids), dtype=bool)
+        for mask in masks.values():
+            flagged |= mask
+        flagged_ids = ids[flagged][: options["limit"]].tolist()
+        names = dict(
+            Player.objects.filter(pk__in=flagged_ids).values_list("id", "name")
+        )
+        index = {pk: i for i, pk in enumerate(ids.tolist()) if pk in names}
+        for pk in flagged_ids:
+            i = index[pk]
+            details = ", ".join(
+                f"{f} {arrays[f][i]:.3f} != {computed[f][i]:.3f}"
+                for f, mask in masks.items()
+                if mask[i]
+            )
+            self.stdout.write(f"{names[pk]} (id {pk}): {details}")
+
+        per_field = ", ".join(f"{f}: {int(m.sum())}" for f, m in masks.items())
+        self.stdout.write(
+            f"Done. {int(flagged.sum())} of {len(ids)} players inconsistent "
+            f"({per_field}); loaded in {loaded - start:.2f}s, "
+            f"checked in {(checked - loaded) * 1000:.1f} ms"
+        )
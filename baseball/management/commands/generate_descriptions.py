@@ -0,0 +1,82 @@
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from django.core.management.base import BaseCommand
+from baseball import descriptions
+from baseball.management.commands.load_players import batched
+from baseball.models import Player, PlayerDescription
+from baseball.views import _build_prompt, _call_openai
+
+DEFAULT_CONCURRENCY = 4
+BATCH_SIZE = 100
+
+
+def _generate(item):
+    player_id, prompt = item
+    try:
+        return player_id, prompt, _call_openai(prompt), None
+    except Exception as e:
+        return player_id, prompt, None, e
+
+
+class Command(BaseCommand):
+    help = "Pre-generate LLM descriptions for players without a current cached one"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--concurrency",
+            type=int,
+            default=DEFAULT_CONCURRENCY,
+            help=f"Maximum concurrent LLM requests (default {DEFAULT_CONCURRENCY})",
+        )
+        parser.add_argument(
+            "--force",
+            action="store_true",
+            help="Regenerate descriptions even if a current one is cached",
+        )
+
+    def handle(self, *args, **options):
+        concurrency = options["concurrency"]
+        force = options["force"]
+        if concurrency < 1:
+            self.stderr.write("--concurrency must be positive.")
+            return
+        if not os.environ.get("OPENAI_API_KEY"):
+            self.stderr.write("OpenAI API key not configured.")
+            return
+
+        start = time.perf_counter()
+        generated, skipped, failed = 0, 0, 0
+        players = Player.objects.order_by("id").iterator(chunk_size=BATCH_SIZE)
+        # Threads only make the HTTP calls; all DB access stays on this thread
+        with ThreadPoolExecutor(max_workers=concurrency) as pool:
+            for batch in batched(players, BATCH_SIZE):
+                by_id = {p.pk: p for p in batch}
+                prompts = {pk: _build_prompt(p) for pk, p in by_id.items()}
+                have = set()
+                if not force:
+                    have = set(
+                        PlayerDescription.objects.filter(
+                            player_id__in=prompts
+                        ).values_list("player_id", "prompt_hash")
+                    )
+                todo = [
+                    (pk, prompt)
+                    for pk, prompt in prompts.items()
+                    if (pk, descriptions.prompt_hash(prompt)) not in have
+                ]
+                skipped += len(prompts) - len(todo)
+                for player_id, prompt, text, error in pool.map(_generate, todo):
+                    if error is not None:
+                        failed += 1
+                        self.stderr.write(f"Failed for player {player_id}: {error}")
+                        continue
+                    descriptions.store(by_id[player_id], prompt, text)
+                    generated += 1
+
+        elapsed = time.perf_counter() - start
+        self.stdout.write(
+            f"Done. Generated: {generated}, Already cached: {skipped}, "
+            f"Failed: {failed} ({elapsed:.2f}s)"
+        )
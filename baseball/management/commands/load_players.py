@@ -1,6 +1,18 @@
+import codecs
+import json
+import os
+import time
+from contextlib import contextmanager, nullcontext
+from decimal import Decimal, InvalidOperation
+from itertools import islice
+
 import requests
 from django.core.management.base import BaseCommand
-from baseball.models import Player
+from django.db import models, transaction
+from baseball import derived, limits, rankings
+from baseball.limits import MAX_INT
+from baseball.models import Player, stats_fingerprint
+from baseball.versioning import bump_version
 
 API_URL = "https://api.hirefraction.com/api/test/baseball"
 
@@ -25,43 +37,348 @@ FIELD_MAP = {
     "On-base Plus Slugging": "on_base_plus_slugging",
 }
 
+# Columns written on update; name is the lookup key and never changes
+UPDATE_FIELDS = [f for f in FIELD_MAP.values() if f != "name"] + [
+    "stats_hash",
+    "updated_at",
+]
 
-class Command(BaseCommand):
-    help = "Load players from API endpoint into Player model"
+DEFAULT_BATCH_SIZE = 1000
+DEFAULT_TIMEOUT = 30
+READ_CHUNK_SIZE = 64 * 1024
 
-    def handle(self, *args, **options):
-        self.stdout.write(f"Fetching player data from {API_URL} ...")
+PLAYER_FIELDS = {name: Player._meta.get_field(name) for name in FIELD_MAP.values()}
+
+
+def translate_entry(entry: dict) -> dict:
+    """Map one API entry onto Player field names."""
+    player_data = {
+        model_field: entry.get(api_field)
+        for api_field, model_field in FIELD_MAP.items()
+    }
+    # Clean name field for question marks
+    if isinstance(player_data.get("name"), str):
+        player_data["name"] = player_data["name"].replace("?", "").strip()
+    return player_data
+
+
+def clean_value(field, value):
+    """Coerce a feed value to what ``field`` stores; raise ``ValueError`` if it can't."""
+    if value is None or value == "":
+        return None
+    if isinstance(field, models.DecimalField):
+        if isinstance(value, bool):
+            raise ValueError("not a number")
+        try:
+            number = Decimal(str(value)).quantize(
+                Decimal(1).scaleb(-field.decimal_places)
+            )
+        except InvalidOperation:
+            raise ValueError("not a number")
+        if not number.is_finite() or len(number.as_tuple().digits) > field.max_digits:
+            raise ValueError("out of range")
+        return number
+    if isinstance(field, models.PositiveIntegerField):
+        if isinstance(value, bool):
+            raise ValueError("not a whole number")
         try:
-            response = requests.get(API_URL)
+            number = float(value)
+        except (TypeError, ValueError):
+            raise ValueError("not a whole number")
+        if not number.is_integer() or not 0 <= number <= MAX_INT:
+            raise ValueError("not a whole number in range")
+        return int(number)
+    if not isinstance(value, str):
+        raise ValueError("not a string")
+    if len(value) > field.max_length:
+        raise ValueError(f"longer than {field.max_length} characters")
+    return value
+
+
+def clean_entry(player_data):
+    """Clean every field of a translated entry in place.
+
+    Returns None, or a message naming the first field that can't be stored.
+    """
+    for name, value in player_data.items():
+        try:
+            player_data[name] = clean_value(PLAYER_FIELDS[name], value)
+        except ValueError as e:
+            return f"{name} {value!r}: {e}"
+    return None
+
+
+def translate_entries(entries, on_error):
+    """Lazily translate and clean raw entries, passing unusable ones to ``on_error``.
+
+    A bad value skips its entry only, never the batch it is in.
+    """
+    for entry in entries:
+        if not isinstance(entry, dict):
+            on_error(entry, "entry is not an object")
+            continue
+        player_data = translate_entry(entry)
+        if not isinstance(player_data["name"], str) or not player_data["name"]:
+            on_error(entry, "entry has no name")
+            continue
+        problem = clean_entry(player_data)
+        if problem:
+            on_error(entry, f"invalid {problem}")
+            continue
+        yield player_data
+
+
+@contextmanager
+def open_source(source, timeout=DEFAULT_TIMEOUT):
+    """Yield an iterator of byte chunks from a URL or local file path."""
+    if source.startswith(("http://", "https://")):
+        with requests.get(source, stream=True, timeout=timeout) as response:
             response.raise_for_status()
-            data = response.json()
-        except Exception as e:
-            self.stderr.write(f"Failed to fetch data: {e}")
+            yield response.iter_content(chunk_size=READ_CHUNK_SIZE)
+    else:
+        with open(source, "rb") as fh:
+            yield iter(lambda: fh.read(READ_CHUNK_SIZE), b"")
+
+
+def iter_records(chunks):
+    """Incrementally parse a JSON array or NDJSON byte stream.
+
+    Only the unparsed tail of the input is buffered, so memory is bounded by
+    the size of a single record rather than the whole feed.
+    """
+    decoder = json.JSONDecoder()
+    text = codecs.getincrementaldecoder("utf-8")()
+    buf = ""
+    in_array = None
+    done = False
+    for chunk in chunks:
+        buf += text.decode(chunk)
+        pos = 0
+        while True:
+            # Skip whitespace and, inside an array, separators
+            while pos < len(buf) and (
+                buf[pos].isspace() or (in_array and buf[pos] == ",")
+            ):
+                pos += 1
+            if pos >= len(buf):
+                break
+            if in_array is None:
+                in_array = buf[pos] == "["
+                if in_array:
+                    pos += 1
+                continue
+            if in_array and buf[pos] == "]":
+                done = True
+                pos = len(buf)
+                break
+            try:
+                record, pos = decoder.raw_decode(buf, pos)
+            except json.JSONDecodeError:
+                break  # incomplete record, wait for more input
+            yield record
+        buf = buf[pos:]
+        if done:
             return
+    buf += text.decode(b"", final=True)
+    if buf.strip() or in_array:
+        raise ValueError("Unexpected end of input or malformed JSON")
+
+
+def read_checkpoint(path, source):
+    """Return how many records of ``source`` a previous run already wrote."""
+    if not path or not os.path.exists(path):
+        return 0
+    with open(path) as fh:
+        state = json.load(fh)
+    if state.get("source") != source:
+        return 0
+    return int(state.get("records", 0))
+
+
+def write_checkpoint(path, source, records):
+    tmp = f"{path}.tmp"
+    with open(tmp, "w") as fh:
+        json.dump({"source": source, "records": records}, fh)
+    os.replace(tmp, path)
+
+
+def batched(iterable, size):
+    batch = []
+    for item in iterable:
+        batch.append(item)
+        if len(batch) >= size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
 
-        if not isinstance(data, list):
-            self.stderr.write("API response is not a list of players.")
+def write_batch(rows, dry_run=False):
+    """Upsert the new or changed rows of one batch, keyed on name.
+
+    Stored fingerprints for the batch's names are fetched with one query and
+    compared against each row's ``stats_fingerprint``; only rows that are new
+    or whose stats changed are written, with one
+    ``INSERT ... ON CONFLICT (name) DO UPDATE``. Unchanged rows are left
+    alone so their ``updated_at`` doesn't move.
+
+    Returns ``(created, updated, unchanged)``.
+    """
+    # Later duplicates in the feed win, as they did with update_or_create
+    by_name = {row["name"]: row for row in rows}
+    stored = dict(
+        Player.objects.filter(name__in=by_name).values_list("name", "stats_hash")
+    )
+    created, updated, to_write = 0, 0, []
+    for name, row in by_name.items():
+        row["stats_hash"] = stats_fingerprint(row)
+        if name not in stored:
+            created += 1
+        elif stored[name] != row["stats_hash"]:
+            updated += 1
+        else:
+            continue
+        to_write.append(Player(**row))
+    if to_write and not dry_run:
+        Player.objects.bulk_create(
+            to_write,
+            update_conflicts=True,
+            unique_fields=["name"],
+            update_fields=UPDATE_FIELDS,
+        )
+        # bulk_create doesn't send post_save, so bump the version here
+        bump_version()
+    return created, updated, len(by_name) - created - updated
+
+
+class Command(BaseCommand):
+    help = "Load players from a JSON or NDJSON feed (URL or file) into Player model"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "source",
+            nargs="?",
+            default=API_URL,
+            help="URL or local file path of a JSON array or NDJSON feed (default: the API)",
+        )
+        parser.add_argument(
+            "--batch-size",
+            type=int,
+            default=DEFAULT_BATCH_SIZE,
+            help=f"Rows written per bulk query (default {DEFAULT_BATCH_SIZE})",
+        )
+        parser.add_argument(
+            "--dry-run",
+            action="store_true",
+            help="Parse and diff against the database without writing",
+        )
+        parser.add_argument(
+            "--timeout",
+            type=float,
+            default=DEFAULT_TIMEOUT,
+            help=f"HTTP connect/read timeout in seconds (default {DEFAULT_TIMEOUT})",
+        )
+        parser.add_argument(
+            "--derive-rates",
+            action="store_true",
+            help=(
+                "Fill missing AVG/SLG/OPS from the counting stats and report "
+                "rows whose rates don't match them"
+            ),
+        )
+        parser.add_argument(
+            "--checkpoint",
+            help=(
+                "File recording how many records have been written. Each batch "
+                "commits on its own and a rerun resumes after the last one."
+            ),
+        )
+
+    def handle(self, *args, **options):
+        source = options["source"]
+        batch_size = options["batch_size"]
+        dry_run = options["dry_run"]
+        checkpoint = None if dry_run else options["checkpoint"]
+        if batch_size < 1:
+            self.stderr.write("--batch-size must be positive.")
             return
 
-        created, updated, errors = 0, 0, 0
-        for entry in data:
-            player_data = {}
-            for api_field, model_field in FIELD_MAP.items():
-                player_data[model_field] = entry.get(api_field)
-            # Clean name field for question marks
-            if player_data.get("name"):
-                player_data["name"] = player_data["name"].replace("?", "").strip()
-            try:
-                obj, created_flag = Player.objects.update_or_create(
-                    name=player_data["name"], defaults=player_data
+        try:
+            position = read_checkpoint(checkpoint, source)
+        except (OSError, ValueError) as e:
+            self.stderr.write(f"Unreadable checkpoint {checkpoint}: {e}")
+            return
+
+        resumed = position > 0
+        self.stdout.write(f"Fetching player data from {source} ...")
+        if position:
+            self.stdout.write(f"Resuming after {position} records")
+
+        start = time.perf_counter()
+        created, updated, unchanged, errors = 0, 0, 0, 0
+        inconsistent = 0
+        derive_rates = options["derive_rates"]
+
+        def on_error(entry, reason):
+            nonlocal errors
+            errors += 1
+            self.stderr.write(f"Skipping entry ({reason}): {entry}")
+
+        # Without a checkpoint the whole load is all-or-nothing; with one,
+        # each batch commits so a failed run can resume where it stopped.
+        run_atomic = nullcontext() if checkpoint else transaction.atomic()
+        batch_atomic = transaction.atomic if checkpoint else nullcontext
+        try:
+            with open_source(source, timeout=options["timeout"]) as chunks:
+                entries = islice(iter_records(chunks), position, None)
+                with run_atomic:
+                    for batch in batched(entries, batch_size):
+                        rows = list(translate_entries(batch, on_error))
+                        if derive_rates:
+                            inconsistent += self.derive_rates(rows)
+                        with batch_atomic():
+                            c, u, n = write_batch(rows, dry_run=dry_run)
+                        created += c
+                        updated += u
+                        unchanged += n
+                        position += len(batch)
+                        if checkpoint:
+                            write_checkpoint(checkpoint, source, position)
+                    # A resumed run may have written everything before failing
+                    if not dry_run and (created or updated or resumed):
+                        rankings.refresh()
+                        # Recomputed from the loaded data on the next read
+                        transaction.on_commit(limits.reset)
+        except Exception as e:
+            if checkpoint:
+                self.stderr.write(
+                    f"Failed after {position} records: {e}. "
+                    f"Rerun with --checkpoint {checkpoint} to resume."
                 )
-                if created_flag:
-                    created += 1
-                else:
-                    updated += 1
-            except Exception as e:
-                errors += 1
-                self.stderr.write(f"Error saving player {player_data.get('name')}: {e}")
+            else:
+                self.stderr.write(f"Failed to load players, nothing was written: {e}")
+            return
+
+        if checkpoint and os.path.exists(checkpoint):
+            os.remove(checkpoint)
+
+        elapsed = time.perf_counter() - start
+        total = created + updated + unchanged
+        rate = total / elapsed if elapsed else 0
+        prefix = "Dry run, nothing written. " if dry_run else "Done. "
+        checked = f", Inconsistent rates: {inconsistent}" if derive_rates else ""
         self.stdout.write(
-            f"Done. Created: {created}, Updated: {updated}, Errors: {errors}"
+            f"{prefix}Created: {created}, Updated: {updated}, "
+            f"Unchanged: {unchanged}, Errors: {errors}{checked} "
+            f"({total} rows in {elapsed:.2f}s, {rate:.0f} rows/sec)"
         )
+
+    def derive_rates(self, rows):
+        """Backfill missing rates in ``rows``; return how many rows look wrong."""
+        problems = derived.backfill(rows)
+        for row, field, stored, computed in problems:
+            self.stderr.write(
+                f"Inconsistent {field} for {row['name']}: "
+                f"stored {stored}, counting stats give {computed:.3f}"
+            )
+        return len({id(row) for row, *_ in problems})
@@ -0,0 +1,25 @@
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from baseball import rankings
+
+
+class Command(BaseCommand):
+    help = "Rebuild the precomputed player ranks and percentiles"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--stat",
+            action="append",
+            choices=rankings.STATS,
+            help="Only rebuild this stat (repeatable; default: all stats)",
+        )
+
+    def handle(self, *args, **options):
+        stats = options["stat"] or rankings.STATS
+        start = time.perf_counter()
+        with transaction.atomic():
+            rankings.refresh(stats)
+        elapsed = time.perf_counter() - start
+        self.stdout.write(f"Done. Rebuilt {len(stats)} stats in {elapsed:.2f}s")
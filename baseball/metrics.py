@@ -0,0 +1,216 @@
+"""Per-request timings and in-process request metrics.
+
+``TimingMiddleware`` records every request's latency in ``REQUEST_LATENCY``,
+a histogram per endpoint (URL route) and method. A share of requests
+(``REQUEST_TIMING_SAMPLE_RATE``) is also broken down: database time and
+query count through an ``execute_wrapper`` every database connection
+gets when it connects (see ``signals``), plus the phases code
+marks with ``span()`` (``serialize``, ``render``, ``llm``). Sampled
+requests get them as a ``Server-Timing`` header and add to per-phase
+totals. ``render()`` writes everything in the Prometheus text format.
+
+Metrics are per process; scrape every worker (or sum them) when running
+several.
+"""
+
+import threading
+from bisect import bisect_left
+from contextlib import nullcontext
+from contextvars import ContextVar
+from time import perf_counter
+
+# Seconds; the last bucket is +Inf
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+_current = ContextVar("request_timings", default=None)
+_NOOP = nullcontext()
+
+
+class Timings:
+    """Phase durations (seconds) and query count of one sampled request."""
+
+    __slots__ = ("durations", "queries")
+
+    def __init__(self):
+        self.durations = {}
+        self.queries = 0
+
+    def add(self, phase, seconds):
+        self.durations[phase] = self.durations.get(phase, 0.0) + seconds
+
+    def server_timing(self, total):
+        """``Server-Timing`` header value, durations in milliseconds."""
+        parts = []
+        for phase, seconds in self.durations.items():
+            part = f"{phase};dur={seconds * 1000:.1f}"
+            if phase == "db":
+                part += f';desc="{self.queries} queries"'
+            parts.append(part)
+        parts.append(f"total;dur={total * 1000:.1f}")
+        return ", ".join(parts)
+
+
+class _Span:
+    __slots__ = ("timings", "phase", "start")
+
+    def __init__(self, timings, phase):
+        self.timings = timings
+        self.phase = phase
+
+    def __enter__(self):
+        self.start = perf_counter()
+
+    def __exit__(self, *exc):
+        self.timings.add(self.phase, perf_counter() - self.start)
+
+
+def span(phase: str):
+    """Context manager adding its duration to ``phase`` of the current request.
+
+    A no-op outside sampled requests.
+    """
+    timings = _current.get()
+    return _NOOP if timings is None else _Span(timings, phase)
+
+
+def db_wrapper(execute, sql, params, many, context):
+    """Execute wrapper timing queries of sampled requests.
+
+    The timings travel in a context variable, which follows the request into
+    the threads ``sync_to_async`` runs queries on.
+    """
+    timings = _current.get()
+    if timings is None:
+        return execute(sql, params, many, context)
+    start = perf_counter()
+    try:
+        return execute(sql, params, many, context)
+    finally:
+        timings.add("db", perf_counter() - start)
+        timings.queries += 1
+
+
+def install(connection):
+    if db_wrapper not in connection.execute_wrappers:
+        connection.execute_wrappers.append(db_wrapper)
+
+
+def start_request():
+    """Start collecting ``Timings`` for this request; returns them and a reset token."""
+    timings = Timings()
+    return timings, _current.set(timings)
+
+
+def end_request(token):
+    _current.reset(token)
+
+
+class Histogram:
+    """Cumulative-bucket histogram keyed by a tuple of label values."""
+
+    def __init__(self, name, help, labels, buckets=LATENCY_BUCKETS):
+        self.name = name
+        self.help = help
+        self.labels = labels
+        self.buckets = buckets
+        self._series = {}
+        self._lock = threading.Lock()
+
+    def observe(self, label_values, value):
+        index = bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._series.get(label_values)
+            if series is None:
+                # Per-bucket counts (made cumulative on output), sum, count
+                series = self._series[label_values] = [
+                    [0] * (len(self.buckets) + 1),
+                    0.0,
+                    0,
+                ]
+            series[0][index] += 1
+            series[1] += value
+            series[2] += 1
+
+    def samples(self):
+        with self._lock:
+            series = {k: (list(v[0]), v[1], v[2]) for k, v in self._series.items()}
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} histogram"]
+        for label_values, (counts, total, count) in sorted(series.items()):
+            labels = _labels(self.labels, label_values)
+            cumulative = 0
+            for bound, n in zip((*self.buckets, "+Inf"), counts):
+                cumulative += n
+                le = _labels(("le",), (str(bound),))
+                lines.append(f"{self.name}_bucket{{{labels},{le}}} {cumulative}")
+            lines.append(f"{self.name}_sum{{{labels}}} {total}")
+            lines.append(f"{self.name}_count{{{labels}}} {count}")
+        return lines
+
+
+class Counter:
+    def __init__(self, name, help, labels):
+        self.name = name
+        self.help = help
+        self.labels = labels
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def inc(self, label_values, amount=1):
+        with self._lock:
+            self._values[label_values] = self._values.get(label_values, 0) + amount
+
+    def samples(self):
+        with self._lock:
+            values = dict(self._values)
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} counter"]
+        for label_values, value in sorted(values.items()):
+            lines.append(f"{self.name}{{{_labels(self.labels, label_values)}}} {value}")
+        return lines
+
+
+def _escape(value):
+    return value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _labels(names, values):
+    return ",".join(f'{n}="{_escape(v)}"' for n, v in zip(names, values))
+
+
+REQUEST_LATENCY = Histogram(
+    "baseball_request_duration_seconds",
+    "Request latency by endpoint.",
+    ("endpoint", "method"),
+)
+SAMPLED_REQUESTS = Counter(
+    "baseball_sampled_requests_total",
+    "Requests broken down into phases.",
+    ("endpoint", "method"),
+)
+PHASE_SECONDS = Counter(
+    "baseball_request_phase_seconds_total",
+    "Time spent per phase in sampled requests.",
+    ("endpoint", "method", "phase"),
+)
+QUERIES = Counter(
+    "baseball_request_queries_total",
+    "Database queries run by sampled requests.",
+    ("endpoint", "method"),
+)
+
+
+def record(endpoint, method, total, timings=None):
+    labels = (endpoint, method)
+    REQUEST_LATENCY.observe(labels, total)
+    if timings is not None:
+        SAMPLED_REQUESTS.inc(labels)
+        QUERIES.inc(labels, timings.queries)
+        for phase, seconds in timings.durations.items():
+            PHASE_SECONDS.inc((*labels, phase), seconds)
+
+
+def render() -> str:
+    """All metrics in the Prometheus text exposition format."""
+    lines = []
+    for metric in (REQUEST_LATENCY, SAMPLED_REQUESTS, PHASE_SECONDS, QUERIES):
+        lines.extend(metric.samples())
+    return "\n".join(lines) + "\n"
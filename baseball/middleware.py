@@ -1,6 +1,24 @@
+import random
+from contextlib import contextmanager
+from time import perf_counter
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.middleware.gzip import GZipMiddleware
+from django.utils.cache import patch_vary_headers
 from django.utils.deprecation import MiddlewareMixin
+from django.utils.regex_helper import _lazy_re_compile
 from django.http import HttpResponse
 
+from . import budgets, metrics, routers
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+re_accepts_br = _lazy_re_compile(r"\bbr\b")
+
 
 class SimpleCORSMiddleware(MiddlewareMixin):
     """Very small CORS middleware for development.
@@ -38,7 +56,208 @@ class SimpleCORSMiddleware(MiddlewareMixin):
         if origin and origin in allowed_origins:
             response["Access-Control-Allow-Origin"] = origin
             response["Vary"] = "Origin"
-            response["Access-Control-Allow-Methods"] = "GET, POST, OPTIONS"
-            response["Access-Control-Allow-Headers"] = "Content-Type, Authorization"
+            response["Access-Control-Allow-Methods"] = "GET, POST, PUT, PATCH, OPTIONS"
+            response["Access-Control-Allow-Headers"] = (
+                "Content-Type, Authorization, If-Match"
+            )
+            # Clients read it to send If-Match with their next update
+            response["Access-Control-Expose-Headers"] = "ETag"
             response["Access-Control-Allow-Credentials"] = "true"
         return response
+
+
+class CompressionMiddleware(GZipMiddleware):
+    """Compress responses with brotli or gzip, negotiated via Accept-Encoding.
+
+    Brotli is used when the ``brotli`` package is installed and the client
+    accepts it; otherwise (and for streaming responses) this is Django's
+    ``GZipMiddleware``.
+    """
+
+    brotli_quality = 5
+
+    def process_response(self, request, response):
+        if (
+            brotli is None
+            or response.streaming
+            or len(response.content) < 200
+            or response.has_header("Content-Encoding")
+            or not re_accepts_br.search(request.META.get("HTTP_ACCEPT_ENCODING", ""))
+        ):
+            return super().process_response(request, response)
+
+        patch_vary_headers(response, ("Accept-Encoding",))
+        compressed = brotli.compress(response.content, quality=self.brotli_quality)
+        if len(compressed) >= len(response.content):
+            return response
+        response.content = compressed
+        response.headers["Content-Length"] = str(len(compressed))
+        etag = response.get("ETag")
+        if etag and etag.startswith('"'):
+            response.headers["ETag"] = "W/" + etag
+        response.headers["Content-Encoding"] = "br"
+        return response
+
+
+class TimingMiddleware:
+    """Record request latency per endpoint and, for sampled requests, phases.
+
+    Every request's latency goes into ``metrics.REQUEST_LATENCY``. A share
+    ``REQUEST_TIMING_SAMPLE_RATE`` of requests also has its database time
+    and query count recorded along with the ``metrics.span`` phases, and gets them back in a
+    ``Server-Timing`` header. Put it first so ``total`` covers the other
+    middleware. Works sync and async, so async views stay concurrent.
+    """
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.async_mode = iscoroutinefunction(get_response)
+        if self.async_mode:
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if self.async_mode:
+            return self.__acall__(request)
+        start = perf_counter()
+        if not self.sampled():
+            response = self.get_response(request)
+            self.record(request, start)
+            return response
+        with self.timed() as timings:
+            response = self.get_response(request)
+        return self.finish(request, response, start, timings)
+
+    async def __acall__(self, request):
+        start = perf_counter()
+        if not self.sampled():
+            response = await self.get_response(request)
+            self.record(request, start)
+            return response
+        with self.timed() as timings:
+            response = await self.get_response(request)
+        return self.finish(request, response, start, timings)
+
+    @staticmethod
+    def sampled():
+        rate = settings.REQUEST_TIMING_SAMPLE_RATE
+        return rate >= 1 or (rate > 0 and random.random() < rate)
+
+    @staticmethod
+    @contextmanager
+    def timed():
+        timings, token = metrics.start_request()
+        try:
+            yield timings
+        finally:
+            metrics.end_request(token)
+
+    def record(self, request, start, timings=None):
+        total = perf_counter() - start
+        metrics.record(self.endpoint(request), request.method, total, timings)
+        return total
+
+    def finish(self, request, response, start, timings):
+        total = self.record(request, start, timings)
+        response["Server-Timing"] = timings.server_timing(total)
+        return response
+
+    @staticmethod
+    def endpoint(request):
+        """The URL route, so that ids don't each get their own series."""
+        match = getattr(request, "resolver_match", None)
+        return match.route if match is not None else "unmatched"
+
+
+class QueryBudgetMiddleware:
+    """Hold views to their ``query_budget``, see ``budgets``."""
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.async_mode = iscoroutinefunction(get_response)
+        if self.async_mode:
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if self.async_mode:
+            return self.__acall__(request)
+        mode = settings.QUERY_BUDGET_MODE
+        if mode == "off":
+            return self.get_response(request)
+        with budgets.track(**self.tracking(mode)) as log:
+            response = self.get_response(request)
+        budgets.check(request, log, mode)
+        return response
+
+    async def __acall__(self, request):
+        mode = settings.QUERY_BUDGET_MODE
+        if mode == "off":
+            return await self.get_response(request)
+        with budgets.track(**self.tracking(mode)) as log:
+            response = await self.get_response(request)
+        budgets.check(request, log, mode)
+        return response
+
+    @staticmethod
+    def tracking(mode):
+        # In production a count is enough; the queries are kept to report them
+        return {
+            "keep_stacks": mode == "raise",
+            "detail": mode == "raise" or settings.DEBUG,
+        }
+
+
+class ReplicaRoutingMiddleware:
+    """Send reads of views with ``replica_reads`` to a replica, see ``routers``.
+
+    Requests carrying ``routers.PIN_COOKIE`` stay on the primary, and
+    responses to requests that wrote set it for ``REPLICA_STICKY_SECONDS``.
+    """
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.async_mode = iscoroutinefunction(get_response)
+        if self.async_mode:
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if self.async_mode:
+            return self.__acall__(request)
+        if not settings.DATABASE_REPLICAS:
+            return self.get_response(request)
+        with routers.routed() as state:
+            response = self.get_response(request)
+        return self.finish(response, state)
+
+    async def __acall__(self, request):
+        if not settings.DATABASE_REPLICAS:
+            return await self.get_response(request)
+        with routers.routed() as state:
+            response = await self.get_response(request)
+        return self.finish(response, state)
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        state = routers.current()
+        view = getattr(view_func, "view_class", view_func)
+        if state is not None and getattr(view, "replica_reads", False):
+            routers.use_replica(state, pinned=routers.PIN_COOKIE in request.COOKIES)
+
+    @staticmethod
+    def finish(response, state):
+        if state.wrote:
+            response.set_cookie(
+                routers.PIN_COOKIE,
+                "1",
+                max_age=settings.REPLICA_STICKY_SECONDS,
+                httponly=True,
+                samesite="Lax",
+            )
+        return response
@@ -0,0 +1,23 @@
+# Generated by Django 5.2.8 on 2026-10-18 02:23
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("baseball", "0002_alter_player_options"),
+    ]
+
+    operations = [
+        migrations.RemoveIndex(
+            model_name="player",
+            name="player_name_idx",
+        ),
+        migrations.AddConstraint(
+            model_name="player",
+            constraint=models.UniqueConstraint(
+                fields=("name",), name="player_name_unique"
+            ),
+        ),
+    ]
@@ -0,0 +1,82 @@
+# Generated by Django 5.2.8 on 2026-10-18 02:24
+
+import hashlib
+from decimal import Decimal
+
+from django.db import migrations, models
+
+# Frozen copies of baseball.models.FINGERPRINT_FIELDS and stats_fingerprint
+# as of this migration, so later Player fields don't change what it does
+FINGERPRINT_FIELDS = [
+    "name",
+    "position",
+    "games",
+    "at_bat",
+    "runs",
+    "hits",
+    "doubles",
+    "triples",
+    "home_runs",
+    "rbi",
+    "walks",
+    "strikeouts",
+    "stolen_bases",
+    "caught_stealing",
+    "batting_average",
+    "on_base_percentage",
+    "slugging_percentage",
+    "on_base_plus_slugging",
+]
+DECIMAL_PLACES = {
+    "batting_average": 3,
+    "on_base_percentage": 3,
+    "slugging_percentage": 3,
+    "on_base_plus_slugging": 3,
+}
+
+
+def stats_fingerprint(data):
+    parts = []
+    for name in FINGERPRINT_FIELDS:
+        value = data.get(name)
+        if value is None or value == "":
+            parts.append("")
+        elif name in DECIMAL_PLACES:
+            parts.append(f"{Decimal(str(value)):.{DECIMAL_PLACES[name]}f}")
+        elif isinstance(value, (int, float)):
+            parts.append(str(int(value)))
+        else:
+            parts.append(str(value))
+    return hashlib.blake2b("\x1f".join(parts).encode(), digest_size=16).hexdigest()
+
+
+def backfill_stats_hash(apps, schema_editor):
+    Player = apps.get_model("baseball", "Player")
+    players = Player.objects.using(schema_editor.connection.alias)
+    batch = []
+    for player in players.only("id", *FINGERPRINT_FIELDS).iterator():
+        player.stats_hash = stats_fingerprint(
+            {name: getattr(player, name) for name in FINGERPRINT_FIELDS}
+        )
+        batch.append(player)
+        if len(batch) >= 1000:
+            players.bulk_update(batch, ["stats_hash"])
+            batch = []
+    if batch:
+        players.bulk_update(batch, ["stats_hash"])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("baseball", "0003_player_name_unique"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="player",
+            name="stats_hash",
+            field=models.CharField(blank=True, default="", max_length=32),
+        ),
+        migrations.RunPython(backfill_stats_hash, migrations.RunPython.noop),
+    ]
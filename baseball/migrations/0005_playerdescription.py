@@ -0,0 +1,49 @@
+# Generated by Django 5.2.8 on 2026-10-18 02:25
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("baseball", "0004_player_stats_hash"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="PlayerDescription",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("prompt_hash", models.CharField(max_length=64)),
+                ("text", models.TextField()),
+                ("created_at", models.DateTimeField(auto_now_add=True)),
+                (
+                    "player",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="descriptions",
+                        to="baseball.player",
+                    ),
+                ),
+            ],
+            options={
+                "verbose_name": "Player description",
+                "verbose_name_plural": "Player descriptions",
+                "constraints": [
+                    models.UniqueConstraint(
+                        fields=("player", "prompt_hash"),
+                        name="player_description_unique",
+                    )
+                ],
+            },
+        ),
+    ]
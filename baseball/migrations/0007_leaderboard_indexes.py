@@ -0,0 +1,95 @@
+# Generated by Django 5.2.8 on 2026-10-18 02:35
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("baseball", "0006_dataversion"),
+    ]
+
+    operations = [
+        migrations.RemoveIndex(
+            model_name="player",
+            name="player_hits_idx",
+        ),
+        migrations.RemoveIndex(
+            model_name="player",
+            name="player_hr_idx",
+        ),
+        migrations.AddIndex(
+            model_name="player",
+            index=models.Index(fields=["games", "id"], name="player_lb_g_idx"),
+        ),
+        migrations.AddIndex(
+            model_name="player",
+            index=models.Index(fields=["at_bat", "id"], name="player_lb_ab_idx"),
+        ),
+        migrations.AddIndex(
+            model_name="player",
+            index=models.Index(fields=["runs", "id"], name="player_lb_r_idx"),
+        ),
+        migrations.AddIndex(
+            model_name="player",
+            index=models.Index(fields=["hits", "id"], name="player_lb_h_idx"),
+        ),
+        migrations.AddIndex(
+            model_name="player",
+            index=models.Index(fields=["doubles", "id"], name="player_lb_2b_idx"),
+        ),
+        migrations.AddIndex(
+            model_name="player",
+            index=models.Index(fields=["triples", "id"], name="player_lb_3b_idx"),
+        ),
+        migrations.AddIndex(
+            model_name="player",
+            index=models.Index(fields=["home_runs", "id"], name="player_lb_hr_idx"),
+        ),
+        migrations.AddIndex(
+            model_name="player",
+            index=models.Index(fields=["rbi", "id"], name="player_lb_rbi_idx"),
+        ),
+        migrations.AddIndex(
+            model_name="player",
+            index=models.Index(fields=["walks", "id"], name="player_lb_bb_idx"),
+        ),
+        migrations.AddIndex(
+            model_name="player",
+            index=models.Index(fields=["strikeouts", "id"], name="player_lb_so_idx"),
+        ),
+        migrations.AddIndex(
+            model_name="player",
+            index=models.Index(fields=["stolen_bases", "id"], name="player_lb_sb_idx"),
+        ),
+        migrations.AddIndex(
+            model_name="player",
+            index=models.Index(
+                fields=["caught_stealing", "id"], name="player_lb_cs_idx"
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="player",
+            index=models.Index(
+                fields=["batting_average", "id"], name="player_lb_avg_idx"
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="player",
+            index=models.Index(
+                fields=["on_base_percentage", "id"], name="player_lb_obp_idx"
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="player",
+            index=models.Index(
+                fields=["slugging_percentage", "id"], name="player_lb_slg_idx"
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="player",
+            index=models.Index(
+                fields=["on_base_plus_slugging", "id"], name="player_lb_ops_idx"
+            ),
+        ),
+    ]
@@ -0,0 +1,80 @@
+# Generated by Django 5.2.8 on 2026-10-18 02:37
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("baseball", "0007_leaderboard_indexes"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="PlayerRank",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("stat", models.CharField(max_length=32)),
+                ("scope", models.CharField(blank=True, default="", max_length=10)),
+                ("value", models.DecimalField(decimal_places=3, max_digits=13)),
+                ("rank", models.PositiveIntegerField()),
+                (
+                    "player",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="ranks",
+                        to="baseball.player",
+                    ),
+                ),
+            ],
+            options={
+                "verbose_name": "Player rank",
+                "verbose_name_plural": "Player ranks",
+                "indexes": [
+                    models.Index(
+                        fields=["stat", "scope", "value"], name="player_rank_idx"
+                    )
+                ],
+                "constraints": [
+                    models.UniqueConstraint(
+                        fields=("player", "stat", "scope"), name="player_rank_unique"
+                    )
+                ],
+            },
+        ),
+        migrations.CreateModel(
+            name="RankGroup",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("stat", models.CharField(max_length=32)),
+                ("scope", models.CharField(blank=True, default="", max_length=10)),
+                ("total", models.PositiveIntegerField(default=0)),
+            ],
+            options={
+                "verbose_name": "Rank group",
+                "verbose_name_plural": "Rank groups",
+                "constraints": [
+                    models.UniqueConstraint(
+                        fields=("stat", "scope"), name="rank_group_unique"
+                    )
+                ],
+            },
+        ),
+    ]
@@ -0,0 +1,67 @@
+import baseball.indexes
+import django.contrib.postgres.indexes
+import django.db.models.functions.text
+from django.contrib.postgres.operations import TrigramExtension
+from django.db import migrations
+
+# Frozen copy of the SQLite search table and triggers as of this migration
+# (baseball.search.install recreates missing ones after every migrate)
+PLAYER_TABLE = "baseball_player"
+FTS_TABLE = "baseball_player_name_fts"
+
+CREATE_SQL = [
+    f"CREATE VIRTUAL TABLE IF NOT EXISTS {FTS_TABLE} USING fts5("
+    f"name, content='{PLAYER_TABLE}', content_rowid='id', tokenize='trigram')",
+    f"CREATE TRIGGER IF NOT EXISTS {FTS_TABLE}_ai AFTER INSERT ON {PLAYER_TABLE} "
+    f"BEGIN INSERT INTO {FTS_TABLE}(rowid, name) VALUES (new.id, new.name); END",
+    f"CREATE TRIGGER IF NOT EXISTS {FTS_TABLE}_ad AFTER DELETE ON {PLAYER_TABLE} "
+    f"BEGIN INSERT INTO {FTS_TABLE}({FTS_TABLE}, rowid, name) "
+    "VALUES ('delete', old.id, old.name); END",
+    f"CREATE TRIGGER IF NOT EXISTS {FTS_TABLE}_au AFTER UPDATE OF name ON "
+    f"{PLAYER_TABLE} BEGIN INSERT INTO {FTS_TABLE}({FTS_TABLE}, rowid, name) "
+    "VALUES ('delete', old.id, old.name); "
+    f"INSERT INTO {FTS_TABLE}(rowid, name) VALUES (new.id, new.name); END",
+    f"INSERT INTO {FTS_TABLE}({FTS_TABLE}) VALUES ('rebuild')",
+]
+DROP_SQL = [
+    *(f"DROP TRIGGER IF EXISTS {FTS_TABLE}_{suffix}" for suffix in ("ai", "ad", "au")),
+    f"DROP TABLE IF EXISTS {FTS_TABLE}",
+]
+
+
+def run_on_sqlite(statements):
+    def run(apps, schema_editor):
+        if schema_editor.connection.vendor == "sqlite":
+            for sql in statements:
+                schema_editor.execute(sql)
+
+    return run
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("baseball", "0008_playerrank"),
+    ]
+
+    operations = [
+        TrigramExtension(),
+        # FTS5 trigram table on SQLite; Postgres has a pg_trgm index instead
+        migrations.RunPython(run_on_sqlite(CREATE_SQL), run_on_sqlite(DROP_SQL)),
+        migrations.AddIndex(
+            model_name="player",
+            index=baseball.indexes.PostgresGinIndex(
+                django.contrib.postgres.indexes.OpClass(
+                    django.db.models.functions.text.Upper("name"), name="gin_trgm_ops"
+                ),
+                name="player_name_trgm_idx",
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="player",
+            index=baseball.indexes.PrefixIndex(
+                django.db.models.functions.text.Upper("name"),
+                name="player_name_prefix_idx",
+            ),
+        ),
+    ]
@@ -1,4 +1,32 @@
+import hashlib
+from decimal import Decimal
+
+from django.contrib.postgres.indexes import OpClass
 from django.db import models
+from django.db.models.functions import Upper
+
+from .indexes import PostgresGinIndex, PrefixIndex
+
+
+# (stat, short code) pairs; mirrors baseball.leaderboard.STAT_CODES
+LEADERBOARD_STAT_CODES = [
+    ("games", "g"),
+    ("at_bat", "ab"),
+    ("runs", "r"),
+    ("hits", "h"),
+    ("doubles", "2b"),
+    ("triples", "3b"),
+    ("home_runs", "hr"),
+    ("rbi", "rbi"),
+    ("walks", "bb"),
+    ("strikeouts", "so"),
+    ("stolen_bases", "sb"),
+    ("caught_stealing", "cs"),
+    ("batting_average", "avg"),
+    ("on_base_percentage", "obp"),
+    ("slugging_percentage", "slg"),
+    ("on_base_plus_slugging", "ops"),
+]
 
 
 class Player(models.Model):
@@ -44,6 +72,9 @@ class Player(models.Model):
         max_digits=6, decimal_places=3, blank=True, null=True
     )
 
+    # Fingerprint of the stat columns, see stats_fingerprint()
+    stats_hash = models.CharField(max_length=32, blank=True, default="")
+
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
 
@@ -52,10 +83,168 @@ class Player(models.Model):
         verbose_name = "Player"
         verbose_name_plural = "Players"
         indexes = [
-            models.Index(fields=["name"], name="player_name_idx"),
-            models.Index(fields=["hits"], name="player_hits_idx"),
-            models.Index(fields=["home_runs"], name="player_hr_idx"),
+            # Leaderboards (baseball/leaderboard.py): one (stat, id) index per
+            # stat. (hits, id) also serves the list's keyset pagination.
+            *(
+                models.Index(fields=[stat, "id"], name=f"player_lb_{code}_idx")
+                for stat, code in LEADERBOARD_STAT_CODES
+            ),
+            # Name search on Postgres (baseball/search.py): case-insensitive
+            # prefix LIKE and trigram similarity. SQLite uses an FTS5 table.
+            PostgresGinIndex(
+                OpClass(Upper("name"), name="gin_trgm_ops"),
+                name="player_name_trgm_idx",
+            ),
+            # Name prefixes too short for trigrams, on every database
+            PrefixIndex(Upper("name"), name="player_name_prefix_idx"),
+        ]
+        constraints = [
+            # load_players upserts on name
+            models.UniqueConstraint(fields=["name"], name="player_name_unique"),
         ]
 
     def __str__(self):
         return f"{self.name} ({self.position})" if self.position else self.name
+
+    def update_stats_hash(self):
+        """Recompute ``stats_hash``; ``save()`` does this, ``bulk_update`` doesn't."""
+        self.stats_hash = stats_fingerprint(
+            {name: getattr(self, name) for name in FINGERPRINT_FIELDS}
+        )
+
+    def save(self, *args, **kwargs):
+        self.update_stats_hash()
+        update_fields = kwargs.get("update_fields")
+        if update_fields is not None and "stats_hash" not in update_fields:
+            kwargs["update_fields"] = [*update_fields, "stats_hash"]
+        super().save(*args, **kwargs)
+
+
+class PlayerDescription(models.Model):
+    """Generated description for a player, keyed by a hash of the prompt.
+
+    The prompt is built from the player's stats, so when those change the
+    stored hash no longer matches and the entry is simply not served.
+    """
+
+    player = models.ForeignKey(
+        Player, on_delete=models.CASCADE, related_name="descriptions"
+    )
+    prompt_hash = models.CharField(max_length=64)
+    text = models.TextField()
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        verbose_name = "Player description"
+        verbose_name_plural = "Player descriptions"
+        constraints = [
+            models.UniqueConstraint(
+                fields=["player", "prompt_hash"], name="player_description_unique"
+            ),
+        ]
+
+    def __str__(self):
+        return f"Description of {self.player_id} ({self.prompt_hash[:8]})"
+
+
+class PlayerRank(models.Model):
+    """Precomputed rank of a player for one stat.
+
+    One row per (player, stat, scope); ``scope`` is a position, or ``""``
+    for all players. The group's size is in ``RankGroup``, and percentiles
+    are derived from both when read. Maintained by ``baseball.rankings``.
+    """
+
+    OVERALL = ""
+
+    player = models.ForeignKey(Player, on_delete=models.CASCADE, related_name="ranks")
+    stat = models.CharField(max_length=32)
+    scope = models.CharField(max_length=10, blank=True, default=OVERALL)
+    # The stat's value the rank was computed from
+    value = models.DecimalField(max_digits=13, decimal_places=3)
+    rank = models.PositiveIntegerField()  # 1 = highest value, ties share a rank
+
+    class Meta:
+        verbose_name = "Player rank"
+        verbose_name_plural = "Player ranks"
+        constraints = [
+            models.UniqueConstraint(
+                fields=["player", "stat", "scope"], name="player_rank_unique"
+            ),
+        ]
+        indexes = [
+            # Rows between two values, for incremental updates
+            models.Index(fields=["stat", "scope", "value"], name="player_rank_idx"),
+        ]
+
+    def __str__(self):
+        return f"{self.player_id} {self.stat}/{self.scope or 'all'}: #{self.rank}"
+
+
+class RankGroup(models.Model):
+    """Number of players ranked for one stat in one scope.
+
+    Rank updates lock the group's row, so concurrent edits of a group
+    apply one after the other.
+    """
+
+    stat = models.CharField(max_length=32)
+    scope = models.CharField(max_length=10, blank=True, default=PlayerRank.OVERALL)
+    total = models.PositiveIntegerField(default=0)
+
+    class Meta:
+        verbose_name = "Rank group"
+        verbose_name_plural = "Rank groups"
+        constraints = [
+            models.UniqueConstraint(fields=["stat", "scope"], name="rank_group_unique"),
+        ]
+
+    def __str__(self):
+        return f"{self.stat}/{self.scope or 'all'}: {self.total}"
+
+
+class DataVersion(models.Model):
+    """Monotonic version counter for a named data set (e.g. "players").
+
+    Bumped on every write to the data set, so reading it is a cheap way to
+    tell whether anything changed (ETags, cache keys).
+    """
+
+    name = models.CharField(max_length=50, primary_key=True)
+    version = models.BigIntegerField(default=0)
+
+    def __str__(self):
+        return f"{self.name} v{self.version}"
+
+
+# Columns covered by Player.stats_hash: everything load_players writes
+FINGERPRINT_FIELDS = [
+    f.name
+    for f in Player._meta.concrete_fields
+    if f.name not in ("id", "stats_hash", "created_at", "updated_at")
+]
+DECIMAL_PLACES = {
+    f.name: f.decimal_places
+    for f in Player._meta.concrete_fields
+    if isinstance(f, models.DecimalField)
+}
+
+
+def stats_fingerprint(data) -> str:
+    """Hash the ``FINGERPRINT_FIELDS`` values of ``data`` (a field -> value mapping).
+
+    Values are normalised the way the database stores them, so a feed entry
+    and the row it produced hash the same (0.3 and Decimal("0.300") match).
+    """
+    parts = []
+    for name in FINGERPRINT_FIELDS:
+        value = data.get(name)
+        if value is None or value == "":
+            parts.append("")
+        elif name in DECIMAL_PLACES:
+            parts.append(f"{Decimal(str(value)):.{DECIMAL_PLACES[name]}f}")
+        elif isinstance(value, (int, float)):
+            parts.append(str(int(value)))
+        else:
+            parts.append(str(value))
+    return hashlib.blake2b("\x1f".join(parts).encode(), digest_size=16).hexdigest()
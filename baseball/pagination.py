@@ -0,0 +1,106 @@
+import base64
+import binascii
+
+from django.db.models import F, Q
+from rest_framework.response import Response
+from rest_framework.utils.urls import replace_query_param
+
+
+class HitsKeysetPagination:
+    """Keyset (cursor) pagination over ``(hits, id)``, hits descending.
+
+    Each page seeks past the last ``(hits, id)`` seen instead of using an
+    OFFSET, so a deep page costs the same as the first one. Players without
+    hits come last, paged as a second phase: ``(hits, id) < (h, pk)`` over
+    the ``(hits, id)`` index for players with hits, then ``id < pk`` among
+    those without. The page where the first phase runs out also reads the
+    start of the second.
+
+    Cursors are opaque to clients; invalid ones raise ``ValueError``.
+    ``position_of`` maps a page row to its ``(hits, id)``; the default reads
+    model instances, pass one for ``values_list`` rows.
+    """
+
+    cursor_query_param = "cursor"
+    page_size_query_param = "limit"
+    page_size = 100
+    max_page_size = 1000
+    ordering = (F("hits").desc(), F("id").desc())
+
+    def __init__(self, position_of=None):
+        self.position_of = position_of or self._instance_position
+
+    def paginate_queryset(self, queryset, request):
+        self.request = request
+        self.limit = self.get_page_size(request)
+        position = self.decode_cursor(request.query_params.get(self.cursor_query_param))
+
+        # Fetch one extra row to know whether another page exists
+        rows = []
+        if position is None or position[0] is not None:
+            ranked = queryset.filter(hits__isnull=False).order_by(*self.ordering)
+            if position is not None:
+                ranked = ranked.filter(self._after(*position))
+            rows = list(ranked[: self.limit + 1])
+        if len(rows) <= self.limit:
+            unranked = queryset.filter(hits__isnull=True).order_by(F("id").desc())
+            if position is not None and position[0] is None:
+                unranked = unranked.filter(id__lt=position[1])
+            rows += unranked[: self.limit + 1 - len(rows)]
+        self.has_next = len(rows) > self.limit
+        self.page = rows[: self.limit]
+        return self.page
+
+    def get_page_size(self, request):
+        raw = request.query_params.get(self.page_size_query_param)
+        if raw is None:
+            return self.page_size
+        try:
+            size = int(raw)
+        except ValueError:
+            raise ValueError(f"{self.page_size_query_param} must be an integer")
+        if size < 1:
+            raise ValueError(f"{self.page_size_query_param} must be positive")
+        return min(size, self.max_page_size)
+
+    def get_next_link(self):
+        if not self.has_next or not self.page:
+            return None
+        hits, pk = self.position_of(self.page[-1])
+        url = self.request.get_full_path()
+        url = replace_query_param(
+            url, self.cursor_query_param, self.encode_cursor(hits, pk)
+        )
+        return url
+
+    @staticmethod
+    def _instance_position(row):
+        return row.hits, row.pk
+
+    def get_paginated_data(self, data):
+        return {**data, "next": self.get_next_link()}
+
+    def get_paginated_response(self, data):
+        return Response(self.get_paginated_data(data))
+
+    @staticmethod
+    def _after(hits, pk):
+        # hits <= h lets every backend seek the index; the OR then skips
+        # the ties already seen
+        return Q(hits__lte=hits) & (Q(hits__lt=hits) | Q(hits=hits, id__lt=pk))
+
+    @staticmethod
+    def encode_cursor(hits, pk) -> str:
+        raw = f"{'' if hits is None else hits}:{pk}".encode("ascii")
+        return base64.urlsafe_b64encode(raw).decode("ascii").rstrip("=")
+
+    @staticmethod
+    def decode_cursor(token):
+        if not token:
+            return None
+        try:
+            padded = token + "=" * (-len(token) % 4)
+            hits, pk = base64.urlsafe_b64decode(padded).decode("ascii").split(":")
+            return (int(hits) if hits else None), int(pk)
+        except (binascii.Error, UnicodeDecodeError, ValueError):
+            raise ValueError("Invalid cursor")
@@ -0,0 +1,346 @@
+"""Materialized per-stat ranks (``PlayerRank``) and group sizes (``RankGroup``).
+
+``refresh`` computes ranks in the database with window functions, one
+query per stat for all players and one partitioned by position, and
+upserts them into ``PlayerRank``; rows of players that dropped out of a
+group are removed. ``load_players`` and ``refresh_rankings`` use it.
+
+Edits only touch the groups (stat and scope) they change, and lock those
+groups' ``RankGroup`` rows first, so concurrent edits of a group apply one
+after the other:
+
+- ``refresh_player`` and ``remove_player`` (single edits and deletes)
+  move the player within each group. Each row keeps the value it was
+  ranked by, so a new value only shifts the ranks of the rows in between
+  by one, and joining or leaving a group shifts the rows below and the
+  group's total. That's at most ``QUERIES_PER_GROUP`` queries per group
+  the player moved in, plus ``QUERIES_PER_EDIT``;
+- ``refresh_players`` (batches) writes the players' own rows, then
+  re-ranks all the touched groups in one ``UPDATE`` and recounts their
+  totals, the same queries whatever the size of the batch.
+
+Percentiles are derived from the rank and the group's total when read, so
+no edit rewrites a whole group. Reading a player's ranks is a single
+indexed lookup.
+"""
+
+from functools import reduce
+from operator import or_
+
+from django.db import connections, router, transaction
+from django.db.models import Count, F, OuterRef, Q, Subquery, Window
+from django.db.models.functions import Rank
+
+from . import budgets
+from .leaderboard import STATS
+from .models import Player, PlayerRank, RankGroup
+
+BATCH_SIZE = 2000
+# Own row, shift, neighbour, upsert
+QUERIES_PER_GROUP = 4
+# Create missing groups, lock them, save their totals
+QUERIES_PER_EDIT = 3
+_UPSERT_FIELDS = ["player", "stat", "scope", "value", "rank"]
+
+
+def percentile(rank: int, total: int) -> float:
+    """Share of the rest of the group not ranked above, 0-100 to one decimal."""
+    if total <= 1:
+        return 100.0
+    # Integer tenths rounded half up
+    return (2000 * (total - rank) + total - 1) // (2 * (total - 1)) / 10
+
+
+def snapshot(player: Player) -> dict:
+    """Values that ranks depend on; pass to ``refresh_player`` after saving."""
+    return {name: getattr(player, name) for name in ["position", *STATS]}
+
+
+def query_allowance(moved: int) -> int:
+    """Most queries ``refresh_player`` runs when it moves ``moved`` groups."""
+    return QUERIES_PER_EDIT + QUERIES_PER_GROUP * moved if moved else 0
+
+
+def refresh_player(player: Player, before: dict) -> int:
+    """Apply a change to ``player`` since ``before``; returns the groups moved."""
+    return _apply(player.pk, before, snapshot(player))
+
+
+def remove_player(player: Player) -> int:
+    """Take a deleted ``player`` out of every group it was ranked in."""
+    before = snapshot(player)
+    return _apply(player.pk, before, dict.fromkeys(before))
+
+
+def _apply(pk, before, after) -> int:
+    changes = _changes(before, after)
+    if not changes:
+        return 0
+    with transaction.atomic(savepoint=False):
+        groups = _lock_groups({(stat, scope) for stat, scope, _ in changes})
+        for stat, scope, new in changes:
+            _move(pk, groups[stat, scope], new)
+        RankGroup.objects.bulk_update(groups.values(), ["total"])
+    return len(changes)
+
+
+def _changes(before, after) -> list:
+    """``(stat, scope, new value)`` of every group the player moved in."""
+    positions = sorted({before["position"], after["position"]} - {None, ""})
+    return [
+        (stat, scope, _value_in(after, stat, scope))
+        for stat in STATS
+        for scope in [PlayerRank.OVERALL, *positions]
+        if _value_in(before, stat, scope) != _value_in(after, stat, scope)
+    ]
+
+
+def _value_in(values, stat, scope):
+    """The player's value of ``stat`` if it is ranked in ``scope``, else None."""
+    if scope != PlayerRank.OVERALL and values["position"] != scope:
+        return None
+    return values[stat]
+
+
+def _in_groups(keys) -> Q:
+    return reduce(or_, (Q(stat=stat, scope=scope) for stat, scope in keys))
+
+
+def _lock_groups(keys) -> dict:
+    """Lock the ``RankGroup`` rows of ``keys``, creating missing ones, by key."""
+    RankGroup.objects.bulk_create(
+        [RankGroup(stat=stat, scope=scope) for stat, scope in keys],
+        ignore_conflicts=True,
+    )
+    # Always in the same order, so edits locking several groups can't deadlock
+    locked = (
+        RankGroup.objects.select_for_update()
+        .filter(_in_groups(keys))
+        .order_by("stat", "scope")
+    )
+    return {(group.stat, group.scope): group for group in locked}
+
+
+def _move(pk, group, new):
+    """Move player ``pk`` to ``new`` in a locked ``group`` (None: out of it).
+
+    The group is the rows it has, so the player's old value is the one its
+    row was ranked by, and ranks stay consistent even if the group was
+    never fully computed. ``group.total`` is updated but not saved.
+    """
+    rows = PlayerRank.objects.filter(stat=group.stat, scope=group.scope)
+    others = rows.exclude(player_id=pk)
+    old = rows.filter(player_id=pk).values_list("value", flat=True).first()
+    if old == new:
+        return
+
+    # A player's rank counts the others with a higher value
+    if old is not None and new is not None:
+        step = 1 if new > old else -1
+        low, high = sorted([old, new])
+        others.filter(value__gte=low, value__lt=high).update(rank=F("rank") + step)
+    else:
+        step, value = (-1, old) if new is None else (1, new)
+        others.filter(value__lt=value).update(rank=F("rank") + step)
+        group.total += step
+
+    if new is None:
+        rows.filter(player_id=pk).delete()
+        return
+
+    # Ties share the rank of the nearest row at or below the new value;
+    # with none below, every other player ranks above
+    below = others.filter(value__lte=new).order_by("-value")
+    below = below.values_list("rank", "value").first()
+    if below is None:
+        rank = group.total
+    else:
+        rank = below[0] - (below[1] < new)
+    _upsert(
+        [
+            PlayerRank(
+                player_id=pk, stat=group.stat, scope=group.scope, value=new, rank=rank
+            )
+        ]
+    )
+
+
+def refresh_players(changes) -> int:
+    """Apply the changes of many ``(player, before)`` pairs at once.
+
+    The players' own rows are written with their new values, then every
+    touched group is ranked again in one statement. Returns the number of
+    groups touched.
+    """
+    touched, rows, left = set(), [], {}
+    for player, before in changes:
+        for stat, scope, new in _changes(before, snapshot(player)):
+            touched.add((stat, scope))
+            if new is None:
+                left.setdefault((stat, scope), []).append(player.pk)
+            else:
+                rows.append(
+                    PlayerRank(
+                        player_id=player.pk, stat=stat, scope=scope, value=new, rank=0
+                    )
+                )
+    if not touched:
+        return 0
+
+    with transaction.atomic(savepoint=False):
+        groups = _lock_groups(touched)
+        if left:
+            PlayerRank.objects.filter(
+                reduce(
+                    or_,
+                    (
+                        Q(stat=stat, scope=scope, player_id__in=pks)
+                        for (stat, scope), pks in left.items()
+                    ),
+                )
+            ).delete()
+        _upsert(rows)
+        # More statements for large batches, as few as the backend allows
+        budgets.allow_batches(PlayerRank, rows, _UPSERT_FIELDS, BATCH_SIZE)
+        _rerank(touched)
+        counts = _counts(PlayerRank.objects.filter(_in_groups(touched)))
+        for key, group in groups.items():
+            group.total = counts.get(key, 0)
+        RankGroup.objects.bulk_update(groups.values(), ["total"])
+    return len(touched)
+
+
+def _rerank(keys):
+    """Rank every row of the groups ``keys`` again, in one ``UPDATE``."""
+    alias = router.db_for_write(PlayerRank)
+    connection = connections[alias]
+    ranked = (
+        PlayerRank.objects.filter(_in_groups(keys))
+        .annotate(
+            new_rank=Window(
+                Rank(),
+                partition_by=[F("stat"), F("scope")],
+                order_by=F("value").desc(),
+            )
+        )
+        .values("id", "new_rank")
+    )
+    sql, params = ranked.query.get_compiler(using=alias).as_sql()
+    table = connection.ops.quote_name(PlayerRank._meta.db_table)
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f'UPDATE {table} SET "rank" = ranked.new_rank FROM ({sql}) ranked '
+            f'WHERE {table}."id" = ranked.id AND {table}."rank" <> ranked.new_rank',
+            params,
+        )
+
+
+def _counts(rows) -> dict:
+    """Number of ``rows`` per ``(stat, scope)``."""
+    counts = rows.order_by().values_list("stat", "scope").annotate(n=Count("id"))
+    return {(stat, scope): n for stat, scope, n in counts}
+
+
+def refresh(stats=STATS, positions=None) -> None:
+    """Recompute ranks for ``stats``, overall and per position.
+
+    ``positions`` limits the per-position groups that are recomputed;
+    ``None`` means all of them.
+    """
+    for stat in stats:
+        with transaction.atomic(savepoint=False):
+            list(RankGroup.objects.select_for_update().filter(stat=stat))
+            _refresh_group(stat, PlayerRank.OVERALL)
+            if positions is None:
+                _refresh_group(stat, None)
+            else:
+                for position in positions:
+                    _refresh_group(stat, position)
+            _store_totals(stat)
+
+
+def _refresh_group(stat, scope):
+    """Recompute one stat for one scope; ``scope=None`` does every position."""
+    members = Player.objects.filter(**{f"{stat}__isnull": False})
+    partition = []
+    if scope is None:
+        members = members.exclude(position__isnull=True).exclude(position="")
+        partition = [F("position")]
+    elif scope:
+        members = members.filter(position=scope)
+
+    rows = members.annotate(
+        _rank=Window(Rank(), partition_by=partition, order_by=F(stat).desc()),
+    ).values_list("id", "position", stat, "_rank")
+
+    batch = []
+    for pk, position, value, rank in rows.iterator(chunk_size=BATCH_SIZE):
+        batch.append(
+            PlayerRank(
+                player_id=pk,
+                stat=stat,
+                scope=position if scope is None else scope,
+                value=value,
+                rank=rank,
+            )
+        )
+        if len(batch) >= BATCH_SIZE:
+            _upsert(batch)
+            batch = []
+    if batch:
+        _upsert(batch)
+
+    stale = PlayerRank.objects.filter(stat=stat)
+    if scope is None:
+        stale = stale.exclude(scope=PlayerRank.OVERALL).exclude(
+            player__position=F("scope"), player__in=members.values("pk")
+        )
+    else:
+        stale = stale.filter(scope=scope).exclude(player__in=members.values("pk"))
+    stale.delete()
+
+
+def _store_totals(stat):
+    """Save the size of every group of ``stat``; empty groups are removed."""
+    counts = _counts(PlayerRank.objects.filter(stat=stat))
+    RankGroup.objects.filter(stat=stat).exclude(
+        scope__in=[scope for _, scope in counts]
+    ).delete()
+    RankGroup.objects.bulk_create(
+        [
+            RankGroup(stat=stat, scope=scope, total=total)
+            for (_, scope), total in counts.items()
+        ],
+        update_conflicts=True,
+        unique_fields=["stat", "scope"],
+        update_fields=["total"],
+    )
+
+
+def _upsert(batch):
+    PlayerRank.objects.bulk_create(
+        batch,
+        batch_size=BATCH_SIZE,
+        update_conflicts=True,
+        unique_fields=["player", "stat", "scope"],
+        update_fields=["value", "rank"],
+    )
+
+
+def player_ranks(player_id: int):
+    """Return ``{"overall": {stat: {...}}, "by_position": {...}}`` for one player."""
+    result = {"overall": {}, "by_position": {}}
+    total = RankGroup.objects.filter(stat=OuterRef("stat"), scope=OuterRef("scope"))
+    rows = (
+        PlayerRank.objects.filter(player_id=player_id)
+        .annotate(total=Subquery(total.values("total")[:1]))
+        .values_list("stat", "scope", "rank", "total")
+    )
+    for stat, scope, rank, total in rows:
+        group = "overall" if scope == PlayerRank.OVERALL else "by_position"
+        result[group][stat] = {
+            "rank": rank,
+            "total": total,
+            "percentile": percentile(rank, total),
+        }
+    return result
@@ -0,0 +1,42 @@
+"""JSON renderer with an optional orjson backend.
+
+When ``orjson`` is installed, payloads are encoded in C. Floats, ints,
+strings, dicts and lists (including DRF's ``ReturnDict``/``ReturnList``)
+need no Python callback. Anything else goes through DRF's ``JSONEncoder``,
+the same way the stock renderer handles it; the views send rates as floats
+rather than ``Decimal``s (``FloatDecimalField``, ``json_safe``), so they
+don't hit that path. Without orjson, and for indented (browsable) output,
+this is the stock ``JSONRenderer``.
+"""
+
+from rest_framework.renderers import JSONRenderer
+from rest_framework.utils.encoders import JSONEncoder
+
+from .metrics import span
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+_fallback = JSONEncoder().default
+
+
+class FastJSONRenderer(JSONRenderer):
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        with span("render"):
+            return self._render(data, accepted_media_type, renderer_context)
+
+    def _render(self, data, accepted_media_type, renderer_context):
+        if orjson is None or self.get_indent(
+            accepted_media_type or "", renderer_context or {}
+        ):
+            return super().render(data, accepted_media_type, renderer_context)
+        if data is None:
+            return b""
+        # Datetimes go through DRF's encoder so their format doesn't change
+        return orjson.dumps(
+            data,
+            default=_fallback,
+            option=orjson.OPT_PASSTHROUGH_DATETIME | orjson.OPT_NON_STR_KEYS,
+        )
@@ -0,0 +1,47 @@
+"""Cache of serialized player payloads, keyed by the players data version.
+
+Every write bumps the version (see ``versioning``), which makes all older
+entries unreachable; they age out through the ``players`` cache alias's
+TTL/LRU eviction instead of being deleted.
+"""
+
+import hashlib
+import threading
+from collections import Counter
+
+from django.core.cache import caches
+
+from .versioning import PLAYERS, current_version
+
+_MISSING = object()
+_stats = Counter()
+_stats_lock = threading.Lock()
+
+
+def _count(kind, outcome):
+    with _stats_lock:
+        _stats[f"{kind}_{outcome}"] += 1
+
+
+def get_or_build(kind: str, key: str, build):
+    """Return the cached payload for ``kind``/``key``, building it on a miss.
+
+    Exceptions from ``build`` propagate and nothing is cached.
+    """
+    digest = hashlib.md5(key.encode(), usedforsecurity=False).hexdigest()
+    cache_key = f"{kind}:{digest}:v{current_version(PLAYERS)}"
+    cache = caches["players"]
+    value = cache.get(cache_key, _MISSING)
+    if value is not _MISSING:
+        _count(kind, "hits")
+        return value
+    _count(kind, "misses")
+    value = build()
+    cache.set(cache_key, value)
+    return value
+
+
+def stats() -> dict:
+    """Hit/miss counters for this process."""
+    with _stats_lock:
+        return dict(_stats)
@@ -0,0 +1,94 @@
+"""Primary/replica database routing.
+
+Writes always go to ``default``, the primary. Reads of ``REPLICATED_MODELS``
+go to one of ``DATABASE_REPLICAS`` while a view with ``replica_reads = True``
+handles the request (see ``ReplicaRoutingMiddleware``), except:
+
+- once the request has written to the primary, so it reads its own writes;
+- for ``REPLICA_STICKY_SECONDS`` after a client's write: responses to
+  requests that wrote set the ``PIN_COOKIE`` cookie, and requests carrying
+  it read from the primary, so the client sees its change on the next page
+  even while replicas lag.
+
+Anything outside such a request (``load_players`` and the other management
+commands, the shell) reads and writes the primary.
+"""
+
+import random
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS
+
+# Player rows and the data version they are cached under
+REPLICATED_MODELS = {"baseball.Player", "baseball.DataVersion"}
+PIN_COOKIE = "db_primary"
+
+_current = ContextVar("db_routing", default=None)
+
+
+class Routing:
+    """Routing of one request: its replica, if any, and whether it wrote.
+
+    ``versions`` holds the data versions read from the replica, so the
+    ETag and the cache key agree and cost one query.
+    """
+
+    __slots__ = ("replica", "wrote", "versions")
+
+    def __init__(self):
+        self.replica = None
+        self.wrote = False
+        self.versions = {}
+
+
+def current():
+    """The current request's ``Routing``, or None outside routed requests."""
+    return _current.get()
+
+
+@contextmanager
+def routed():
+    """Route the queries run inside the block (across ``sync_to_async``)."""
+    state = Routing()
+    token = _current.set(state)
+    try:
+        yield state
+    finally:
+        _current.reset(token)
+
+
+def use_replica(state, pinned=False) -> None:
+    """Send ``state``'s replicated reads to a replica, one per request."""
+    replicas = settings.DATABASE_REPLICAS
+    if replicas and not pinned:
+        state.replica = random.choice(replicas)
+
+
+def reading_from_replica() -> bool:
+    state = _current.get()
+    return state is not None and state.replica is not None and not state.wrote
+
+
+class PrimaryReplicaRouter:
+    def db_for_read(self, model, **hints):
+        if model._meta.label in REPLICATED_MODELS and reading_from_replica():
+            return _current.get().replica
+        return DEFAULT_DB_ALIAS
+
+    def db_for_write(self, model, **hints):
+        state = _current.get()
+        if state is not None and model._meta.label in REPLICATED_MODELS:
+            state.wrote = True
+        return DEFAULT_DB_ALIAS
+
+    def allow_relation(self, obj1, obj2, **hints):
+        # Replicas hold the same rows as the primary
+        return True
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        # Replicas get their schema through replication
+        if db in settings.DATABASE_REPLICAS:
+            return False
+        return None
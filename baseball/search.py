@@ -0,0 +1,251 @@
+"""Player name search: prefix typeahead and fuzzy (trigram) matching.
+
+On Postgres, ``UPPER(name)`` has a ``pg_trgm`` GIN index, declared on
+``Player``, which serves both the case-insensitive ``LIKE`` prefix filters
+(Django compares ``UPPER(name)``) and the ``%`` similarity operator. On
+SQLite (local runs) an FTS5 table with the ``trigram`` tokenizer, kept in
+sync by triggers, finds candidates and similarity is scored in Python the
+way ``pg_trgm`` does it. ``install`` creates the table and triggers; it
+runs after every ``migrate``, since migrations that rebuild the player
+table drop its triggers.
+
+Neither serves queries shorter than a trigram, the first keystrokes of a
+typeahead. Those match the start of the whole name only, through a B-tree
+index on ``UPPER(name)`` (``text_pattern_ops`` on Postgres), and don't
+fall back to fuzzy matching.
+
+Feed names lose non-ASCII letters (``load_players`` strips the ``?`` they
+arrive as), so a query is also tried with accents removed and with
+non-ASCII letters dropped: "José Ramírez" finds "Jos Ramrez".
+"""
+
+import re
+import unicodedata
+from functools import reduce
+from operator import or_
+
+from django.contrib.postgres.lookups import TrigramSimilar
+from django.contrib.postgres.search import TrigramSimilarity
+from django.db import connection
+from django.db.models import Case, F, FloatField, Q, Value, When
+from django.db.models.expressions import RawSQL
+from django.db.models.functions import Greatest, Upper
+from django.db.models.lookups import GreaterThanOrEqual, LessThan, StartsWith
+
+from .models import Player
+
+MODES = ("prefix", "fuzzy")
+DEFAULT_LIMIT = 10
+MAX_LIMIT = 50
+# pg_trgm's default similarity threshold
+SIMILARITY_THRESHOLD = 0.3
+# SQLite: FTS candidates scored in Python per query
+FUZZY_CANDIDATES = 200
+# Shorter queries have no trigrams to look up
+MIN_TRIGRAM_QUERY = 3
+
+PLAYER_TABLE = "baseball_player"
+FTS_TABLE = "baseball_player_name_fts"
+# Insert, delete and update of name
+TRIGGERS = ("ai", "ad", "au")
+# Declared in Player.Meta.indexes
+TRGM_INDEX = "player_name_trgm_idx"
+PREFIX_INDEX = "player_name_prefix_idx"
+
+
+def variants(query: str) -> list:
+    """The query as typed, without accents, and without non-ASCII letters."""
+    query = " ".join(query.split())
+    folded = "".join(
+        c for c in unicodedata.normalize("NFKD", query) if not unicodedata.combining(c)
+    )
+    mangled = " ".join("".join(c for c in query if c.isascii()).split())
+    return list(dict.fromkeys(v for v in (query, folded, mangled) if v))
+
+
+def trigrams(text: str) -> set:
+    """Trigrams of ``text`` as ``pg_trgm`` extracts them."""
+    result = set()
+    for word in re.findall(r"\w+", text.lower()):
+        padded = f"  {word} "
+        result.update(padded[i : i + 3] for i in range(len(padded) - 2))
+    return result
+
+
+def similarity(a: str, b: str) -> float:
+    ta, tb = trigrams(a), trigrams(b)
+    if not ta or not tb:
+        return 0.0
+    return len(ta & tb) / len(ta | tb)
+
+
+def search(query: str, mode: str = "prefix", limit: int = DEFAULT_LIMIT) -> list:
+    """Return ``[(player_id, score), ...]``, best match first.
+
+    ``prefix`` matches names where the whole name or any word starts with
+    the query (score 1 for the name, 0.5 for a later word, more hits
+    first on ties) and falls back to ``fuzzy`` when nothing matches.
+    Queries shorter than ``MIN_TRIGRAM_QUERY`` only match whole names.
+    ``fuzzy`` ranks by trigram similarity.
+    """
+    query = " ".join(query.split())
+    if not query:
+        return []
+    if mode == "prefix":
+        results = list(prefix_queryset(query, limit))
+        if results or _is_short(variants(query)):
+            return results
+    return _fuzzy(query, limit)
+
+
+def _is_short(candidates) -> bool:
+    return any(len(v) < MIN_TRIGRAM_QUERY for v in candidates)
+
+
+def prefix_queryset(query, limit=DEFAULT_LIMIT):
+    """``(id, score)`` rows of the prefix search, best first."""
+    candidates = variants(query)
+    if _is_short(candidates):
+        return _name_prefix(candidates, limit)
+    match = reduce(
+        or_,
+        (Q(name__istartswith=v) | Q(name__icontains=f" {v}") for v in candidates),
+    )
+    starts = reduce(or_, (Q(name__istartswith=v) for v in candidates))
+    qs = Player.objects.filter(match)
+    if connection.vendor == "sqlite":
+        # Let the FTS index narrow the scan; LIKE then checks word starts
+        qs = qs.filter(
+            id__in=RawSQL(
+                f"SELECT rowid FROM {FTS_TABLE} WHERE {FTS_TABLE} MATCH %s",
+                [_fts_any(candidates)],
+            )
+        )
+    return (
+        qs.annotate(
+            _score=Case(
+                When(starts, then=Value(1.0)),
+                default=Value(0.5),
+                output_field=FloatField(),
+            )
+        )
+        .order_by("-_score", F("hits").desc(nulls_last=True), "name")
+        .values_list("id", "_score")[:limit]
+    )
+
+
+def _name_prefix(candidates, limit):
+    """Prefix rows for short queries: names starting with one of ``candidates``."""
+    name = Upper("name")
+    if connection.vendor == "postgresql":
+        # text_pattern_ops lets LIKE 'AB%' use the index
+        match = reduce(or_, (Q(StartsWith(name, v.upper())) for v in candidates))
+    else:
+        # SQLite uses indexes on expressions for ranges, not for LIKE. Its
+        # UPPER() only changes ASCII letters; the mangled variant is ASCII.
+        ranges = []
+        for v in filter(str.isascii, candidates):
+            low = v.upper()
+            high = low[:-1] + chr(ord(low[-1]) + 1)
+            ranges.append(Q(GreaterThanOrEqual(name, low)) & Q(LessThan(name, high)))
+        match = reduce(or_, ranges, Q(pk__in=[]))
+    return (
+        Player.objects.filter(match)
+        .annotate(_score=Value(1.0, output_field=FloatField()))
+        .order_by(F("hits").desc(nulls_last=True), "name")
+        .values_list("id", "_score")[:limit]
+    )
+
+
+def _fuzzy(query, limit):
+    candidates = variants(query)
+    if connection.vendor == "postgresql":
+        # Same expression as the index: UPPER(name)
+        name = Upper("name")
+        scores = [TrigramSimilarity(name, v) for v in candidates]
+        score = Greatest(*scores) if len(scores) > 1 else scores[0]
+        match = reduce(or_, (Q(TrigramSimilar(name, v)) for v in candidates))
+        rows = (
+            Player.objects.filter(match)
+            .annotate(_score=score)
+            .order_by("-_score", F("hits").desc(nulls_last=True), "name")
+            .values_list("id", "_score")[:limit]
+        )
+        return [(pk, round(score, 3)) for pk, score in rows]
+
+    # FTS5 trigrams have no word padding; keep the ones made of letters only
+    grams = {g for v in candidates for g in trigrams(v) if " " not in g}
+    if not grams:
+        return []
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f"SELECT p.id, p.name, p.hits FROM {FTS_TABLE} f "
+            f"JOIN {PLAYER_TABLE} p ON p.id = f.rowid "
+            f"WHERE {FTS_TABLE} MATCH %s ORDER BY f.rank LIMIT %s",
+            [_fts_any(grams), FUZZY_CANDIDATES],
+        )
+        rows = cursor.fetchall()
+    scored = []
+    for pk, name, hits in rows:
+        score = max(similarity(name, v) for v in candidates)
+        if score >= SIMILARITY_THRESHOLD:
+            scored.append((-score, -(hits or 0), name, pk))
+    scored.sort()
+    return [(pk, round(-score, 3)) for score, _, _, pk in scored[:limit]]
+
+
+def _fts_any(terms):
+    """FTS5 query for rows containing any of ``terms`` (as substrings)."""
+    return " OR ".join('"' + t.replace('"', '""') + '"' for t in sorted(terms))
+
+
+def install(connection) -> None:
+    """Create the SQLite search table and triggers that are missing.
+
+    Does nothing on other databases, or before the player table exists.
+    """
+    if connection.vendor != "sqlite":
+        return
+    if PLAYER_TABLE not in connection.introspection.table_names():
+        return
+    with connection.cursor() as cursor:
+        names = [FTS_TABLE, *(f"{FTS_TABLE}_{suffix}" for suffix in TRIGGERS)]
+        cursor.execute(
+            "SELECT name FROM sqlite_master WHERE name IN (%s)"
+            % ", ".join(["%s"] * len(names)),
+            names,
+        )
+        if len(cursor.fetchall()) == len(names):
+            return
+        cursor.execute(
+            f"CREATE VIRTUAL TABLE IF NOT EXISTS {FTS_TABLE} USING fts5("
+            f"name, content='{PLAYER_TABLE}', content_rowid='id', "
+            "tokenize='trigram')"
+        )
+        cursor.execute(
+            f"CREATE TRIGGER IF NOT EXISTS {FTS_TABLE}_ai AFTER INSERT ON "
+            f"{PLAYER_TABLE} BEGIN INSERT INTO {FTS_TABLE}(rowid, name) "
+            "VALUES (new.id, new.name); END"
+        )
+        cursor.execute(
+            f"CREATE TRIGGER IF NOT EXISTS {FTS_TABLE}_ad AFTER DELETE ON "
+            f"{PLAYER_TABLE} BEGIN INSERT INTO {FTS_TABLE}({FTS_TABLE}, rowid, "
+            "name) VALUES ('delete', old.id, old.name); END"
+        )
+        cursor.execute(
+            f"CREATE TRIGGER IF NOT EXISTS {FTS_TABLE}_au AFTER UPDATE OF name ON "
+            f"{PLAYER_TABLE} BEGIN INSERT INTO {FTS_TABLE}({FTS_TABLE}, rowid, "
+            "name) VALUES ('delete', old.id, old.name); "
+            f"INSERT INTO {FTS_TABLE}(rowid, name) VALUES (new.id, new.name); END"
+        )
+        # Rows written while the triggers were missing
+        cursor.execute(f"INSERT INTO {FTS_TABLE}({FTS_TABLE}) VALUES ('rebuild')")
+
+
+def uninstall(connection) -> None:
+    if connection.vendor != "sqlite":
+        return
+    with connection.cursor() as cursor:
+        for suffix in TRIGGERS:
+            cursor.execute(f"DROP TRIGGER IF EXISTS {FTS_TABLE}_{suffix}")
+        cursor.execute(f"DROP TABLE IF EXISTS {FTS_TABLE}")
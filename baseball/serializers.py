@@ -1,37 +1,44 @@
+import decimal
+
 from rest_framework import serializers
+from . import limits
 from .models import Player
 
 ALLOWED_POSITIONS = ["LF", "RF", "CF", "1B", "2B", "3B", "SS", "C", "DH", "P", "OF"]
 
 
+class FloatDecimalField(serializers.DecimalField):
+    """``DecimalField`` that outputs the rounded value as a ``float``.
+
+    Renders to the same JSON as a ``Decimal`` with ``coerce_to_string=False``,
+    but the renderer needs no Python callback for it.
+    """
+
+    def __init__(self, **kwargs):
+        super().__init__(coerce_to_string=False, **kwargs)
+
+    def to_representation(self, value):
+        return float(super().to_representation(value))
+
+
 class PlayerSerializer(serializers.ModelSerializer):
-    batting_average = serializers.DecimalField(
-        max_digits=5,
-        decimal_places=3,
-        allow_null=True,
-        required=False,
-        coerce_to_string=False,
+    """Read serializer for players.
+
+    Accepts an optional ``fields`` iterable to restrict the output to a subset
+    of ``Meta.fields`` (used for ``?fields=`` projections on list endpoints).
+    """
+
+    batting_average = FloatDecimalField(
+        max_digits=5, decimal_places=3, allow_null=True, required=False
     )
-    on_base_percentage = serializers.DecimalField(
-        max_digits=5,
-        decimal_places=3,
-        allow_null=True,
-        required=False,
-        coerce_to_string=False,
+    on_base_percentage = FloatDecimalField(
+        max_digits=5, decimal_places=3, allow_null=True, required=False
     )
-    slugging_percentage = serializers.DecimalField(
-        max_digits=5,
-        decimal_places=3,
-        allow_null=True,
-        required=False,
-        coerce_to_string=False,
+    slugging_percentage = FloatDecimalField(
+        max_digits=5, decimal_places=3, allow_null=True, required=False
     )
-    on_base_plus_slugging = serializers.DecimalField(
-        max_digits=6,
-        decimal_places=3,
-        allow_null=True,
-        required=False,
-        coerce_to_string=False,
+    on_base_plus_slugging = FloatDecimalField(
+        max_digits=6, decimal_places=3, allow_null=True, required=False
     )
 
     class Meta:
@@ -58,30 +65,93 @@ class PlayerSerializer(serializers.ModelSerializer):
             "on_base_plus_slugging",
         ]
 
+    DECIMAL_FIELDS = [
+        "batting_average",
+        "on_base_percentage",
+        "slugging_percentage",
+        "on_base_plus_slugging",
+    ]
+
+    def __init__(self, *args, fields=None, **kwargs):
+        super().__init__(*args, **kwargs)
+        if fields is not None:
+            for name in set(self.fields) - set(fields):
+                self.fields.pop(name)
+
+    @classmethod
+    def parse_fields(cls, value):
+        """Parse a comma-separated ``fields`` query value.
+
+        Returns None when no projection was requested. ``id`` is always kept so
+        clients can address the rows they get back.
+        """
+        if not value:
+            return None
+        requested = [f.strip() for f in value.split(",") if f.strip()]
+        unknown = [f for f in requested if f not in cls.Meta.fields]
+        if unknown:
+            raise ValueError(f"Unknown fields: {', '.join(unknown)}")
+        return ["id"] + [f for f in requested if f != "id"]
+
+
+def _decimal_converter(field, json_safe):
+    """Mirror ``DecimalField.to_representation`` for ``coerce_to_string=False``."""
+    exp = decimal.Decimal(".1") ** field.decimal_places
+    context = decimal.getcontext().copy()
+    context.prec = field.max_digits
+    rounding = field.rounding
+
+    if json_safe:
+        return lambda v: float(v.quantize(exp, rounding=rounding, context=context))
+    return lambda v: v.quantize(exp, rounding=rounding, context=context)
+
+
+class FastPlayerSerializer:
+    """Read-only fast path producing the same payloads as ``PlayerSerializer``.
+
+    Rows come from ``values_list()`` and are turned into dicts with
+    converters compiled once from ``PlayerSerializer``'s fields. Integer and
+    char columns already come back from the database as ``int``/``str``, so
+    only the decimal columns need converting.
+
+    ``extra`` columns are selected but left out of the output (e.g. ``hits``
+    for pagination cursors). With ``json_safe=True`` decimals come out as
+    floats, like ``PlayerSerializer`` sends them; otherwise as ``Decimal``,
+    which renders to the same JSON.
+    """
+
+    def __init__(self, fields=None, extra=(), json_safe=False):
+        # Keep PlayerSerializer's field order whatever order was requested
+        self.fields = [
+            f for f in PlayerSerializer.Meta.fields if fields is None or f in fields
+        ]
+        self.columns = self.fields + [c for c in extra if c not in self.fields]
+        declared = PlayerSerializer().fields
+        self._converters = [
+            (i, _decimal_converter(declared[name], json_safe))
+            for i, name in enumerate(self.fields)
+            if isinstance(declared[name], serializers.DecimalField)
+        ]
+
+    def values(self, queryset):
+        return queryset.values_list(*self.columns)
+
+    def to_representation(self, row) -> dict:
+        if self._converters:
+            row = list(row)
+            for i, convert in self._converters:
+                value = row[i]
+                if value is not None:
+                    row[i] = convert(value)
+        return dict(zip(self.fields, row))
+
+    def many(self, rows) -> list:
+        return [self.to_representation(row) for row in rows]
+
 
 class PlayerUpdateSerializer(serializers.ModelSerializer):
     position = serializers.ChoiceField(choices=ALLOWED_POSITIONS)
 
-    # Constants derived from dataset and prior rules
-    INT_LIMITS = {
-        "games": (0, 3500),
-        "at_bat": (0, 14053),
-        "hits": (0, 4256),
-        "doubles": (8, 746),
-        "triples": (4, 177),
-        "home_runs": (117, 762),
-        "rbi": (418, 2499),
-        "walks": (183, 2558),
-        "strikeouts": (183, 2597),
-        "stolen_bases": (1, 808),
-        "caught_stealing": (0, 149),
-    }
-    FLOAT_LIMITS = {
-        "batting_average": (0.231, 0.43),
-        "slugging_percentage": (0.34, 0.69),
-        "on_base_plus_slugging": (0.671, 1.164),
-    }
-
     class Meta:
         model = Player
         # name is read-only (not editable)
@@ -104,32 +174,38 @@ class PlayerUpdateSerializer(serializers.ModelSerializer):
             "on_base_plus_slugging",
         ]
 
+    @classmethod
+    def get_limits(cls) -> dict:
+        """``{field: (min, max)}`` enforced for the editable numeric fields."""
+        return {f: limits.HARD_LIMITS[f] for f in cls.Meta.fields if f in limits.FIELDS}
+
+    @classmethod
+    def get_observed(cls) -> dict:
+        """``{field: (min, max)}`` in the table for the editable numeric fields."""
+        observed = limits.observed()
+        return {f: observed[f] for f in cls.Meta.fields if f in observed}
+
     def validate(self, attrs):
         errors = {}
-        for field, (minv, maxv) in self.INT_LIMITS.items():
-            if field in attrs and attrs[field] is not None:
-                try:
-                    val = int(attrs[field])
-                except Exception:
-                    errors[field] = "must be an integer"
-                    continue
-                if not (minv <= val <= maxv):
-                    errors[field] = f"must be between {minv} and {maxv}"
-        for field, (minv, maxv) in self.FLOAT_LIMITS.items():
-            if field in attrs and attrs[field] is not None:
-                try:
-                    val = float(attrs[field])
-                except Exception:
-                    errors[field] = "must be a number"
-                    continue
-                if not (minv <= val <= maxv):
-                    errors[field] = f"must be between {minv} and {maxv}"
+        for field, val in attrs.items():
+            minv, maxv = limits.HARD_LIMITS.get(field, (None, None))
+            if val is None or minv is None:
+                continue
+            if not (minv <= val <= maxv):
+                errors[field] = f"must be between {minv} and {maxv}"
         if errors:
             raise serializers.ValidationError(errors)
         return attrs
 
     def update(self, instance: Player, validated_data):
-        for attr, val in validated_data.items():
-            setattr(instance, attr, val)
-        instance.save()
+        changed = [
+            attr
+            for attr, val in validated_data.items()
+            if getattr(instance, attr) != val
+        ]
+        for attr in changed:
+            setattr(instance, attr, validated_data[attr])
+        if changed:
+            # Only write what changed (save() adds stats_hash)
+            instance.save(update_fields=[*changed, "updated_at"])
         return instance
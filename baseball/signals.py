@@ -0,0 +1,39 @@
+from django.db import connections
+from django.db.backends.signals import connection_created
+from django.db.models.signals import post_delete, post_migrate, post_save, pre_delete
+from django.dispatch import receiver
+
+from . import budgets, limits, metrics, rankings, search
+from .models import Player
+from .versioning import bump_version
+
+
+@receiver(post_save, sender=Player)
+@receiver(post_delete, sender=Player)
+def player_changed(sender, **kwargs):
+    bump_version()
+
+
+@receiver(post_save, sender=Player)
+def player_saved(sender, instance, **kwargs):
+    limits.widen({name: getattr(instance, name) for name in limits.FIELDS})
+
+
+@receiver(pre_delete, sender=Player)
+def player_deleting(sender, instance, **kwargs):
+    # Close the gap it leaves while its ranks are still there
+    rankings.remove_player(instance)
+
+
+@receiver(connection_created)
+def connection_opened(sender, connection, **kwargs):
+    # Time queries of sampled requests and count them against view budgets
+    metrics.install(connection)
+    budgets.install(connection)
+
+
+@receiver(post_migrate)
+def migrated(sender, using, **kwargs):
+    # SQLite: migrations that rebuild the player table drop the search triggers
+    if sender.name == "baseball":
+        search.install(connections[using])
@@ -0,0 +1,145 @@
+"""Synthetic ``Player`` rows and feed entries for benchmarks.
+
+Values stay within ``RANGES`` and ``RATE_RANGES`` (the spread of the real
+feed, formerly hardcoded as the update limits). Career length (at-bats)
+is drawn first; hits follow from a batting average around .280, extra-base
+hits are a share of hits, and the remaining counting stats scale with
+at-bats. Rate stats are then derived from the counting stats, so rows pass
+``baseball.derived`` checks and look like the real feed without touching
+the network.
+"""
+
+import json
+import random
+from decimal import Decimal
+
+from .models import Player
+from .serializers import ALLOWED_POSITIONS
+
+RANGES = {
+    "games": (0, 3500),
+    "at_bat": (0, 14053),
+    "hits": (0, 4256),
+    "doubles": (8, 746),
+    "triples": (4, 177),
+    "home_runs": (117, 762),
+    "rbi": (418, 2499),
+    "walks": (183, 2558),
+    "strikeouts": (183, 2597),
+    "stolen_bases": (1, 808),
+    "caught_stealing": (0, 149),
+}
+RATE_RANGES = {
+    "batting_average": (0.231, 0.43),
+    "slugging_percentage": (0.34, 0.69),
+    "on_base_plus_slugging": (0.671, 1.164),
+}
+
+FIRST_NAMES = (
+    "Hank Ty Babe Willie Ted Stan Mickey Lou Roberto Pete Rickey Tony Cal "
+    "Derek Ichiro Albert Miguel José Adrián Iván Manny David Frank Eddie Reggie"
+).split()
+LAST_NAMES = (
+    "Aaron Cobb Ruth Mays Williams Musial Mantle Gehrig Clemente Rose Henderson "
+    "Gwynn Ripken Jeter Suzuki Pujols Cabrera Ramírez Beltré Rodríguez Ortiz "
+    "Thomas Murray Jackson Muñoz"
+).split()
+
+
+def _rate(numerator, denominator):
+    if not denominator:
+        return None
+    return Decimal(numerator / denominator).quantize(Decimal("0.001"))
+
+
+def _clamp(value, field):
+    lo, hi = RANGES[field]
+    return min(max(int(value), lo), hi)
+
+
+def _scaled(rng, field, share):
+    """A value ``share`` (0-1) of the way through ``field``'s range, with noise."""
+    lo, hi = RANGES[field]
+    return _clamp(lo + (hi - lo) * share * rng.uniform(0.8, 1.2), field)
+
+
+def make_name(rng: random.Random, index: int) -> str:
+    """Unique per ``index``; some names carry accents, as real ones do."""
+    return f"{rng.choice(FIRST_NAMES)} {rng.choice(LAST_NAMES)} {index}"
+
+
+def make_player(rng: random.Random, index: int) -> Player:
+    at_bat = max(_clamp(rng.triangular(500, 14053, 6000), "at_bat"), 1)
+    career = at_bat / RANGES["at_bat"][1]
+    avg_lo, avg_hi = RATE_RANGES["batting_average"]
+    hits = _clamp(at_bat * rng.triangular(avg_lo, avg_hi, 0.28), "hits")
+
+    stats = {
+        "games": _clamp(at_bat / rng.uniform(3.3, 4.0), "games"),
+        "at_bat": at_bat,
+        "hits": hits,
+        "home_runs": _scaled(rng, "home_runs", career),
+        "doubles": _scaled(rng, "doubles", career),
+        "triples": _scaled(rng, "triples", career * rng.uniform(0.2, 1.0)),
+        "rbi": _scaled(rng, "rbi", career),
+        "walks": _scaled(rng, "walks", career),
+        "strikeouts": _scaled(rng, "strikeouts", career),
+        "stolen_bases": _scaled(rng, "stolen_bases", career * rng.uniform(0, 1)),
+        "caught_stealing": _scaled(rng, "caught_stealing", career * rng.uniform(0, 1)),
+    }
+    # Extra-base hits can't outnumber hits on short careers
+    extra = stats["doubles"] + stats["triples"] + stats["home_runs"]
+    if extra > hits:
+        for field in ("doubles", "triples", "home_runs"):
+            stats[field] = stats[field] * hits // extra
+    singles = hits - stats["doubles"] - stats["triples"] - stats["home_runs"]
+    total_bases = (
+        singles + 2 * stats["doubles"] + 3 * stats["triples"] + 4 * stats["home_runs"]
+    )
+    avg = _rate(hits, at_bat)
+    obp = _rate(hits + stats["walks"], at_bat + stats["walks"])
+    slg = _rate(total_bases, at_bat)
+    return Player(
+        name=make_name(rng, index),
+        position=rng.choice(ALLOWED_POSITIONS),
+        runs=int(hits * rng.uniform(0.45, 0.65)),
+        **stats,
+        batting_average=avg,
+        on_base_percentage=obp,
+        slugging_percentage=slg,
+        on_base_plus_slugging=obp + slg,
+    )
+
+
+def make_players(count: int, seed: int = 0, start: int = 0):
+    """Yield ``count`` unsaved players, reproducible for a given ``seed``."""
+    rng = random.Random(seed)
+    for i in range(start, start + count):
+        yield make_player(rng, i)
+
+
+def to_feed_entry(player: Player) -> dict:
+    """The player as the upstream feed spells it (see ``load_players.FIELD_MAP``).
+
+    Non-ASCII letters arrive as ``?``, like in the real feed.
+    """
+    from .management.commands.load_players import FIELD_MAP
+
+    entry = {}
+    for api_field, model_field in FIELD_MAP.items():
+        value = getattr(player, model_field)
+        entry[api_field] = float(value) if isinstance(value, Decimal) else value
+    entry["Player name"] = "".join(
+        c if c.isascii() else "?" for c in entry["Player name"]
+    )
+    return entry
+
+
+def write_feed(path, players) -> int:
+    """Write ``players`` as an NDJSON feed for ``load_players``; return the count."""
+    count = 0
+    with open(path, "w", encoding="utf-8") as f:
+        for player in players:
+            f.write(json.dumps(to_feed_entry(player)) + "\n")
+            count += 1
+    return count
@@ -1,3 +1,1676 @@
-from django.test import TestCase
+import asyncio
+import atexit
+import io
+import json
+import logging
+import os
+import tempfile
+import time
+import warnings
+from decimal import Decimal
+from unittest import mock
 
-# Create your tests here.
+from django.core.cache import cache, caches
+from django.core.management import CommandError, call_command
+from django.core.management.sql import emit_post_migrate_signal
+from django.db import connection, connections
+from django.test import Client, TestCase, TransactionTestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from rest_framework.renderers import JSONRenderer
+
+from . import (
+    aio,
+    budgets,
+    derived,
+    descriptions,
+    export,
+    leaderboard,
+    limits,
+    rankings,
+    renderers,
+    response_cache,
+    routers,
+    search,
+    synthetic,
+    versioning,
+    views,
+)
+from .breaker import CircuitBreaker
+from .fakes import FakeCompletionServer
+from .log import QueuedStreamHandler, SampledEventFilter, Truncated
+from .management.commands import load_players
+from .models import Player, PlayerDescription, PlayerRank, RankGroup
+from .pagination import HitsKeysetPagination
+from .renderers import FastJSONRenderer
+from .serializers import (
+    FastPlayerSerializer,
+    PlayerSerializer,
+    PlayerUpdateSerializer,
+)
+from .views import PlayersByHitsAPIView, PlayerUpdateAPIView
+
+
+class PlayerDescriptionTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.player = Player.objects.create(
+            name="Hank Aaron", position="RF", games=3298, hits=3771, home_runs=755
+        )
+        self.url = f"/api/baseball/players/{self.player.pk}/description/"
+
+    async def test_concurrent_requests_share_one_upstream_call(self):
+        with FakeCompletionServer(delay=0.3) as server:
+            responses = await asyncio.gather(
+                *(self.async_client.get(self.url) for _ in range(10))
+            )
+        self.assertEqual(server.requests, 1)
+        for response in responses:
+            self.assertEqual(response.status_code, 200)
+            self.assertEqual(response.json()["description"], "Fake bio.")
+            self.assertEqual(response.json()["source"], "llm")
+
+    async def test_repeat_view_is_served_from_cache(self):
+        with FakeCompletionServer() as server:
+            await self.async_client.get(self.url)
+            response = await self.async_client.get(self.url)
+        self.assertEqual(server.requests, 1)
+        self.assertEqual(response.json()["description"], "Fake bio.")
+        self.assertEqual(response.json()["source"], "cache")
+
+    async def test_upstream_error_falls_back_to_stats_description(self):
+        with FakeCompletionServer(status=500):
+            response = await self.async_client.get(self.url)
+        self.assertEqual(response.status_code, 200)
+        self.assertIn(
+            "Hank Aaron played primarily as RF.", response.json()["description"]
+        )
+
+    async def test_open_circuit_skips_upstream(self):
+        with FakeCompletionServer(status=500) as server:
+            for _ in range(5):
+                await self.async_client.get(self.url)
+            response = await self.async_client.get(self.url)
+        self.assertEqual(server.requests, 5)
+        self.assertEqual(response.json()["source"], "fallback")
+
+    @override_settings(DESCRIPTION_LATENCY_BUDGET=0.1)
+    async def test_latency_budget_falls_back(self):
+        with FakeCompletionServer(delay=0.5):
+            started = time.monotonic()
+            response = await self.async_client.get(self.url)
+            elapsed = time.monotonic() - started
+        self.assertEqual(response.json()["source"], "fallback")
+        self.assertLess(elapsed, 0.5)
+
+    async def test_unknown_player(self):
+        response = await self.async_client.get("/api/baseball/players/999/description/")
+        self.assertEqual(response.status_code, 404)
+
+    async def test_asgi_keeps_the_client_open(self):
+        with FakeCompletionServer(), mock.patch.object(
+            aio, "close_client", wraps=aio.close_client
+        ) as close:
+            await self.async_client.get(self.url)
+        close.assert_not_called()
+
+    def test_wsgi_closes_the_client_of_its_loop(self):
+        with FakeCompletionServer(), mock.patch.object(
+            aio, "close_client", wraps=aio.close_client
+        ) as close:
+            self.client.get(self.url)
+        close.assert_called_once()
+
+    def test_store_keeps_a_description_of_newer_stats(self):
+        stale = Player.objects.get(pk=self.player.pk)
+        self.player.hits = 3772
+        self.player.save()
+        descriptions.store(self.player, views._build_prompt(self.player), "New.")
+        # A slow caller that read the row before the edit
+        descriptions.store(stale, views._build_prompt(stale), "Old.")
+        self.assertEqual(
+            PlayerDescription.objects.filter(player=self.player).count(), 2
+        )
+        # Gone with the next version of the row
+        self.player.hits = 3773
+        self.player.save()
+        descriptions.store(self.player, views._build_prompt(self.player), "Newer.")
+        self.assertEqual(
+            list(PlayerDescription.objects.values_list("text", flat=True)),
+            ["Newer."],
+        )
+
+    def test_put_and_patch_invalidate_the_description(self):
+        data = {f: None for f in PlayerUpdateSerializer.Meta.fields}
+        data.update(position="RF", games=3298, hits=3771, home_runs=756)
+        requests = [
+            lambda: self.client.put(
+                f"/api/baseball/players/{self.player.pk}/update/",
+                data=json.dumps(data),
+                content_type="application/json",
+            ),
+            lambda: self.client.patch(
+                "/api/baseball/players/bulk-update/",
+                data=json.dumps([{"id": self.player.pk, "home_runs": 757}]),
+                content_type="application/json",
+            ),
+        ]
+        for request in requests:
+            self.player.refresh_from_db()
+            prompt = views._build_prompt(self.player)
+            descriptions.store(self.player, prompt, "Fake bio.")
+            self.assertEqual(request().status_code, 200)
+            self.assertFalse(
+                PlayerDescription.objects.filter(player=self.player).exists()
+            )
+
+
+class GenerateDescriptionsTests(TestCase):
+    def setUp(self):
+        self.players = [
+            Player.objects.create(name=f"Player {i}", position="C", hits=10 + i)
+            for i in range(3)
+        ]
+        first = self.players[0]
+        descriptions.store(first, views._build_prompt(first), "Cached bio.")
+
+    def run_command(self, *args):
+        out, err = io.StringIO(), io.StringIO()
+        call_command("generate_descriptions", *args, stdout=out, stderr=err)
+        return out.getvalue(), err.getvalue()
+
+    def test_generates_only_missing_descriptions(self):
+        with FakeCompletionServer() as server:
+            out, _ = self.run_command("--concurrency", "2")
+        self.assertEqual(server.requests, 2)
+        self.assertIn("Generated: 2, Already cached: 1, Failed: 0", out)
+        texts = dict(PlayerDescription.objects.values_list("player_id", "text"))
+        self.assertEqual(
+            texts,
+            {
+                self.players[0].pk: "Cached bio.",
+                self.players[1].pk: "Fake bio.",
+                self.players[2].pk: "Fake bio.",
+            },
+        )
+
+    def test_force_regenerates_and_failures_are_counted(self):
+        with FakeCompletionServer(status=500):
+            out, err = self.run_command("--force")
+        self.assertIn("Generated: 0, Already cached: 0, Failed: 3", out)
+        self.assertIn(f"Failed for player {self.players[0].pk}", err)
+        with FakeCompletionServer() as server:
+            out, _ = self.run_command("--force")
+        self.assertEqual(server.requests, 3)
+        self.assertEqual(PlayerDescription.objects.count(), 3)
+
+    def test_requires_an_api_key(self):
+        with mock.patch.dict(os.environ, {"OPENAI_API_KEY": ""}):
+            _, err = self.run_command()
+        self.assertIn("OpenAI API key not configured.", err)
+
+
+class DescriptionLoggingTests(TestCase):
+    def record(self, level=logging.INFO, event=None):
+        record = logging.LogRecord("baseball", level, __file__, 1, "msg", (), None)
+        if event is not None:
+            record.event = event
+        return record
+
+    def test_sampling_rates(self):
+        log_filter = SampledEventFilter({"never": 0.0, "half": 0.5})
+        self.assertTrue(log_filter.filter(self.record(event="unlisted")))
+        self.assertFalse(log_filter.filter(self.record(event="never")))
+        # Warnings and errors are never sampled out
+        self.assertTrue(log_filter.filter(self.record(logging.WARNING, "never")))
+        with mock.patch("baseball.log.random.random", side_effect=[0.4, 0.6]):
+            self.assertTrue(log_filter.filter(self.record(event="half")))
+            self.assertFalse(log_filter.filter(self.record(event="half")))
+
+    def test_records_without_event_pass_and_get_a_placeholder(self):
+        record = self.record()
+        self.assertTrue(SampledEventFilter({"-": 0.0}).filter(record))
+        self.assertEqual(record.event, "-")
+
+    def test_truncated_is_lazy_and_cuts_long_values(self):
+        build = mock.Mock(return_value="x" * 30)
+        value = Truncated(build, limit=10)
+        build.assert_not_called()
+        self.assertEqual(str(value), "xxxxxxxxxx... [20 more chars]")
+        self.assertEqual(str(Truncated("short", limit=10)), "short")
+        with override_settings(DESCRIPTION_LOG_MAX_BODY=3):
+            self.assertEqual(str(Truncated("abcdef")), "abc... [3 more chars]")
+
+    def test_queued_handler_writes_from_its_thread(self):
+        handler = QueuedStreamHandler()
+        out = io.StringIO()
+        handler.listener.handlers[0].setStream(out)
+        handler.handle(self.record())
+        handler.listener.stop()
+        atexit.unregister(handler.listener.stop)
+        self.assertEqual(out.getvalue(), "msg\n")
+
+    def test_queued_handler_drops_when_full(self):
+        handler = QueuedStreamHandler(maxsize=2)
+        # Nothing drains the queue once the listener is stopped
+        handler.listener.stop()
+        atexit.unregister(handler.listener.stop)
+        for _ in range(5):
+            handler.handle(self.record())
+        self.assertEqual(handler.queue.qsize(), 2)
+        self.assertEqual(handler.dropped, 3)
+
+
+class PlayersETagTests(TestCase):
+    urls = ("/api/baseball/players/by-hits/", "/api/baseball/players/export/")
+
+    def setUp(self):
+        caches["players"].clear()
+        self.player = Player.objects.create(name="A", position="C", hits=10)
+
+    def test_matching_if_none_match_gets_304(self):
+        for url in self.urls:
+            with self.subTest(url=url):
+                etag = self.client.get(url)["ETag"]
+                # Only the data version is read, and it is cached by now
+                with self.assertNumQueries(0):
+                    response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+                self.assertEqual(response.status_code, 304)
+                self.assertEqual(response["ETag"], etag)
+
+    def test_compressed_weak_etag_still_matches(self):
+        url = f"{self.urls[0]}?limit=1"
+        for i in range(10):
+            Player.objects.create(name=f"Player {i}", position="C", hits=i)
+        etag = self.client.get(url, HTTP_ACCEPT_ENCODING="gzip")["ETag"]
+        self.assertTrue(etag.startswith("W/"))
+        response = self.client.get(
+            url, HTTP_ACCEPT_ENCODING="gzip", HTTP_IF_NONE_MATCH=etag
+        )
+        self.assertEqual(response.status_code, 304)
+
+    def test_etag_differs_per_query(self):
+        tags = {self.client.get(f"{self.urls[0]}?limit={n}")["ETag"] for n in (1, 2)}
+        self.assertEqual(len(tags), 2)
+
+    def test_etag_changes_after_save(self):
+        before = self.client.get(self.urls[0])["ETag"]
+        with self.captureOnCommitCallbacks(execute=True):
+            self.player.hits = 11
+            self.player.save()
+        response = self.client.get(self.urls[0], HTTP_IF_NONE_MATCH=before)
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response["ETag"], before)
+
+    def test_etag_changes_after_load_players(self):
+        before = self.client.get(self.urls[0])["ETag"]
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, "feed.json")
+            with open(path, "w") as f:
+                json.dump([{"Player name": "B", "Hits": 5}], f)
+            with self.captureOnCommitCallbacks(execute=True):
+                call_command("load_players", path, stdout=io.StringIO())
+        self.assertNotEqual(self.client.get(self.urls[0])["ETag"], before)
+
+
+class ResponseCacheTests(TestCase):
+    def setUp(self):
+        caches["players"].clear()
+        self.player = Player.objects.create(name="A", position="C", hits=10)
+
+    def counts(self, kind="test"):
+        stats = response_cache.stats()
+        return stats.get(f"{kind}_hits", 0), stats.get(f"{kind}_misses", 0)
+
+    def test_miss_then_hit(self):
+        build = mock.Mock(return_value={"players": []})
+        hits, misses = self.counts()
+        for _ in range(3):
+            self.assertEqual(
+                response_cache.get_or_build("test", "q=1", build), {"players": []}
+            )
+        build.assert_called_once()
+        self.assertEqual(self.counts(), (hits + 2, misses + 1))
+        # Another key is another entry
+        response_cache.get_or_build("test", "q=2", build)
+        self.assertEqual(build.call_count, 2)
+
+    def test_failed_build_is_not_cached(self):
+        build = mock.Mock(side_effect=[ValueError("boom"), {"ok": True}])
+        with self.assertRaises(ValueError):
+            response_cache.get_or_build("test", "", build)
+        self.assertEqual(response_cache.get_or_build("test", "", build), {"ok": True})
+
+    def test_write_invalidates_cached_pages(self):
+        url = "/api/baseball/players/by-hits/"
+        self.assertEqual(self.client.get(url).json()["players"][0]["hits"], 10)
+        with self.captureOnCommitCallbacks(execute=True):
+            self.player.hits = 11
+            self.player.save()
+        self.assertEqual(self.client.get(url).json()["players"][0]["hits"], 11)
+
+    def test_cache_stats_endpoint(self):
+        url = "/api/baseball/players/by-hits/?limit=7"
+        hits, misses = self.counts("list")
+        self.client.get(url)
+        self.client.get(url)
+        stats = self.client.get("/api/baseball/players/cache-stats/").json()
+        self.assertEqual(stats["list_hits"], hits + 1)
+        self.assertEqual(stats["list_misses"], misses + 1)
+
+
+class HitsKeysetPaginationTests(TestCase):
+    url = "/api/baseball/players/by-hits/"
+
+    def setUp(self):
+        caches["players"].clear()
+        for i, hits in enumerate([10, None, 5, 10, None, 10, 0, None]):
+            Player.objects.create(name=f"Player {i}", position="C", hits=hits)
+        # Hits descending, players without hits last, ties by id descending
+        self.expected = [
+            p.pk
+            for p in sorted(
+                Player.objects.all(),
+                key=lambda p: (p.hits is not None, p.hits or 0, p.pk),
+                reverse=True,
+            )
+        ]
+
+    def walk(self, url):
+        ids, pages = [], 0
+        while url:
+            response = self.client.get(url)
+            self.assertEqual(response.status_code, 200)
+            ids += [p["id"] for p in response.json()["players"]]
+            url = response.json()["next"]
+            pages += 1
+        return ids, pages
+
+    def test_pages_cover_ties_and_players_without_hits(self):
+        for fast in (True, False):
+            for limit in (1, 2, 3, 5, 100):
+                with self.subTest(fast=fast, limit=limit), mock.patch.object(
+                    PlayersByHitsAPIView, "use_fast_serializer", fast
+                ):
+                    caches["players"].clear()
+                    ids, pages = self.walk(f"{self.url}?limit={limit}")
+                    self.assertEqual(ids, self.expected)
+                    self.assertEqual(pages, -(-len(self.expected) // limit))
+
+    def test_seek_is_a_range_on_hits(self):
+        position = HitsKeysetPagination._after(10, self.expected[1])
+        sql = str(Player.objects.filter(position).query)
+        self.assertIn('"hits" <= 10', sql)
+
+    def test_invalid_cursor_is_rejected(self):
+        for cursor in ("not-base64!", "Zm9v", "YTpi"):
+            with self.subTest(cursor=cursor):
+                response = self.client.get(f"{self.url}?cursor={cursor}")
+                self.assertEqual(response.status_code, 400)
+                self.assertEqual(response.json()["error"], "Invalid cursor")
+
+    def test_invalid_limit_is_rejected(self):
+        for limit in ("x", "0"):
+            with self.subTest(limit=limit):
+                response = self.client.get(f"{self.url}?limit={limit}")
+                self.assertEqual(response.status_code, 400)
+
+    def test_fields_projection(self):
+        response = self.client.get(f"{self.url}?limit=4&fields=name")
+        players = response.json()["players"]
+        self.assertEqual([set(p) for p in players], [{"id", "name"}] * 4)
+        # The cursor still carries hits even though they aren't returned
+        ids, _ = self.walk(response.json()["next"])
+        self.assertEqual([p["id"] for p in players] + ids, self.expected)
+
+    def test_unknown_field_is_rejected(self):
+        response = self.client.get(f"{self.url}?fields=name,salary")
+        self.assertEqual(response.status_code, 400)
+
+
+class PlayerExportTests(TestCase):
+    url = "/api/baseball/players/export/"
+
+    def setUp(self):
+        Player.objects.create(
+            name="José Ramírez",
+            position="3B",
+            hits=1500,
+            batting_average="0.278",
+            on_base_plus_slugging="0.850",
+        )
+        Player.objects.create(name="Nobody")
+        Player.objects.create(name="Ty Cobb", position="CF", hits=4189)
+
+    def expected(self, fields=None):
+        data = PlayerSerializer(
+            Player.objects.order_by("id"), many=True, fields=fields
+        ).data
+        return json.loads(JSONRenderer().render(data))
+
+    def body(self, response):
+        self.assertTrue(response.streaming)
+        return b"".join(response.streaming_content).decode()
+
+    def test_ndjson_matches_player_serializer(self):
+        response = self.client.get(self.url)
+        self.assertEqual(response["Content-Type"], "application/x-ndjson")
+        lines = self.body(response).splitlines()
+        self.assertEqual([json.loads(line) for line in lines], self.expected())
+
+    def test_json_array_matches_player_serializer(self):
+        response = self.client.get(f"{self.url}?output=json")
+        self.assertEqual(response["Content-Type"], "application/json")
+        self.assertEqual(json.loads(self.body(response)), self.expected())
+
+    def test_chunks_join_into_valid_output(self):
+        fields = export.EXPORT_FIELDS
+        for streamer in (export.stream_ndjson, export.stream_json_array):
+            with self.subTest(streamer=streamer.__name__):
+                chunks = list(streamer(export.iter_rows(fields), fields, batch_size=2))
+                text = "".join(chunks)
+                if streamer is export.stream_ndjson:
+                    data = [json.loads(line) for line in text.splitlines()]
+                else:
+                    data = json.loads(text)
+                self.assertEqual(data, self.expected())
+
+    def test_fields_projection(self):
+        for output in ("ndjson", "json"):
+            with self.subTest(output=output):
+                response = self.client.get(
+                    f"{self.url}?output={output}&fields=name,hits"
+                )
+                body = self.body(response)
+                data = (
+                    [json.loads(line) for line in body.splitlines()]
+                    if output == "ndjson"
+                    else json.loads(body)
+                )
+                self.assertEqual(data, self.expected(["id", "name", "hits"]))
+
+    def test_bad_output_and_fields_are_rejected(self):
+        response = self.client.get(f"{self.url}?output=bad")
+        self.assertEqual(response.status_code, 400)
+        self.assertIn("ndjson", response.json()["error"])
+        response = self.client.get(f"{self.url}?fields=salary")
+        self.assertEqual(response.status_code, 400)
+
+    def test_empty_table(self):
+        Player.objects.all().delete()
+        self.assertEqual(self.body(self.client.get(f"{self.url}?output=json")), "[]")
+        self.assertEqual(self.body(self.client.get(self.url)), "")
+
+    async def test_asgi_streams_chunk_by_chunk(self):
+        await Player.objects.abulk_create(
+            Player(name=f"Player {i}", hits=i) for i in range(1200)
+        )
+        response = await self.async_client.get(f"{self.url}?output=json")
+        self.assertTrue(response.is_async)
+        with warnings.catch_warnings():
+            # Django warns when it has to read a sync iterator whole
+            warnings.simplefilter("error")
+            chunks = [chunk async for chunk in response.streaming_content]
+        # "[", three batches of 500 rows or less, "]"
+        self.assertEqual(len(chunks), 5)
+        data = json.loads(b"".join(chunks))
+        self.assertEqual(len(data), 1203)
+        self.assertEqual(data[0]["name"], "José Ramírez")
+
+
+class LoadPlayersTests(TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmp.cleanup)
+
+    def feed(self, text, name="feed.json"):
+        path = os.path.join(self.tmp.name, name)
+        with open(path, "w") as f:
+            f.write(text)
+        return path
+
+    def load(self, path, *args):
+        out, err = io.StringIO(), io.StringIO()
+        call_command("load_players", path, *args, stdout=out, stderr=err)
+        return out.getvalue(), err.getvalue()
+
+    def test_bad_values_skip_their_entry_only(self):
+        entries = [
+            {"Player name": "Good", "Hits": 10, "Games": 12.0, "AVG": "0.2781"},
+            {"Player name": "Bad hits", "Hits": "lots"},
+            {"Player name": "Negative", "Games": -1},
+            {"Player name": "Bad AVG", "AVG": "x"},
+            {"Player name": "Huge OPS", "On-base Plus Slugging": 12345.6},
+            {"Player name": "Also good", "position": "SS", "Hits": ""},
+        ]
+        out, err = self.load(self.feed(json.dumps(entries)))
+        self.assertIn("Created: 2,", out)
+        self.assertIn("Errors: 4", out)
+        self.assertIn("invalid hits 'lots'", err)
+        good = Player.objects.get(name="Good")
+        self.assertEqual((good.hits, good.games), (10, 12))
+        self.assertEqual(good.batting_average, Decimal("0.278"))
+        self.assertIsNone(Player.objects.get(name="Also good").hits)
+
+    def test_records_split_across_chunks(self):
+        records = [{"Player name": f"José {i}", "Hits": i} for i in range(5)]
+        feeds = {
+            "array": json.dumps(records, ensure_ascii=False, indent=1),
+            "ndjson": "\n".join(json.dumps(r, ensure_ascii=False) for r in records),
+        }
+        for kind, text in feeds.items():
+            data = text.encode()
+            for size in (1, 2, 3, 7, len(data)):
+                with self.subTest(kind=kind, size=size):
+                    chunks = (data[i : i + size] for i in range(0, len(data), size))
+                    self.assertEqual(list(load_players.iter_records(chunks)), records)
+
+    def test_truncated_input_raises(self):
+        for text in ('[{"Hits": 1}, {"Hits"', '[{"Hits": 1}', '{"Hits": 1}\n{"Hi'):
+            with self.subTest(text=text):
+                with self.assertRaises(ValueError):
+                    list(load_players.iter_records([text.encode()]))
+
+    def test_resumes_after_a_failed_batch(self):
+        entries = [{"Player name": f"Player {i}", "Hits": i} for i in range(5)]
+        path = self.feed("\n".join(json.dumps(e) for e in entries), "feed.ndjson")
+        checkpoint = os.path.join(self.tmp.name, "checkpoint.json")
+        write_batch = load_players.write_batch
+        calls = []
+
+        def fail_second(rows, **kwargs):
+            calls.append(len(rows))
+            if len(calls) == 2:
+                raise RuntimeError("connection lost")
+            return write_batch(rows, **kwargs)
+
+        with mock.patch.object(load_players, "write_batch", fail_second):
+            _, err = self.load(path, "--batch-size", "2", "--checkpoint", checkpoint)
+        self.assertIn("Failed after 2 records", err)
+        self.assertEqual(Player.objects.count(), 2)
+
+        out, _ = self.load(path, "--batch-size", "2", "--checkpoint", checkpoint)
+        self.assertIn("Resuming after 2 records", out)
+        self.assertIn("Created: 3,", out)
+        self.assertEqual(Player.objects.count(), 5)
+        self.assertFalse(os.path.exists(checkpoint))
+
+
+class CircuitBreakerTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.breaker = CircuitBreaker("test", min_calls=2, open_seconds=30)
+
+    def later(self):
+        return mock.patch("baseball.breaker.time.time", return_value=time.time() + 31)
+
+    async def test_opens_after_failure_rate_reached(self):
+        await self.breaker.arecord_success(0.1)
+        self.assertTrue(await self.breaker.aallow())
+        await self.breaker.arecord_failure()
+        self.assertEqual(await self.breaker.astate(), "open")
+        self.assertFalse(await self.breaker.aallow())
+
+    async def test_slow_calls_count_as_failures(self):
+        await self.breaker.arecord_success(10)
+        await self.breaker.arecord_success(10)
+        self.assertEqual(await self.breaker.astate(), "open")
+
+    async def test_half_open_lets_one_probe_through(self):
+        await self.breaker.arecord_failure()
+        await self.breaker.arecord_failure()
+        with self.later():
+            self.assertEqual(await self.breaker.astate(), "half-open")
+            ticket = await self.breaker.aallow()
+            self.assertTrue(ticket)
+            self.assertFalse(await self.breaker.aallow())
+            await self.breaker.arecord_success(0.1, ticket)
+        self.assertEqual(await self.breaker.astate(), "closed")
+        self.assertTrue(await self.breaker.aallow())
+
+    async def test_only_the_probe_closes_the_circuit(self):
+        # Started while closed, finishes after the circuit opened
+        late = await self.breaker.aallow()
+        await self.breaker.arecord_failure()
+        await self.breaker.arecord_failure()
+        await self.breaker.arecord_success(0.1, late)
+        self.assertEqual(await self.breaker.astate(), "open")
+        with self.later():
+            ticket = await self.breaker.aallow()
+            await self.breaker.arecord_success(0.1, late)
+            self.assertEqual(await self.breaker.astate(), "half-open")
+            await self.breaker.arecord_failure(ticket)
+            self.assertEqual(await self.breaker.astate(), "open")
+
+
+class FastPlayerSerializerTests(TestCase):
+    def setUp(self):
+        caches["players"].clear()
+        Player.objects.create(
+            name="Ty Cobb",
+            position="CF",
+            games=3035,
+            at_bat=11434,
+            hits=4189,
+            batting_average="0.366",
+            on_base_percentage="0.433",
+            slugging_percentage="0.512",
+            on_base_plus_slugging="0.945",
+        )
+        Player.objects.create(name="Nobody")
+        Player.objects.create(
+            name="Edge Case",
+            hits=0,
+            batting_average="0",
+            on_base_percentage="0.999",
+            on_base_plus_slugging="10.000",
+        )
+
+    def assertSameJSON(self, fields=None):
+        qs = Player.objects.order_by("id")
+        slow = PlayerSerializer(qs, many=True, fields=fields).data
+        fast_serializer = FastPlayerSerializer(fields)
+        fast = fast_serializer.many(fast_serializer.values(qs))
+        self.assertEqual(JSONRenderer().render(fast), JSONRenderer().render(slow))
+
+    def test_all_fields_match_player_serializer(self):
+        self.assertSameJSON()
+
+    def test_projections_match_player_serializer(self):
+        for fields in (["id", "name"], ["id", "batting_average", "hits"]):
+            with self.subTest(fields=fields):
+                self.assertSameJSON(fields)
+
+    def test_json_safe_output_matches_rendered_json(self):
+        qs = Player.objects.order_by("id")
+        fast_serializer = FastPlayerSerializer(json_safe=True)
+        fast = fast_serializer.many(fast_serializer.values(qs))
+        slow = PlayerSerializer(qs, many=True).data
+        self.assertEqual(
+            json.dumps(fast, separators=(",", ":")).encode(),
+            JSONRenderer().render(slow),
+        )
+
+    def test_list_endpoint_is_identical_on_both_paths(self):
+        url = "/api/baseball/players/by-hits/?limit=2"
+        bodies = []
+        for fast in (True, False):
+            caches["players"].clear()
+            with mock.patch.object(PlayersByHitsAPIView, "use_fast_serializer", fast):
+                pages, next_url = [], url
+                while next_url:
+                    response = self.client.get(next_url)
+                    pages.append(response.content)
+                    next_url = response.json()["next"]
+            bodies.append(pages)
+        self.assertEqual(bodies[0], bodies[1])
+
+    def test_bench_serializers_smoke(self):
+        out = io.StringIO()
+        call_command("bench_serializers", "--rows", "3", "--repeat", "1", stdout=out)
+        self.assertIn("Identical output: True", out.getvalue())
+        # The synthetic rows are rolled back
+        self.assertEqual(Player.objects.count(), 3)
+
+
+class FastJSONRendererTests(TestCase):
+    def test_matches_stock_renderer(self):
+        Player.objects.create(name="José Ramírez", hits=1500, batting_average="0.278")
+        Player.objects.create(name="Nobody")
+        data = {"players": PlayerSerializer(Player.objects.all(), many=True).data}
+        self.assertEqual(FastJSONRenderer().render(data), JSONRenderer().render(data))
+
+    def test_list_endpoint_compresses_when_accepted(self):
+        for i in range(20):
+            Player.objects.create(name=f"Player {i}", hits=i)
+        caches["players"].clear()
+        response = self.client.get(
+            "/api/baseball/players/by-hits/", HTTP_ACCEPT_ENCODING="gzip"
+        )
+        self.assertIn(response["Content-Encoding"], ("gzip", "br"))
+        self.assertIn("Accept-Encoding", response["Vary"])
+
+    def test_endpoints_render_without_the_fallback(self):
+        player = Player.objects.create(
+            name="Ty Cobb",
+            position="CF",
+            hits=4189,
+            batting_average="0.366",
+            on_base_plus_slugging="0.945",
+        )
+        rankings.refresh()
+        urls = [
+            "/api/baseball/players/by-hits/",
+            "/api/baseball/players/leaderboard/",
+            "/api/baseball/players/search/?q=cobb",
+            "/api/baseball/players/limits/",
+            f"/api/baseball/players/{player.pk}/",
+            f"/api/baseball/players/{player.pk}/rankings/",
+        ]
+        with mock.patch(
+            "baseball.renderers._fallback", side_effect=renderers._fallback
+        ) as fallback:
+            for fast in (True, False):
+                caches["players"].clear()
+                with mock.patch.object(
+                    PlayersByHitsAPIView, "use_fast_serializer", fast
+                ):
+                    for url in urls:
+                        with self.subTest(url=url, fast=fast):
+                            self.assertEqual(self.client.get(url).status_code, 200)
+        fallback.assert_not_called()
+        data = self.client.get(f"/api/baseball/players/{player.pk}/").json()
+        self.assertEqual(data["batting_average"], 0.366)
+
+    def test_bench_renderers_smoke(self):
+        out = io.StringIO()
+        call_command("bench_renderers", "--sizes", "3", "--repeat", "1", stdout=out)
+        self.assertIn("FastJSONRenderer, float", out.getvalue())
+        self.assertIn("gzip (level 6)", out.getvalue())
+
+
+class LeaderboardTests(TestCase):
+    def setUp(self):
+        caches["players"].clear()
+        Player.objects.create(name="A", position="SS", hits=100, home_runs=10)
+        Player.objects.create(name="B", position="CF", hits=300, home_runs=5)
+        Player.objects.create(name="C", position="SS", hits=200, home_runs=30)
+        Player.objects.create(name="D", position="SS", home_runs=40)
+
+    def names(self, query):
+        response = self.client.get(f"/api/baseball/players/leaderboard/?{query}")
+        self.assertEqual(response.status_code, 200)
+        return [p["name"] for p in response.json()["players"]]
+
+    def test_sorts_filters_and_limits(self):
+        self.assertEqual(self.names("stat=hits"), ["B", "C", "A"])
+        self.assertEqual(self.names("stat=hits&order=asc&limit=2"), ["A", "C"])
+        self.assertEqual(self.names("stat=home_runs&position=SS"), ["D", "C", "A"])
+        self.assertEqual(
+            self.names("stat=home_runs&min_hits=150&max_home_runs=30"), ["C", "B"]
+        )
+
+    def test_rejects_unknown_stat(self):
+        for query in ("stat=name", "min_bogus=1", "min_hits=x", "limit=0"):
+            with self.subTest(query=query):
+                response = self.client.get(
+                    f"/api/baseball/players/leaderboard/?{query}"
+                )
+                self.assertEqual(response.status_code, 400)
+
+    def test_top_n_is_an_index_scan(self):
+        for stat in leaderboard.STATS:
+            for order in ("desc", "asc"):
+                with self.subTest(stat=stat, order=order):
+                    qs = leaderboard.leaderboard_queryset(
+                        {"stat": stat, "order": order}
+                    )
+                    if connection.vendor == "postgresql":
+                        with connection.cursor() as cursor:
+                            cursor.execute("SET LOCAL enable_seqscan = off")
+                        plan = qs.explain()
+                        self.assertIn("Index", plan)
+                        self.assertNotIn("Sort", plan)
+                    else:
+                        plan = qs.explain()
+                        self.assertNotIn("TEMP B-TREE", plan)
+                    self.assertIn(leaderboard.index_name(stat), plan)
+
+
+class PlayerRankTests(TestCase):
+    def setUp(self):
+        caches["players"].clear()
+        self.a = Player.objects.create(name="A", position="SS", hits=100)
+        self.b = Player.objects.create(name="B", position="CF", hits=300)
+        self.c = Player.objects.create(name="C", position="SS", hits=200)
+        Player.objects.create(name="D", position="SS")
+        rankings.refresh()
+
+    def ranks(self, player):
+        response = self.client.get(f"/api/baseball/players/{player.pk}/rankings/")
+        self.assertEqual(response.status_code, 200)
+        return response.json()
+
+    def test_overall_and_position_ranks(self):
+        data = self.ranks(self.c)
+        self.assertEqual(
+            data["overall"]["hits"], {"rank": 2, "total": 3, "percentile": 50.0}
+        )
+        self.assertEqual(
+            data["by_position"]["hits"], {"rank": 1, "total": 2, "percentile": 100.0}
+        )
+        self.assertNotIn("home_runs", data["overall"])
+
+    def test_update_refreshes_affected_groups(self):
+        payload = {f: getattr(self.a, f) for f in PlayerUpdateSerializer.Meta.fields}
+        payload.update(position="CF", hits=250)
+        with self.captureOnCommitCallbacks(execute=True):
+            response = self.client.put(
+                f"/api/baseball/players/{self.a.pk}/update/",
+                data=json.dumps({k: v for k, v in payload.items() if v is not None}),
+                content_type="application/json",
+            )
+        self.assertEqual(response.status_code, 200, response.content)
+        caches["players"].clear()
+        self.assertEqual(self.ranks(self.a)["by_position"]["hits"]["rank"], 2)
+        self.assertEqual(self.ranks(self.a)["overall"]["hits"]["rank"], 2)
+        self.assertEqual(self.ranks(self.c)["by_position"]["hits"]["total"], 1)
+        self.assertFalse(PlayerRank.objects.filter(player=self.a, scope="SS").exists())
+
+    def table(self):
+        ranks = PlayerRank.objects.values_list(
+            "player_id", "stat", "scope", "value", "rank"
+        )
+        totals = RankGroup.objects.filter(total__gt=0).values_list(
+            "stat", "scope", "total"
+        )
+        return set(ranks), set(totals)
+
+    def edit(self, player, **values):
+        before = rankings.snapshot(player)
+        for attr, value in values.items():
+            setattr(player, attr, value)
+        player.save()
+        with CaptureQueriesContext(connection) as queries:
+            moved = rankings.refresh_player(player, before)
+        self.assertLessEqual(len(queries), rankings.query_allowance(moved))
+
+    def test_incremental_updates_match_a_full_refresh(self):
+        d = Player.objects.get(name="D")
+        e = Player.objects.create(name="E", position="CF", hits=200, walks=10)
+        rankings.refresh()
+        steps = [
+            (self.a, {"hits": 250}),  # up past C
+            (self.a, {"hits": 200}),  # tie with C and E
+            (self.b, {"hits": 50}),  # down to the bottom
+            (d, {"hits": 200}),  # joins, tied
+            (self.c, {"hits": None}),  # leaves
+            (e, {"position": "SS"}),  # changes group
+            (self.a, {"position": "", "walks": 10}),  # leaves its position
+            (self.b, {"hits": 400, "position": "SS", "walks": 3}),
+            (self.c, {"hits": 1, "batting_average": Decimal("0.250")}),
+        ]
+        for player, values in steps:
+            self.edit(player, **values)
+            incremental = self.table()
+            rankings.refresh()
+            self.assertEqual(incremental, self.table(), (player.name, values))
+
+        with self.captureOnCommitCallbacks(execute=True):
+            e.delete()
+        incremental = self.table()
+        rankings.refresh()
+        self.assertEqual(incremental, self.table())
+
+    def test_percentile_is_the_share_not_ranked_above(self):
+        self.assertEqual(rankings.percentile(1, 1), 100.0)
+        self.assertEqual(rankings.percentile(1, 3), 100.0)
+        self.assertEqual(rankings.percentile(3, 3), 0.0)
+        # 1/6 and 5/8 of the rest, rounded half up
+        self.assertEqual(rankings.percentile(6, 7), 16.7)
+        self.assertEqual(rankings.percentile(4, 9), 62.5)
+
+    def test_unknown_player(self):
+        response = self.client.get("/api/baseball/players/999/rankings/")
+        self.assertEqual(response.status_code, 404)
+
+
+class DerivedStatsTests(TestCase):
+    def test_flags_rates_that_disagree_with_counting_stats(self):
+        # AB, H, 2B, 3B, HR, OBP, AVG, SLG, OPS
+        rows = [
+            (500, 150, 30, 5, 20, 0.380, 0.300, 0.500, 0.880),  # consistent
+            (500, 150, 30, 5, 20, 0.380, 0.320, 0.500, 0.900),  # AVG, OPS off
+            (0, 0, 0, 0, 0, None, None, None, None),  # nothing to check
+        ]
+        masks = derived.check(derived.to_arrays(rows))
+        self.assertEqual(masks["batting_average"].tolist(), [False, True, False])
+        self.assertEqual(masks["slugging_percentage"].tolist(), [False, False, False])
+        self.assertEqual(masks["on_base_plus_slugging"].tolist(), [False, True, False])
+
+    def test_backfill_fills_missing_rates_only(self):
+        rows = [
+            {
+                "name": "A",
+                "at_bat": 400,
+                "hits": 124,
+                "doubles": 20,
+                "triples": 1,
+                "home_runs": 10,
+                "on_base_percentage": "0.350",
+                "batting_average": "0.250",
+            }
+        ]
+        problems = derived.backfill(rows)
+        self.assertEqual(rows[0]["slugging_percentage"], Decimal("0.440"))
+        self.assertEqual(rows[0]["on_base_plus_slugging"], Decimal("0.790"))
+        self.assertEqual(
+            [(field, stored) for _, field, stored, _ in problems],
+            [("batting_average", "0.250")],
+        )
+
+    def test_check_rates_lists_inconsistent_players(self):
+        stats = dict(at_bat=500, hits=150, doubles=30, triples=5, home_runs=20)
+        Player.objects.create(
+            name="Right",
+            on_base_percentage="0.380",
+            batting_average="0.300",
+            slugging_percentage="0.500",
+            on_base_plus_slugging="0.880",
+            **stats,
+        )
+        Player.objects.create(
+            name="Wrong",
+            on_base_percentage="0.380",
+            batting_average="0.320",
+            slugging_percentage="0.500",
+            on_base_plus_slugging="0.880",
+            **stats,
+        )
+        out = io.StringIO()
+        call_command("check_rates", "--limit", "5", stdout=out)
+        lines = out.getvalue().splitlines()
+        self.assertTrue(lines[0].startswith("Wrong (id "))
+        self.assertIn("batting_average 0.320 != 0.300", lines[0])
+        self.assertIn("1 of 2 players inconsistent", lines[1])
+
+    def test_bench_derived_smoke(self):
+        out = io.StringIO()
+        call_command(
+            "bench_derived", "--sizes", "3", "--repeat", "1", "--python", stdout=out
+        )
+        self.assertIn("3 rows: compute + check", out.getvalue())
+        self.assertIn("python loop (AVG only)", out.getvalue())
+
+
+class PlayerLimitsTests(TestCase):
+    def setUp(self):
+        caches["players"].clear()
+        self.player = Player.objects.create(
+            name="A", position="SS", hits=100, batting_average="0.250"
+        )
+        Player.objects.create(name="B", hits=300, batting_average="0.310")
+
+    def update(self, **fields):
+        return self.client.put(
+            f"/api/baseball/players/{self.player.pk}/update/",
+            data=json.dumps({"position": "SS", **fields}),
+            content_type="application/json",
+        )
+
+    def test_endpoint_serves_hard_and_observed_bounds(self):
+        data = self.client.get("/api/baseball/players/limits/").json()
+        self.assertEqual(data["int_fields"]["hits"], [0, limits.MAX_INT])
+        self.assertEqual(data["float_fields"]["batting_average"], [0.0, 1.0])
+        self.assertEqual(data["float_fields"]["slugging_percentage"], [0.0, 4.0])
+        self.assertEqual(data["observed"]["hits"], [100, 300])
+        self.assertEqual(data["observed"]["games"], [None, None])
+        self.assertEqual(data["observed"]["batting_average"], [0.25, 0.31])
+        self.assertNotIn("runs", data["int_fields"])
+        # Served from cache, across writes
+        self.update(hits=150)
+        with self.assertNumQueries(0):
+            limits.observed()
+
+    def test_update_is_validated_against_hard_limits(self):
+        self.assertEqual(self.update(hits=301).status_code, 200)
+        self.assertEqual(self.update(batting_average="1.000").status_code, 200)
+        response = self.update(batting_average="1.001")
+        self.assertEqual(response.status_code, 400)
+        self.assertIn(
+            "between 0.000 and 1.000",
+            response.json()["errors"]["batting_average"][0],
+        )
+        self.assertEqual(self.update(hits=-1).status_code, 400)
+
+    def test_writes_widen_observed_bounds_without_recomputing(self):
+        limits.observed()
+        self.assertEqual(self.update(hits=5000).status_code, 200)
+        # The former record holder edited down doesn't narrow them
+        other = Player.objects.get(name="B")
+        other.hits = 50
+        other.save()
+        response = self.client.patch(
+            "/api/baseball/players/bulk-update/",
+            data=json.dumps([{"id": other.pk, "batting_average": "0.400"}]),
+            content_type="application/json",
+        )
+        self.assertEqual(response.json()["updated"], [other.pk])
+        with self.assertNumQueries(0):
+            observed = limits.observed()
+        self.assertEqual(observed["hits"], (50, 5000))
+        self.assertEqual(
+            observed["batting_average"], (Decimal("0.250"), Decimal("0.400"))
+        )
+
+        # load_players recomputes them from the table
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, "feed.json")
+            with open(path, "w") as f:
+                json.dump([{"Player name": "A", "Hits": 120}], f)
+            with self.captureOnCommitCallbacks(execute=True):
+                call_command("load_players", path, stdout=io.StringIO())
+        self.assertEqual(limits.observed()["hits"], (50, 120))
+
+
+class PlayerBulkUpdateTests(TestCase):
+    url = "/api/baseball/players/bulk-update/"
+
+    def setUp(self):
+        caches["players"].clear()
+        Player.objects.bulk_create(
+            Player(name=f"P{i}", position="SS", hits=100 + i) for i in range(200)
+        )
+        self.ids = list(Player.objects.order_by("id").values_list("id", flat=True))
+
+    def patch(self, items):
+        return self.client.patch(
+            self.url, data=json.dumps(items), content_type="application/json"
+        )
+
+    def test_valid_items_are_written_and_errors_reported(self):
+        a, b, c = self.ids[:3]
+        response = self.patch(
+            [
+                {"id": a, "hits": 250, "position": "CF"},
+                {"id": b, "hits": -5},
+                {"id": 999999, "hits": 150},
+                {"id": c, "hits": 102},  # unchanged
+                {"hits": 150},
+            ]
+        )
+        self.assertEqual(response.status_code, 200)
+        data = response.json()
+        self.assertEqual(data["updated"], [a])
+        self.assertEqual([e["index"] for e in data["errors"]], [1, 2, 4])
+        self.assertIn("hits", data["errors"][0]["errors"])
+        player = Player.objects.get(pk=a)
+        self.assertEqual((player.hits, player.position), (250, "CF"))
+        stored_hash = player.stats_hash
+        player.update_stats_hash()
+        self.assertEqual(stored_hash, player.stats_hash)
+        self.assertEqual(Player.objects.get(pk=b).hits, 101)
+
+    def test_query_count_does_not_grow_with_batch_size(self):
+        rankings.refresh()
+        counts = []
+        # The first request also creates the version row and fills caches.
+        # 90 players keep the 180 rank rows in one statement on SQLite.
+        for size, offset in ((10, 0), (10, 10), (90, 20)):
+            items = [
+                {"id": pk, "hits": 299 - i}
+                for i, pk in enumerate(self.ids[offset : offset + size])
+            ]
+            with CaptureQueriesContext(connection) as queries:
+                response = self.patch(items)
+            self.assertEqual(len(response.json()["updated"]), size)
+            counts.append(len(queries))
+        self.assertEqual(counts[1], counts[2])
+
+    def test_large_batch_stays_within_budget(self):
+        rankings.refresh()
+        # SQLite splits these writes in several statements, allowed for
+        items = [{"id": pk, "hits": 50 + i} for i, pk in enumerate(self.ids)]
+        response = self.patch(items)
+        self.assertEqual(len(response.json()["updated"]), len(self.ids))
+        self.assertEqual(
+            rankings.player_ranks(self.ids[0])["overall"]["hits"]["rank"],
+            len(self.ids),
+        )
+
+    def test_ranks_follow_the_batch(self):
+        rankings.refresh()
+        items = [
+            {"id": self.ids[0], "hits": 250},
+            {"id": self.ids[1], "hits": 250, "position": "CF"},
+            {"id": self.ids[2], "hits": 150},
+        ]
+        response = self.patch(items)
+        self.assertEqual(len(response.json()["updated"]), 3)
+        incremental = set(PlayerRank.objects.values_list())
+        rankings.refresh()
+        self.assertEqual(
+            {row[1:] for row in incremental},
+            {row[1:] for row in PlayerRank.objects.values_list()},
+        )
+
+    def test_preflight_allows_patch(self):
+        response = self.client.options(
+            self.url,
+            headers={
+                "Origin": "http://localhost:3000",
+                "Access-Control-Request-Method": "PATCH",
+            },
+        )
+        self.assertIn("PATCH", response["Access-Control-Allow-Methods"])
+        self.assertIn("PUT", response["Access-Control-Allow-Methods"])
+
+
+class PlayerUpdatePreconditionTests(TestCase):
+    def setUp(self):
+        caches["players"].clear()
+        self.player = Player.objects.create(
+            name="A", position="SS", games=100, hits=100
+        )
+        Player.objects.create(name="B", position="SS", games=200, hits=300)
+        self.url = f"/api/baseball/players/{self.player.pk}/update/"
+
+    def etag(self):
+        response = self.client.get(f"/api/baseball/players/{self.player.pk}/")
+        return response["ETag"]
+
+    def put(self, etag=None, **fields):
+        headers = {"If-Match": etag} if etag else {}
+        return self.client.put(
+            self.url,
+            data=json.dumps({"position": "SS", "games": 100, **fields}),
+            content_type="application/json",
+            headers=headers,
+        )
+
+    def test_writes_only_changed_columns(self):
+        etag = self.etag()
+        with CaptureQueriesContext(connection) as queries:
+            response = self.put(etag=etag, hits=150)
+        self.assertEqual(response.status_code, 200)
+        updates = [
+            q["sql"] for q in queries if q["sql"].startswith('UPDATE "baseball_player"')
+        ]
+        self.assertEqual(len(updates), 1)
+        self.assertIn('"hits"', updates[0])
+        self.assertNotIn('"games"', updates[0])
+        self.assertNotEqual(response["ETag"], etag)
+
+    def test_stale_etag_is_rejected(self):
+        etag = self.etag()
+        self.assertEqual(self.put(etag=etag, hits=150).status_code, 200)
+        response = self.put(etag=etag, hits=200)
+        self.assertEqual(response.status_code, 412)
+        self.assertEqual(Player.objects.get(pk=self.player.pk).hits, 150)
+
+    def test_tag_weakened_by_compression_still_matches(self):
+        response = self.client.get(
+            f"/api/baseball/players/{self.player.pk}/",
+            headers={"Accept-Encoding": "gzip, deflate, br"},
+        )
+        self.assertTrue(response["ETag"].startswith('W/"player-'), response["ETag"])
+        self.assertEqual(self.put(etag=response["ETag"], hits=150).status_code, 200)
+        self.assertEqual(self.put(etag=response["ETag"], hits=200).status_code, 412)
+
+    def test_cross_origin_clients_can_send_if_match(self):
+        origin = {"Origin": "http://localhost:3000"}
+        response = self.client.options(
+            self.url,
+            headers={
+                **origin,
+                "Access-Control-Request-Method": "PUT",
+                "Access-Control-Request-Headers": "content-type, if-match",
+            },
+        )
+        self.assertIn("If-Match", response["Access-Control-Allow-Headers"])
+        response = self.client.get(
+            f"/api/baseball/players/{self.player.pk}/", headers=origin
+        )
+        self.assertEqual(response["Access-Control-Expose-Headers"], "ETag")
+
+    def test_concurrent_write_is_not_overwritten(self):
+        snapshot = rankings.snapshot
+
+        def write_meanwhile(player):
+            Player.objects.filter(pk=player.pk).update(
+                hits=250, updated_at=timezone.now()
+            )
+            return snapshot(player)
+
+        with mock.patch.object(rankings, "snapshot", side_effect=write_meanwhile):
+            response = self.put(hits=150)
+        self.assertEqual(response.status_code, 412)
+        self.assertEqual(Player.objects.get(pk=self.player.pk).hits, 250)
+
+
+class PlayerSearchTests(TestCase):
+    def setUp(self):
+        caches["players"].clear()
+        Player.objects.create(name="Jos Ramrez", position="3B", hits=1500)
+        Player.objects.create(name="Manny Ramirez", position="LF", hits=2574)
+        Player.objects.create(name="Ramon Hernandez", position="C", hits=1500)
+        Player.objects.create(name="Hank Aaron", position="RF", hits=3771)
+
+    def names(self, query):
+        response = self.client.get(f"/api/baseball/players/search/?{query}")
+        self.assertEqual(response.status_code, 200)
+        return [p["name"] for p in response.json()["players"]]
+
+    def test_prefix_ranks_name_starts_before_word_starts(self):
+        self.assertEqual(
+            self.names("q=ram"), ["Ramon Hernandez", "Manny Ramirez", "Jos Ramrez"]
+        )
+        self.assertEqual(self.names("q=ha&fields=name"), ["Hank Aaron"])
+
+    def test_fuzzy_matches_mangled_names(self):
+        self.assertEqual(self.names("q=José Ramírez&mode=fuzzy")[0], "Jos Ramrez")
+        # No prefix match: falls back to fuzzy
+        self.assertIn("Manny Ramirez", self.names("q=Many Ramires"))
+
+    def test_index_follows_renames(self):
+        player = Player.objects.get(name="Hank Aaron")
+        player.name = "Henry Aaron"
+        player.save()
+        self.assertEqual(self.names("q=henry"), ["Henry Aaron"])
+        self.assertEqual(self.names("q=hank"), [])
+
+    def test_prefix_search_uses_the_name_index(self):
+        qs = search.prefix_queryset("ramirez")
+        if connection.vendor == "postgresql":
+            with connection.cursor() as cursor:
+                cursor.execute("SET LOCAL enable_seqscan = off")
+            self.assertIn(search.TRGM_INDEX, qs.explain())
+        else:
+            self.assertIn("VIRTUAL TABLE INDEX", qs.explain())
+
+    def test_short_queries_match_name_starts_through_the_prefix_index(self):
+        self.assertEqual(self.names("q=r"), ["Ramon Hernandez"])
+        self.assertEqual(self.names("q=MA"), ["Manny Ramirez"])
+        # A later word only: no match, and no fuzzy fallback
+        self.assertEqual(self.names("q=aa"), [])
+
+        qs = search.prefix_queryset("ra")
+        if connection.vendor == "postgresql":
+            with connection.cursor() as cursor:
+                cursor.execute("SET LOCAL enable_seqscan = off")
+        self.assertIn(search.PREFIX_INDEX, qs.explain())
+
+    def test_migrate_restores_triggers_dropped_by_a_table_rebuild(self):
+        if connection.vendor != "sqlite":
+            self.skipTest("SQLite search table")
+        with connection.cursor() as cursor:
+            for suffix in search.TRIGGERS:
+                cursor.execute(f"DROP TRIGGER {search.FTS_TABLE}_{suffix}")
+        suzuki = Player.objects.create(name="Ichiro Suzuki", position="RF", hits=3089)
+        self.assertEqual(search.search("ichiro"), [])
+
+        emit_post_migrate_signal(0, False, connection.alias)
+        self.assertEqual(search.search("ichiro"), [(suzuki.pk, 1.0)])
+        two = Player.objects.create(name="Ichiro Two", position="RF", hits=1)
+        self.assertEqual(search.search("ichiro"), [(suzuki.pk, 1.0), (two.pk, 1.0)])
+
+
+class EndpointBenchmarkTests(TestCase):
+    def test_synthetic_players_are_consistent(self):
+        players = list(synthetic.make_players(200, seed=1))
+        rows = [[getattr(p, f) for f in derived.INPUT_FIELDS] for p in players]
+        arrays = derived.to_arrays(rows)
+        for field, mask in derived.check(arrays).items():
+            self.assertFalse(mask.any(), field)
+        for field, (lo, hi) in synthetic.RANGES.items():
+            values = [getattr(p, field) for p in players]
+            self.assertGreaterEqual(min(values), lo, field)
+            self.assertLessEqual(max(values), hi, field)
+
+    def test_bench_endpoints_reports_every_scenario(self):
+        real = Player.objects.create(name="Hank Aaron", position="RF", hits=3771)
+        out = io.StringIO()
+        call_command(
+            "bench_endpoints",
+            sizes=[30],
+            requests=3,
+            llm_delay=0,
+            allow_existing=True,
+            stdout=out,
+            stderr=io.StringIO(),
+        )
+        report = json.loads(out.getvalue())
+        self.assertEqual(report["meta"]["database"], connection.vendor)
+        results = {r["scenario"]: r for r in report["results"]}
+        self.assertEqual(
+            set(results),
+            {
+                "load_players_initial",
+                "load_players_unchanged",
+                "list_uncached",
+                "list_cached",
+                "description",
+                "update",
+            },
+        )
+        for name in ("list_uncached", "list_cached", "description", "update"):
+            self.assertEqual(results[name]["status_codes"], {"200": 3}, name)
+        self.assertEqual(results["description"]["sources"], {"llm": 3})
+        self.assertEqual(results["load_players_unchanged"]["rows"], 30)
+        # Synthetic players are removed and the others ranked among themselves
+        self.assertEqual(list(Player.objects.all()), [real])
+        self.assertEqual(
+            rankings.player_ranks(real.pk)["overall"]["hits"],
+            {"rank": 1, "total": 1, "percentile": 100.0},
+        )
+
+    def test_bench_endpoints_refuses_a_database_with_players(self):
+        Player.objects.create(name="Hank Aaron", position="RF", hits=3771)
+        with self.assertRaisesMessage(CommandError, "--allow-existing"):
+            call_command("bench_endpoints", sizes=[30], requests=1, llm_delay=0)
+        self.assertEqual(Player.objects.count(), 1)
+
+
+class TimingMiddlewareTests(TestCase):
+    def setUp(self):
+        caches["players"].clear()
+        Player.objects.create(name="Hank Aaron", position="RF", hits=3771)
+
+    def count(self, endpoint):
+        body = self.client.get("/api/baseball/metrics/").content.decode()
+        prefix = (
+            f'baseball_request_duration_seconds_count{{endpoint="{endpoint}",'
+            'method="GET"} '
+        )
+        lines = [line for line in body.splitlines() if line.startswith(prefix)]
+        return int(lines[0].split()[-1]) if lines else 0
+
+    @override_settings(REQUEST_TIMING_SAMPLE_RATE=1.0)
+    def test_sampled_request_gets_server_timing(self):
+        response = self.client.get("/api/baseball/players/by-hits/")
+        phases = {
+            part.split(";")[0]: part for part in response["Server-Timing"].split(", ")
+        }
+        self.assertEqual(set(phases), {"db", "serialize", "render", "total"})
+        self.assertRegex(phases["db"], r'^db;dur=[\d.]+;desc="\d+ queries"$')
+
+        body = self.client.get("/api/baseball/metrics/").content.decode()
+        self.assertIn(
+            'baseball_request_phase_seconds_total{endpoint="api/baseball/players/'
+            'by-hits/",method="GET",phase="serialize"}',
+            body,
+        )
+
+    @override_settings(REQUEST_TIMING_SAMPLE_RATE=0.0)
+    def test_unsampled_requests_only_feed_the_histogram(self):
+        endpoint = "api/baseball/players/<int:pk>/"
+        before = self.count(endpoint)
+        response = self.client.get(f"/api/baseball/players/{Player.objects.get().pk}/")
+        self.assertNotIn("Server-Timing", response)
+        self.assertEqual(self.count(endpoint), before + 1)
+
+        response = self.client.get("/api/baseball/metrics/")
+        self.assertTrue(
+            response["Content-Type"].startswith("text/plain; version=0.0.4")
+        )
+        self.assertIn(
+            "# TYPE baseball_request_duration_seconds histogram",
+            response.content.decode(),
+        )
+
+
+@override_settings(QUERY_BUDGET_MODE="raise")
+class QueryBudgetTests(TestCase):
+    def setUp(self):
+        caches["players"].clear()
+        cache.clear()
+        self.players = [
+            Player.objects.create(
+                name=f"Player {i}", position="C", games=100 + i, hits=50 + i
+            )
+            for i in range(5)
+        ]
+
+    def test_budgeted_endpoints_stay_within_budget(self):
+        # Cold paths: no cached page, no stored description, a real change
+        response = self.client.get("/api/baseball/players/by-hits/?limit=2")
+        self.client.get(response.json()["next"])
+        pk = self.players[0].pk
+        with FakeCompletionServer():
+            response = self.client.get(f"/api/baseball/players/{pk}/description/")
+        self.assertEqual(response.json()["source"], "llm")
+        data = {f: None for f in PlayerUpdateSerializer.Meta.fields}
+        data.update(position="SS", games=101, hits=52)
+        response = self.client.put(
+            f"/api/baseball/players/{pk}/update/",
+            data=json.dumps(data),
+            content_type="application/json",
+        )
+        self.assertEqual(response.status_code, 200)
+
+    def test_overrun_fails_with_the_queries_and_their_stacks(self):
+        with mock.patch.object(PlayersByHitsAPIView, "query_budget", 0):
+            with self.assertRaises(budgets.QueryBudgetExceeded) as ctx:
+                self.client.get("/api/baseball/players/by-hits/")
+        message = str(ctx.exception)
+        self.assertIn("ran 3 queries, budget is 0", message)
+        self.assertIn('FROM "baseball_player"', message)
+        self.assertIn("views.py", message)
+
+    @override_settings(QUERY_BUDGET_MODE="log")
+    def test_log_mode_warns(self):
+        with mock.patch.object(PlayersByHitsAPIView, "query_budget", 0):
+            with self.assertLogs("baseball", "WARNING") as logs, mock.patch.object(
+                budgets, "check", wraps=budgets.check
+            ) as check:
+                response = self.client.get("/api/baseball/players/by-hits/")
+        self.assertEqual(response.status_code, 200)
+        self.assertIn("ran 3 queries, budget is 0", logs.output[0])
+        # Only counted: the queries themselves aren't kept
+        log = check.call_args.args[1]
+        self.assertEqual((len(log), log.queries), (3, []))
+
+    @override_settings(QUERY_BUDGET_MODE="log", DEBUG=True)
+    def test_log_mode_lists_repeated_queries_in_debug(self):
+        with mock.patch.object(PlayersByHitsAPIView, "query_budget", 0):
+            with self.assertLogs("baseball", "WARNING") as logs:
+                self.client.get("/api/baseball/players/by-hits/")
+        self.assertIn("repeated: [", logs.output[0])
+
+    def test_repeated_reports_n_plus_one(self):
+        with budgets.track() as log:
+            for player in self.players:
+                Player.objects.get(pk=player.pk)
+            list(Player.objects.filter(pk__in=[p.pk for p in self.players[:2]]))
+            list(Player.objects.filter(pk__in=[p.pk for p in self.players]))
+        repeated = budgets.repeated(log.queries)
+        self.assertEqual([n for n, _ in repeated], [5, 2])
+        self.assertIn("IN (%s, ...)", repeated[1][1])
+
+
+@override_settings(QUERY_BUDGET_MODE="raise")
+class CommittedQueryBudgetTests(TransactionTestCase):
+    """Budgets of requests whose transactions really commit."""
+
+    def setUp(self):
+        caches["players"].clear()
+        cache.clear()
+        self.player = Player.objects.create(
+            name="Player", position="C", games=100, hits=50
+        )
+        self.url = f"/api/baseball/players/{self.player.pk}/update/"
+        data = {f: None for f in PlayerUpdateSerializer.Meta.fields}
+        data.update(position="SS", games=101, hits=52)
+        self.body = json.dumps(data)
+
+    def put(self, client=None):
+        return (client or self.client).put(
+            self.url, data=self.body, content_type="application/json"
+        )
+
+    def test_commit_and_on_commit_work_stay_out_of_the_count(self):
+        response = self.put()
+        self.assertEqual(response.status_code, 200)
+        # Published by the on_commit callback, within the request
+        self.assertEqual(
+            caches["players"].get("version:players"), versioning.get_version()
+        )
+        with FakeCompletionServer():
+            response = self.client.get(
+                f"/api/baseball/players/{self.player.pk}/description/"
+            )
+        self.assertEqual(response.json()["source"], "llm")
+
+    @mock.patch.object(rankings, "QUERIES_PER_GROUP", 0)
+    @mock.patch.object(PlayerUpdateAPIView, "query_budget", 0)
+    def test_overrun_after_commit_keeps_the_response(self):
+        with self.assertRaises(budgets.QueryBudgetExceeded):
+            self.put()
+        self.player.refresh_from_db()
+        self.assertEqual(self.player.hits, 52)
+        response = self.put(Client(raise_request_exception=False))
+        self.assertEqual(response.status_code, 200)
+
+
+class TransactionScopeTests(TestCase):
+    def setUp(self):
+        caches["players"].clear()
+        cache.clear()
+        self.player = Player.objects.create(
+            name="A", position="SS", games=100, hits=100
+        )
+        Player.objects.create(name="B", position="SS", games=200, hits=300)
+
+    def test_reads_run_outside_a_transaction(self):
+        outside = len(connection.atomic_blocks)
+        depth = []
+        build = PlayersByHitsAPIView._build_page
+
+        def spy(view, *args):
+            depth.append(len(connection.atomic_blocks))
+            return build(view, *args)
+
+        with mock.patch.object(PlayersByHitsAPIView, "_build_page", spy):
+            self.client.get("/api/baseball/players/by-hits/")
+        self.assertEqual(depth, [outside])
+
+    def test_failed_update_is_rolled_back(self):
+        with mock.patch.object(
+            rankings, "refresh_player", side_effect=RuntimeError("boom")
+        ):
+            with self.assertRaises(RuntimeError):
+                self.client.put(
+                    f"/api/baseball/players/{self.player.pk}/update/",
+                    data=json.dumps({"position": "SS", "games": 100, "hits": 150}),
+                    content_type="application/json",
+                )
+        self.assertEqual(Player.objects.get(pk=self.player.pk).hits, 100)
+
+    def test_description_releases_connection_for_llm_call(self):
+        with mock.patch("baseball.views._release_connection") as release:
+            with FakeCompletionServer():
+                response = self.client.get(
+                    f"/api/baseball/players/{self.player.pk}/description/"
+                )
+                cached = self.client.get(
+                    f"/api/baseball/players/{self.player.pk}/description/"
+                )
+        self.assertEqual(response.json()["source"], "llm")
+        self.assertEqual(cached.json()["source"], "cache")
+        release.assert_called_once()
+
+
+class ReplicaRoutingTests(TestCase):
+    """A second SQLite database stands in for a replica that lags behind."""
+
+    @classmethod
+    def setUpClass(cls):
+        cls.tmp = tempfile.TemporaryDirectory()
+        connections.settings["replica"] = connections.configure_settings(
+            {
+                "default": connections.settings["default"],
+                "replica": {
+                    "ENGINE": "django.db.backends.sqlite3",
+                    "NAME": os.path.join(cls.tmp.name, "replica.sqlite3"),
+                },
+            }
+        )["replica"]
+        call_command("migrate", database="replica", verbosity=0)
+        # Set here rather than on the class: the test runner sets up and
+        # checks the databases tests declare before the alias exists
+        cls.databases = {"default", "replica"}
+        super().setUpClass()
+
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        connections["replica"].close()
+        del connections["replica"]
+        del connections.settings["replica"]
+        cls.tmp.cleanup()
+
+    def setUp(self):
+        caches["players"].clear()
+        cache.clear()
+        self.player = Player.objects.create(
+            name="A", position="SS", games=100, hits=100
+        )
+        Player.objects.create(name="B", position="SS", games=200, hits=300)
+        # The replica still has an older copy of A
+        Player.objects.using("replica").create(
+            pk=self.player.pk, name="A (replica)", position="SS", games=100, hits=90
+        )
+        replicas = override_settings(DATABASE_REPLICAS=["replica"])
+        replicas.enable()
+        self.addCleanup(replicas.disable)
+
+    def names(self):
+        response = self.client.get("/api/baseball/players/by-hits/")
+        return [p["name"] for p in response.json()["players"]]
+
+    def test_list_and_leaderboard_read_from_replica(self):
+        self.assertEqual(self.names(), ["A (replica)"])
+        response = self.client.get("/api/baseball/players/leaderboard/")
+        self.assertEqual(
+            [p["name"] for p in response.json()["players"]], ["A (replica)"]
+        )
+
+    def test_description_reads_player_from_replica(self):
+        with mock.patch("baseball.views._llm_breaker.aallow", return_value=False):
+            response = self.client.get(
+                f"/api/baseball/players/{self.player.pk}/description/"
+            )
+        self.assertTrue(response.json()["description"].startswith("A (replica) "))
+
+    def test_other_views_read_from_primary(self):
+        response = self.client.get(f"/api/baseball/players/{self.player.pk}/")
+        self.assertEqual(response.json()["name"], "A")
+
+    def test_client_reads_its_writes_after_update(self):
+        response = self.client.put(
+            f"/api/baseball/players/{self.player.pk}/update/",
+            data=json.dumps({"position": "SS", "games": 100, "hits": 150}),
+            content_type="application/json",
+        )
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(Player.objects.using("replica").get().hits, 90)
+        self.assertIn(routers.PIN_COOKIE, response.cookies)
+
+        self.assertEqual(self.names(), ["B", "A"])
+        # Other clients, and this one once the pin expires, use the replica
+        self.client.cookies.clear()
+        self.assertEqual(self.names(), ["A (replica)"])
+
+    def test_reads_without_a_request_use_primary(self):
+        router = routers.PrimaryReplicaRouter()
+        self.assertEqual(router.db_for_read(Player), "default")
+        with routers.routed() as state:
+            routers.use_replica(state)
+            self.assertEqual(router.db_for_read(Player), "replica")
+            self.assertEqual(router.db_for_write(Player), "default")
+            # Read-your-writes within the request
+            self.assertEqual(router.db_for_read(Player), "default")
+
+
+class ConnectionPoolTests(TestCase):
+    def test_pool_checks_connections_before_handing_them_out(self):
+        from django.db.backends.postgresql.base import DatabaseWrapper
+        from psycopg_pool import ConnectionPool
+
+        from baseball_app.settings import DB_POOL_OPTIONS, _database
+
+        settings_dict = connections.configure_settings(
+            {
+                "default": {
+                    **_database("db"),
+                    "CONN_MAX_AGE": 0,
+                    "OPTIONS": {"pool": dict(DB_POOL_OPTIONS)},
+                }
+            }
+        )["default"]
+        wrapper = DatabaseWrapper(settings_dict, alias="pool_test")
+        try:
+            # Built unopened, so no server is needed
+            self.assertIs(wrapper.pool._check, ConnectionPool.check_connection)
+        finally:
+            wrapper.close_pool()
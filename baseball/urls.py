@@ -1,13 +1,51 @@
 from django.urls import path
-from .views import PlayersByHitsAPIView, PlayerDescriptionAPIView, PlayerUpdateAPIView
+from .views import (
+    MetricsView,
+    PlayersByHitsAPIView,
+    PlayerCacheStatsAPIView,
+    PlayerDetailAPIView,
+    PlayerExportAPIView,
+    PlayerLeaderboardAPIView,
+    PlayerLimitsAPIView,
+    PlayerRankingsAPIView,
+    PlayerSearchAPIView,
+    PlayerDescriptionAPIView,
+    PlayerUpdateAPIView,
+    PlayerBulkUpdateAPIView,
+)
 
 urlpatterns = [
+    path("metrics/", MetricsView.as_view(), name="metrics"),
     path("players/by-hits/", PlayersByHitsAPIView.as_view(), name="players-by-hits"),
+    path(
+        "players/leaderboard/",
+        PlayerLeaderboardAPIView.as_view(),
+        name="players-leaderboard",
+    ),
+    path(
+        "players/bulk-update/",
+        PlayerBulkUpdateAPIView.as_view(),
+        name="players-bulk-update",
+    ),
+    path("players/search/", PlayerSearchAPIView.as_view(), name="players-search"),
+    path("players/limits/", PlayerLimitsAPIView.as_view(), name="players-limits"),
+    path("players/export/", PlayerExportAPIView.as_view(), name="players-export"),
+    path(
+        "players/cache-stats/",
+        PlayerCacheStatsAPIView.as_view(),
+        name="players-cache-stats",
+    ),
+    path("players/<int:pk>/", PlayerDetailAPIView.as_view(), name="player-detail"),
     path(
         "players/<int:pk>/description/",
         PlayerDescriptionAPIView.as_view(),
         name="player-description",
     ),
+    path(
+        "players/<int:pk>/rankings/",
+        PlayerRankingsAPIView.as_view(),
+        name="player-rankings",
+    ),
     path(
         "players/<int:pk>/update/", PlayerUpdateAPIView.as_view(), name="player-update"
     ),
@@ -0,0 +1,106 @@
+"""Data version counters, see ``DataVersion``.
+
+The database row is authoritative. ``current_version`` serves it from the
+``players`` cache alias: a write publishes the new value to the cache once
+its transaction commits, and cached values expire after
+``PLAYER_CACHE_VERSION_TTL`` seconds so workers with a process-local cache
+pick up other workers' writes within that window.
+"""
+
+import zlib
+from datetime import datetime, timedelta, timezone
+
+from django.conf import settings
+from django.core.cache import caches
+from django.db.models import F
+from django.utils.http import parse_etags
+
+from . import budgets, routers
+from .models import DataVersion
+
+PLAYERS = "players"
+_EPOCH = datetime(1970, 1, 1, tzinfo=timezone.utc)
+
+
+def _version_key(name):
+    return f"version:{name}"
+
+
+def get_version(name: str = PLAYERS) -> int:
+    version = (
+        DataVersion.objects.filter(name=name).values_list("version", flat=True).first()
+    )
+    return version or 0
+
+
+def current_version(name: str = PLAYERS) -> int:
+    """Version as seen through the cache; falls back to the database.
+
+    Requests reading from a replica read it there instead: the cache may
+    already hold a version the replica hasn't caught up with, and pages
+    built from the replica would be cached under it.
+    """
+    if routers.reading_from_replica():
+        versions = routers.current().versions
+        if name not in versions:
+            versions[name] = get_version(name)
+        return versions[name]
+    cache = caches["players"]
+    version = cache.get(_version_key(name))
+    if version is None:
+        version = get_version(name)
+        cache.add(
+            _version_key(name), version, timeout=settings.PLAYER_CACHE_VERSION_TTL
+        )
+    return version
+
+
+def _publish_version(name):
+    caches["players"].set(
+        _version_key(name),
+        get_version(name),
+        timeout=settings.PLAYER_CACHE_VERSION_TTL,
+    )
+
+
+def bump_version(name: str = PLAYERS) -> None:
+    """Increment the version; runs inside the caller's transaction if any."""
+    if not DataVersion.objects.filter(name=name).update(version=F("version") + 1):
+        _, created = DataVersion.objects.get_or_create(
+            name=name, defaults={"version": 1}
+        )
+        if not created:
+            # Lost a creation race; still count this write
+            DataVersion.objects.filter(name=name).update(version=F("version") + 1)
+    # Readers must not see the new version before the data behind it
+    budgets.on_commit(lambda: _publish_version(name))
+
+
+def players_etag(request, *args, **kwargs) -> str:
+    """Strong ETag for player list responses: data version plus the query."""
+    query = request.META.get("QUERY_STRING", "")
+    return f'"players-{current_version(PLAYERS)}-{zlib.crc32(query.encode()):08x}"'
+
+
+def player_etag(player) -> str:
+    """Strong ETag for one player row, derived from ``updated_at``.
+
+    Every write path (``save()``, the bulk update view, ``load_players``)
+    moves ``updated_at``, so the tag changes whenever the row does.
+    """
+    micros = (player.updated_at - _EPOCH) // timedelta(microseconds=1)
+    return f'"player-{player.pk}-{micros}"'
+
+
+def if_match(request, player) -> bool:
+    """Whether ``request``'s ``If-Match`` precondition holds for ``player``.
+
+    A request without the header passes. ``W/`` is ignored: the tag is
+    only weakened by the compression middleware, for a content-coding of
+    the same representation, so it still identifies this version.
+    """
+    header = request.headers.get("If-Match")
+    if header is None:
+        return True
+    etags = [etag.removeprefix("W/") for etag in parse_etags(header)]
+    return "*" in etags or player_etag(player) in etags
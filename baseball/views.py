@@ -1,12 +1,46 @@
 from .models import Player
+import asyncio
 import os
+import time
 import requests
 import logging
 from datetime import date
+from decimal import Decimal
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.core.handlers.wsgi import WSGIRequest
+from django.db import connections, transaction
+from django.http import HttpResponse, JsonResponse, StreamingHttpResponse
+from django.utils import timezone
+from django.utils.cache import patch_cache_control
+from django.utils.decorators import method_decorator
+from django.views.decorators.http import condition
+from django.views import View
 from rest_framework.views import APIView
 from rest_framework.response import Response
 from rest_framework import status
-from .serializers import PlayerSerializer, PlayerUpdateSerializer
+from . import (
+    aio,
+    budgets,
+    descriptions,
+    export,
+    leaderboard,
+    limits,
+    metrics,
+    rankings,
+    response_cache,
+    search,
+)
+from .breaker import CircuitBreaker
+from .log import Truncated
+from .metrics import span
+from .pagination import HitsKeysetPagination
+from .serializers import (
+    FastPlayerSerializer,
+    PlayerSerializer,
+    PlayerUpdateSerializer,
+)
+from .versioning import bump_version, if_match, player_etag, players_etag
 
 logger = logging.getLogger("baseball")
 
@@ -41,15 +75,14 @@ def _build_prompt(player: Player) -> str:
     return prompt
 
 
-def _call_openai(prompt: str) -> str:
-    """Call OpenAI ChatCompletion API (gpt-4.1) if OPENAI_API_KEY is set. Returns the generated text or raises on error."""
+def _openai_request(prompt: str):
+    """Build the headers and payload for a ChatCompletion request."""
     api_key = os.environ.get("OPENAI_API_KEY")
     if not api_key:
         raise RuntimeError("OpenAI API key not configured")
     else:
-        logger.info(f"API Key loaded correctly!")
+        logger.debug("API Key loaded correctly!")
 
-    url = "https://api.openai.com/v1/chat/completions"
     headers = {
         "Authorization": f"Bearer {api_key}",
         "Content-Type": "application/json",
@@ -66,24 +99,67 @@ def _call_openai(prompt: str) -> str:
         "max_tokens": 150,
         "temperature": 0.7,
     }
-    logger.info(f"OpenAI payload: {payload}")
-    resp = requests.post(url, json=payload, headers=headers, timeout=15)
-    logger.info(f"OpenAI raw response: {resp.text}")
-    resp.raise_for_status()
-    data = resp.json()
+    logger.info(
+        "OpenAI payload: %s", Truncated(payload), extra={"event": "openai.payload"}
+    )
+    return headers, payload
+
+
+def _parse_openai_response(data) -> str:
     # Extract assistant reply
     if "choices" not in data or not data["choices"]:
-        logger.error(f"OpenAI error or empty choices: {data}")
+        logger.error(
+            "OpenAI error or empty choices: %s",
+            Truncated(data),
+            extra={"event": "openai.error"},
+        )
         raise RuntimeError(f"OpenAI error or empty choices: {data}")
     try:
         llm_output = data["choices"][0]["message"]["content"]
-        logger.info(f"LLM output: {llm_output}")
+        logger.info(
+            "LLM output: %s", Truncated(llm_output), extra={"event": "llm.output"}
+        )
         return llm_output
     except Exception as e:
-        logger.error(f"Exception parsing OpenAI response: {e}, data: {data}")
+        logger.error(
+            "Exception parsing OpenAI response: %s, data: %s",
+            e,
+            Truncated(data),
+            extra={"event": "openai.error"},
+        )
         raise RuntimeError(f"Invalid response from OpenAI: {e}, data: {data}")
 
 
+def _call_openai(prompt: str) -> str:
+    """Call OpenAI ChatCompletion API (gpt-4.1) if OPENAI_API_KEY is set. Returns the generated text or raises on error."""
+    headers, payload = _openai_request(prompt)
+    resp = requests.post(
+        settings.OPENAI_API_URL, json=payload, headers=headers, timeout=15
+    )
+    logger.info(
+        "OpenAI raw response: %s",
+        Truncated(lambda: resp.text),
+        extra={"event": "openai.response"},
+    )
+    resp.raise_for_status()
+    return _parse_openai_response(resp.json())
+
+
+async def _acall_openai(prompt: str) -> str:
+    """Async ``_call_openai`` over the shared pooled HTTP client."""
+    headers, payload = _openai_request(prompt)
+    resp = await aio.get_client().post(
+        settings.OPENAI_API_URL, json=payload, headers=headers
+    )
+    logger.info(
+        "OpenAI raw response: %s",
+        Truncated(lambda: resp.text),
+        extra={"event": "openai.response"},
+    )
+    resp.raise_for_status()
+    return _parse_openai_response(resp.json())
+
+
 def _fallback_description(player: Player) -> str:
     """Generate a simple description from stats without calling an LLM."""
     parts = []
@@ -101,54 +177,552 @@ def _fallback_description(player: Player) -> str:
     return " ".join(parts)
 
 
+@method_decorator(condition(etag_func=players_etag), name="get")
 class PlayersByHitsAPIView(APIView):
+    """Players ordered by hits, one keyset page at a time.
+
+    Query params: ``limit`` (page size), ``cursor`` (from the previous page's
+    ``next`` link) and ``fields`` (comma-separated projection).
+
+    Serialized pages are cached per query and data version. Responses carry
+    an ETag derived from the same version, so a matching ``If-None-Match``
+    gets a 304 without touching the table.
+    """
+
+    pagination_class = HitsKeysetPagination
+    # Serialize through FastPlayerSerializer instead of PlayerSerializer
+    use_fast_serializer = True
+    # Data version and the page, plus the start of the players without hits
+    # on the page where they begin; a cached page needs none
+    query_budget = 3
+    # Read players from a replica when there are any, see routers
+    replica_reads = True
+
     def get(self, request):
-        qs = Player.objects.all().order_by("-hits")
-        data = PlayerSerializer(qs, many=True).data
+        try:
+            fields = PlayerSerializer.parse_fields(request.query_params.get("fields"))
+            data = response_cache.get_or_build(
+                "list",
+                request.META.get("QUERY_STRING", ""),
+                lambda: self._build_page(request, fields),
+            )
+        except ValueError as e:
+            return Response({"error": str(e)}, status=status.HTTP_400_BAD_REQUEST)
         # DRF's Response handles JSON by default
-        return Response({"players": data}, status=status.HTTP_200_OK)
+        response = Response(data, status=status.HTTP_200_OK)
+        # Let browsers keep the body but revalidate it every time
+        patch_cache_control(response, no_cache=True)
+        return response
+
+    def _build_page(self, request, fields):
+        if self.use_fast_serializer:
+            return self._build_page_fast(request, fields)
+        qs = Player.objects.all()
+        if fields is not None:
+            # hits is needed to build the next cursor even if not returned
+            qs = qs.only(*fields, "hits")
 
+        paginator = self.pagination_class()
+        page = paginator.paginate_queryset(qs, request)
+        with span("serialize"):
+            data = PlayerSerializer(page, many=True, fields=fields).data
+        return paginator.get_paginated_data({"players": data})
+
+    def _build_page_fast(self, request, fields):
+        # Floats rather than Decimals, so the renderer needs no callbacks
+        serializer = FastPlayerSerializer(fields, extra=["hits"], json_safe=True)
+        hits_idx = serializer.columns.index("hits")
+        id_idx = serializer.columns.index("id")
+
+        paginator = self.pagination_class(
+            position_of=lambda row: (row[hits_idx], row[id_idx])
+        )
+        rows = paginator.paginate_queryset(
+            serializer.values(Player.objects.all()), request
+        )
+        with span("serialize"):
+            players = serializer.many(rows)
+        return paginator.get_paginated_data({"players": players})
+
+
+@method_decorator(condition(etag_func=players_etag), name="get")
+class PlayerLeaderboardAPIView(APIView):
+    """Top-N players by any stat, sorted and filtered in the database.
+
+    Query params: ``stat`` (default ``hits``), ``order`` (``desc``/``asc``),
+    ``limit`` (default 10, max 100), ``position``, ``min_<stat>`` /
+    ``max_<stat>`` ranges and ``fields``. Players with no value for ``stat``
+    are left out. Cached and ETag-ed like the list endpoint.
+    """
+
+    replica_reads = True
+
+    def get(self, request):
+        try:
+            fields = PlayerSerializer.parse_fields(request.query_params.get("fields"))
+            data = response_cache.get_or_build(
+                "leaderboard",
+                request.META.get("QUERY_STRING", ""),
+                lambda: self._build(request, fields),
+            )
+        except ValueError as e:
+            return Response({"error": str(e)}, status=status.HTTP_400_BAD_REQUEST)
+        response = Response(data, status=status.HTTP_200_OK)
+        patch_cache_control(response, no_cache=True)
+        return response
+
+    @staticmethod
+    def _build(request, fields):
+        qs = leaderboard.leaderboard_queryset(request.query_params)
+        serializer = FastPlayerSerializer(fields, json_safe=True)
+        rows = list(serializer.values(qs))
+        with span("serialize"):
+            players = serializer.many(rows)
+        return {"stat": request.query_params.get("stat", "hits"), "players": players}
+
+
+@method_decorator(condition(etag_func=players_etag), name="get")
+class PlayerSearchAPIView(APIView):
+    """Search players by name.
+
+    Query params: ``q``, ``mode`` (``prefix`` for typeahead, the default,
+    or ``fuzzy``), ``limit`` (default 10, max 50) and ``fields``. Results
+    are ranked best first and carry a ``score`` between 0 and 1.
+    """
+
+    def get(self, request):
+        params = request.query_params
+        try:
+            fields = PlayerSerializer.parse_fields(params.get("fields"))
+            mode = params.get("mode", "prefix")
+            if mode not in search.MODES:
+                raise ValueError(f"mode must be one of: {', '.join(search.MODES)}")
+            try:
+                limit = int(params.get("limit", search.DEFAULT_LIMIT))
+            except ValueError:
+                raise ValueError("limit must be an integer")
+            if limit < 1:
+                raise ValueError("limit must be positive")
+            limit = min(limit, search.MAX_LIMIT)
+            data = response_cache.get_or_build(
+                "search",
+                request.META.get("QUERY_STRING", ""),
+                lambda: self._build(params.get("q", ""), mode, limit, fields),
+            )
+        except ValueError as e:
+            return Response({"error": str(e)}, status=status.HTTP_400_BAD_REQUEST)
+        response = Response(data, status=status.HTTP_200_OK)
+        patch_cache_control(response, no_cache=True)
+        return response
+
+    @staticmethod
+    def _build(query, mode, limit, fields):
+        matches = search.search(query, mode=mode, limit=limit)
+        serializer = FastPlayerSerializer(fields, json_safe=True)
+        rows = list(
+            serializer.values(Player.objects.filter(pk__in=[pk for pk, _ in matches]))
+        )
+        with span("serialize"):
+            by_id = {row["id"]: row for row in serializer.many(rows)}
+        return {
+            "query": query,
+            "players": [
+                {**by_id[pk], "score": score} for pk, score in matches if pk in by_id
+            ],
+        }
+
+
+class PlayerDetailAPIView(APIView):
+    """One player. The ``ETag`` header is the precondition for updates."""
+
+    def get(self, request, pk: int):
+        built = response_cache.get_or_build(
+            "player", str(pk), lambda: self._build_player(pk)
+        )
+        if built is None:
+            return Response(
+                {"error": "Player not found"}, status=status.HTTP_404_NOT_FOUND
+            )
+        data, etag = built
+        response = Response(data, status=status.HTTP_200_OK)
+        response["ETag"] = etag
+        return response
+
+    @staticmethod
+    def _build_player(pk):
+        player = Player.objects.filter(pk=pk).first()
+        if player is None:
+            return None
+        with span("serialize"):
+            data = PlayerSerializer(player).data
+        return data, player_etag(player)
+
+
+class PlayerRankingsAPIView(APIView):
+    """A player's rank and percentile for every stat, overall and at their position.
+
+    Served from the precomputed ``PlayerRank`` table (see
+    ``baseball/rankings.py``).
+    """
 
-class PlayerDescriptionAPIView(APIView):
     def get(self, request, pk: int):
+        data = response_cache.get_or_build("rankings", str(pk), lambda: self._build(pk))
+        if data is None:
+            return Response(
+                {"error": "Player not found"}, status=status.HTTP_404_NOT_FOUND
+            )
+        return Response(data, status=status.HTTP_200_OK)
+
+    @staticmethod
+    def _build(pk):
+        position = Player.objects.filter(pk=pk).values_list("position").first()
+        if position is None:
+            return None
+        return {"id": pk, "position": position[0], **rankings.player_ranks(pk)}
+
+
+@method_decorator(condition(etag_func=players_etag), name="get")
+class PlayerLimitsAPIView(APIView):
+    """Allowed range of each editable numeric field, as enforced by the update view.
+
+    ``observed`` has the min and max currently in the table, as a hint (see
+    ``baseball/limits.py``); ``null`` when no player has a value.
+    """
+
+    def get(self, request):
+        enforced = PlayerUpdateSerializer.get_limits()
+        observed = PlayerUpdateSerializer.get_observed()
+        data = {
+            "int_fields": {},
+            "float_fields": {},
+            "observed": {f: self._numbers(b) for f, b in observed.items()},
+        }
+        for field, bounds in enforced.items():
+            group = (
+                "float_fields"
+                if field in PlayerSerializer.DECIMAL_FIELDS
+                else "int_fields"
+            )
+            data[group][field] = self._numbers(bounds)
+        response = Response(data, status=status.HTTP_200_OK)
+        patch_cache_control(response, no_cache=True)
+        return response
+
+    @staticmethod
+    def _numbers(bounds):
+        # Decimals as floats, so the renderer needs no callback
+        return [float(b) if isinstance(b, Decimal) else b for b in bounds]
+
+
+class MetricsView(View):
+    """Request metrics of this process in the Prometheus text format."""
+
+    def get(self, request):
+        return HttpResponse(
+            metrics.render(), content_type="text/plain; version=0.0.4; charset=utf-8"
+        )
+
+
+class PlayerCacheStatsAPIView(APIView):
+    def get(self, request):
+        return Response(response_cache.stats(), status=status.HTTP_200_OK)
+
+
+@method_decorator(condition(etag_func=players_etag), name="get")
+class PlayerExportAPIView(APIView):
+    """Stream the whole player table as NDJSON (default) or a JSON array.
+
+    Query params: ``output`` (``ndjson`` or ``json``) and ``fields``
+    (comma-separated projection). Served over ASGI, the body is an async
+    iterator, see ``export``.
+    """
+
+    chunk_size = 2000
+
+    def get(self, request):
+        output = request.query_params.get("output", "ndjson")
+        if output not in export.STREAMERS:
+            return Response(
+                {"error": f"output must be one of: {', '.join(export.STREAMERS)}"},
+                status=status.HTTP_400_BAD_REQUEST,
+            )
         try:
-            player = Player.objects.get(pk=pk)
+            fields = PlayerSerializer.parse_fields(request.query_params.get("fields"))
+        except ValueError as e:
+            return Response({"error": str(e)}, status=status.HTTP_400_BAD_REQUEST)
+        fields = fields or export.EXPORT_FIELDS
+
+        rows = export.iter_rows(fields, chunk_size=self.chunk_size)
+        chunks = export.STREAMERS[output](rows, fields)
+        if not isinstance(request._request, WSGIRequest):
+            chunks = export.aiter_chunks(chunks)
+        response = StreamingHttpResponse(
+            chunks, content_type=export.CONTENT_TYPES[output]
+        )
+        patch_cache_control(response, no_cache=True)
+        return response
+
+
+_description_flights = aio.SingleFlight()
+_llm_breaker = CircuitBreaker("llm", **settings.LLM_BREAKER)
+
+
+def _release_connection():
+    """Close this thread's connections unless a transaction needs them.
+
+    The next query opens a new one (or takes one from the pool).
+    """
+    for conn in connections.all(initialized_only=True):
+        if not conn.in_atomic_block:
+            conn.close()
+
+
+async def _agenerate_description(player: Player, prompt: str, ticket) -> str:
+    started = time.monotonic()
+    try:
+        with span("llm"):
+            text = await _acall_openai(prompt)
+    except Exception:
+        await _llm_breaker.arecord_failure(ticket)
+        raise
+    await _llm_breaker.arecord_success(time.monotonic() - started, ticket)
+    await descriptions.astore(player, prompt, text)
+    logger.info(
+        "LLM used for player description: id=%s, name=%s, date=%s",
+        player.pk,
+        player.name,
+        date.today(),
+        extra={"event": "llm.used"},
+    )
+    return text
+
+
+class PlayerDescriptionAPIView(View):
+    """Async player description.
+
+    The LLM call goes through a shared keep-alive client, and concurrent
+    requests for the same player and prompt share one upstream call. A
+    circuit breaker skips the LLM while it is failing or slow, and a request
+    never waits longer than ``DESCRIPTION_LATENCY_BUDGET`` for it (the call
+    itself carries on and caches its result). ``source`` in the response is
+    ``cache``, ``llm`` or ``fallback``.
+    """
+
+    # Player, cached text, and storing new text (stale delete, lookup, insert)
+    query_budget = 5
+    replica_reads = True
+
+    async def get(self, request, pk: int):
+        try:
+            return await self._describe(pk)
+        finally:
+            if isinstance(request, WSGIRequest):
+                # This event loop ends with the request, see aio
+                await aio.close_client()
+
+    async def _describe(self, pk: int):
+        try:
+            player = await Player.objects.aget(pk=pk)
         except Player.DoesNotExist:
-            return Response(
+            return JsonResponse(
                 {"error": "Player not found"}, status=status.HTTP_404_NOT_FOUND
             )
 
         prompt = _build_prompt(player)
         try:
-            try:
-                text = _call_openai(prompt)
-                logger.info(
-                    f"LLM used for player description: id={player.pk}, name={player.name}, date={date.today()}"
-                )
-            except Exception:
-                text = _fallback_description(player)
+            source = "cache"
+            text = await descriptions.aget_cached(player.pk, prompt)
+            if text is None:
+                source = "fallback"
+                text = await self._generate(player, prompt)
+                if text is None:
+                    text = _fallback_description(player)
+                else:
+                    source = "llm"
         except Exception as e:
-            return Response(
+            return JsonResponse(
                 {"error": str(e)}, status=status.HTTP_500_INTERNAL_SERVER_ERROR
             )
 
-        return Response(
-            {"id": player.pk, "description": text}, status=status.HTTP_200_OK
+        return JsonResponse(
+            {"id": player.pk, "description": text, "source": source},
+            status=status.HTTP_200_OK,
         )
 
+    async def _generate(self, player: Player, prompt: str):
+        """Return LLM text, or None when the breaker or budget rules it out."""
+        ticket = await _llm_breaker.aallow()
+        if not ticket:
+            return None
+        # Don't hold a database connection while waiting on the LLM
+        await sync_to_async(_release_connection)()
+        try:
+            return await asyncio.wait_for(
+                _description_flights.do(
+                    (player.pk, descriptions.prompt_hash(prompt)),
+                    lambda: _agenerate_description(player, prompt, ticket),
+                ),
+                timeout=settings.DESCRIPTION_LATENCY_BUDGET,
+            )
+        except Exception:
+            return None
+
 
 class PlayerUpdateAPIView(APIView):
+    """Replace a player's editable fields.
+
+    Send the ``ETag`` from the player detail endpoint as ``If-Match`` to
+    make the update conditional; a stale tag gets ``412``. Either way the
+    write is a single ``UPDATE ... WHERE updated_at = <value read>`` of the
+    changed columns only, so a concurrent write between the read and the
+    update is also answered with ``412`` instead of being overwritten.
+    """
+
+    # Read, update, version bump, description invalidation; rank updates
+    # allow for a few more per group they move in
+    query_budget = 4
+
     def put(self, request, pk: int):
-        try:
-            player = Player.objects.get(pk=pk)
-        except Player.DoesNotExist:
+        player = Player.objects.filter(pk=pk).first()
+        if player is None:
             return Response(
                 {"error": "Player not found"}, status=status.HTTP_404_NOT_FOUND
             )
+        if not if_match(request, player):
+            return self._conflict()
         serializer = PlayerUpdateSerializer(player, data=request.data, partial=False)
-        if serializer.is_valid():
-            serializer.save()
-            return Response({"success": True}, status=status.HTTP_200_OK)
+        if not serializer.is_valid():
+            return Response(
+                {"errors": serializer.errors}, status=status.HTTP_400_BAD_REQUEST
+            )
+
+        changed = {
+            attr: val
+            for attr, val in serializer.validated_data.items()
+            if getattr(player, attr) != val
+        }
+        if changed:
+            prompt_before = _build_prompt(player)
+            ranked_before = rankings.snapshot(player)
+            read_at = player.updated_at
+            for attr, val in changed.items():
+                setattr(player, attr, val)
+            player.update_stats_hash()
+            player.updated_at = timezone.now()
+            with transaction.atomic():
+                written = Player.objects.filter(pk=pk, updated_at=read_at).update(
+                    **changed,
+                    stats_hash=player.stats_hash,
+                    updated_at=player.updated_at,
+                )
+                if not written:
+                    return self._conflict()
+                # A queryset update doesn't send post_save
+                bump_version()
+                if _build_prompt(player) != prompt_before:
+                    descriptions.invalidate(player.pk)
+                limits.widen(changed)
+                moved = rankings.refresh_player(player, ranked_before)
+                budgets.allow(rankings.query_allowance(moved))
+
+        response = Response({"success": True}, status=status.HTTP_200_OK)
+        response["ETag"] = player_etag(player)
+        return response
+
+    @staticmethod
+    def _conflict():
+        return Response(
+            {"error": "Player was changed by another request; reload and retry"},
+            status=status.HTTP_412_PRECONDITION_FAILED,
+        )
+
+
+class PlayerBulkUpdateAPIView(APIView):
+    """Update many players in one request.
+
+    The body is a list of ``{"id": ..., <field>: <value>, ...}`` objects;
+    fields are validated with the same rules as ``PlayerUpdateAPIView``
+    (only the ones given are changed). All targets are loaded with one
+    query and written with one ``bulk_update`` over the columns that
+    actually changed. Invalid items are reported in ``errors`` (with their
+    index in the list) and don't stop the valid ones.
+    """
+
+    max_items = 1000
+    # Lookup (two on SQLite for 1000 ids), update, version (created on first
+    # use), descriptions, and rank maintenance: locking the groups, deleting
+    # and writing the players' rows, re-ranking and saving totals. The same
+    # whatever the number of items; bulk_update() and bulk_create() split in
+    # batches are allowed for
+    query_budget = 14
+
+    def patch(self, request):
+        items = request.data
+        if not isinstance(items, list):
+            return Response(
+                {"error": "Expected a list of players"},
+                status=status.HTTP_400_BAD_REQUEST,
+            )
+        if len(items) > self.max_items:
+            return Response(
+                {"error": f"At most {self.max_items} players per request"},
+                status=status.HTTP_400_BAD_REQUEST,
+            )
+
+        errors, valid = [], {}
+        for index, item in enumerate(items):
+            pk = item.get("id") if isinstance(item, dict) else None
+            if not isinstance(pk, int) or isinstance(pk, bool):
+                errors.append(
+                    {"index": index, "errors": {"id": ["A valid integer is required."]}}
+                )
+                continue
+            if pk in valid:
+                errors.append(
+                    {"index": index, "id": pk, "errors": {"id": ["Duplicate id."]}}
+                )
+                continue
+            fields = {k: v for k, v in item.items() if k != "id"}
+            serializer = PlayerUpdateSerializer(data=fields, partial=True)
+            if not serializer.is_valid():
+                errors.append({"index": index, "id": pk, "errors": serializer.errors})
+                continue
+            valid[pk] = (index, serializer.validated_data)
+
+        players = Player.objects.in_bulk(list(valid))
+        changed, diffs, columns, before = [], [], set(), {}
+        for pk, (index, data) in valid.items():
+            player = players.get(pk)
+            if player is None:
+                errors.append(
+                    {"index": index, "id": pk, "errors": {"id": ["Player not found."]}}
+                )
+                continue
+            diff = {k: v for k, v in data.items() if getattr(player, k) != v}
+            if not diff:
+                continue
+            before[pk] = rankings.snapshot(player)
+            for attr, val in diff.items():
+                setattr(player, attr, val)
+            player.update_stats_hash()
+            player.updated_at = timezone.now()
+            columns.update(diff)
+            diffs.append(diff)
+            changed.append(player)
+
+        if changed:
+            with transaction.atomic():
+                fields = [*sorted(columns), "stats_hash", "updated_at"]
+                Player.objects.bulk_update(changed, fields)
+                budgets.allow_batches(Player, changed, ["pk", "pk", *fields])
+                # bulk_update doesn't send post_save
+                bump_version()
+                descriptions.invalidate(*(p.pk for p in changed))
+                limits.widen(*diffs)
+                rankings.refresh_players((p, before[p.pk]) for p in changed)
+
+        errors.sort(key=lambda e: e["index"])
         return Response(
-            {"errors": serializer.errors}, status=status.HTTP_400_BAD_REQUEST
+            {"updated": [p.pk for p in changed], "errors": errors},
+            status=status.HTTP_200_OK,
         )
@@ -12,6 +12,7 @@ https://docs.djangoproject.com/en/5.2/ref/settings/
 
 from pathlib import Path
 import os
+import sys
 from dotenv import load_dotenv
 
 # Build paths inside the project like this: BASE_DIR / 'subdir'.
@@ -45,6 +46,8 @@ INSTALLED_APPS = [
     "django.contrib.sessions",
     "django.contrib.messages",
     "django.contrib.staticfiles",
+    # OpClass in index definitions (the name search index)
+    "django.contrib.postgres",
     # Local apps
     "baseball",
     # Third-party
@@ -52,7 +55,16 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    # Request latency metrics and Server-Timing; first, so it times the rest
+    "baseball.middleware.TimingMiddleware",
+    # Per-view query budgets (QUERY_BUDGET_MODE below)
+    "baseball.middleware.QueryBudgetMiddleware",
+    # Read-replica routing for views with replica_reads (see DATABASE_REPLICAS)
+    "baseball.middleware.ReplicaRoutingMiddleware",
     "django.middleware.security.SecurityMiddleware",
+    # gzip/brotli response compression; must come before anything that
+    # reads or writes the response body
+    "baseball.middleware.CompressionMiddleware",
     "django.contrib.sessions.middleware.SessionMiddleware",
     # Local simple CORS middleware (development only)
     "baseball.middleware.SimpleCORSMiddleware",
@@ -86,19 +98,62 @@ WSGI_APPLICATION = "baseball_app.wsgi.application"
 # Database
 # https://docs.djangoproject.com/en/5.2/ref/settings/#databases
 
-DATABASES = {
-    "default": {
+# psycopg3 connection pool per worker process. The pool checks connections
+# before handing them out (see CONN_HEALTH_CHECKS below); a pooled
+# connection goes back to the pool when a request ends instead of staying
+# open (CONN_MAX_AGE). DB_POOL=0 turns the pool off and keeps persistent
+# connections instead.
+DB_POOL = os.environ.get("DB_POOL", "1") != "0"
+DB_POOL_OPTIONS = {
+    "min_size": int(os.environ.get("DB_POOL_MIN_SIZE", 2)),
+    "max_size": int(os.environ.get("DB_POOL_MAX_SIZE", 10)),
+    # Seconds an idle connection above min_size is kept
+    "max_idle": float(os.environ.get("DB_POOL_MAX_IDLE", 300)),
+    # Seconds a request waits for a free connection before failing
+    "timeout": float(os.environ.get("DB_POOL_TIMEOUT", 10)),
+}
+
+
+def _database(host):
+    return {
         "ENGINE": "django.db.backends.postgresql",
         "NAME": os.environ.get("DB_NAME", "baseball_db"),
         "USER": os.environ.get("DB_USER", "baseball_user"),
         "PASSWORD": os.environ.get("DB_PASSWORD", "baseball_pass"),
-        "HOST": os.environ.get("DB_HOST", "db"),
+        "HOST": host,
         "PORT": os.environ.get("DB_PORT", 5432),
-        # optional connection tuning
-        "CONN_MAX_AGE": int(os.environ.get("DB_CONN_MAX_AGE", 600)),
-        "ATOMIC_REQUESTS": True,
+        # Pooling and persistent connections are mutually exclusive
+        "CONN_MAX_AGE": 0 if DB_POOL else int(os.environ.get("DB_CONN_MAX_AGE", 600)),
+        # With the pool, Django skips its own check and instead builds the
+        # pool with check=ConnectionPool.check_connection; setting "check"
+        # in the pool options as well is a TypeError
+        "CONN_HEALTH_CHECKS": True,
+        "OPTIONS": {"pool": dict(DB_POOL_OPTIONS)} if DB_POOL else {},
+        # Requests run in autocommit; views that write open their own
+        # transaction.atomic() blocks
+        "ATOMIC_REQUESTS": False,
     }
-}
+
+
+DATABASES = {"default": _database(os.environ.get("DB_HOST", "db"))}
+
+# Read replicas: comma-separated hosts sharing the primary's credentials,
+# e.g. DB_REPLICA_HOSTS=replica1,replica2. Reads of the list, leaderboard
+# and description views go to them (see baseball/routers.py).
+for _i, _host in enumerate(
+    filter(None, os.environ.get("DB_REPLICA_HOSTS", "").split(",")), 1
+):
+    DATABASES[f"replica{_i}"] = {
+        **_database(_host.strip()),
+        # Tests run against the primary's test database
+        "TEST": {"MIRROR": "default"},
+    }
+DATABASE_REPLICAS = [alias for alias in DATABASES if alias != "default"]
+DATABASE_ROUTERS = ["baseball.routers.PrimaryReplicaRouter"]
+
+# Seconds a client reads from the primary after a write, so it sees its own
+# changes while replicas catch up
+REPLICA_STICKY_SECONDS = int(os.environ.get("DB_REPLICA_STICKY_SECONDS", 5))
 
 
 # Password validation
@@ -151,21 +206,103 @@ CORS_ALLOWED_ORIGINS = [
 
 REST_FRAMEWORK = {
     "DEFAULT_RENDERER_CLASSES": [
-        "rest_framework.renderers.JSONRenderer",
+        # orjson-backed when orjson is installed, stock JSONRenderer otherwise
+        "baseball.renderers.FastJSONRenderer",
     ],
     "DEFAULT_PARSER_CLASSES": [
         "rest_framework.parsers.JSONParser",
     ],
 }
 
+# Chat completion endpoint used for player descriptions
+OPENAI_API_URL = os.environ.get(
+    "OPENAI_API_URL", "https://api.openai.com/v1/chat/completions"
+)
+
+# Longest a description request waits on the LLM before falling back (seconds)
+DESCRIPTION_LATENCY_BUDGET = float(os.environ.get("DESCRIPTION_LATENCY_BUDGET", 5))
+
+# Circuit breaker around the LLM call, see baseball/breaker.py
+LLM_BREAKER = {
+    "failure_rate": 0.5,
+    "min_calls": 5,
+    "window": 60,
+    "slow_call": 5.0,
+    "open_seconds": 30,
+}
+
+# Local memory by default; point at memcached/redis to share state (such as
+# the LLM circuit breaker) across workers.
+LOCMEM_CACHE = "django.core.cache.backends.locmem.LocMemCache"
+PLAYER_CACHE_BACKEND = os.environ.get("PLAYER_CACHE_BACKEND", LOCMEM_CACHE)
+CACHES = {
+    "default": {
+        "BACKEND": os.environ.get("CACHE_BACKEND", LOCMEM_CACHE),
+        "LOCATION": os.environ.get("CACHE_LOCATION", ""),
+    },
+    # Serialized player payloads (baseball/response_cache.py). Entries expire
+    # after TIMEOUT seconds; locmem evicts least recently used entries beyond
+    # MAX_ENTRIES, for redis configure maxmemory-policy allkeys-lru.
+    "players": {
+        "BACKEND": PLAYER_CACHE_BACKEND,
+        "LOCATION": os.environ.get("PLAYER_CACHE_LOCATION", "players"),
+        "TIMEOUT": int(os.environ.get("PLAYER_CACHE_TTL", 300)),
+        "OPTIONS": (
+            {"MAX_ENTRIES": int(os.environ.get("PLAYER_CACHE_MAX_ENTRIES", 1000))}
+            if PLAYER_CACHE_BACKEND == LOCMEM_CACHE
+            else {}
+        ),
+    },
+}
+
+# How long a cached players data version is trusted before re-reading it
+# from the database. Writes publish the new version immediately to the cache,
+# so this only bounds staleness across workers with a process-local cache.
+PLAYER_CACHE_VERSION_TTL = float(os.environ.get("PLAYER_CACHE_VERSION_TTL", 2))
+
+# Share of requests (0-1) broken down into DB/serialize/render/LLM time
+# for the Server-Timing header and /metrics/ phase totals. Latency
+# histograms cover every request regardless.
+REQUEST_TIMING_SAMPLE_RATE = float(
+    os.environ.get("REQUEST_TIMING_SAMPLE_RATE", 1.0 if DEBUG else 0.0)
+)
+
+# What happens when a view runs more queries than its query_budget:
+# "raise" (fails the test hitting the view; the default under
+# "manage.py test"), "log" or "off". No mode changes the response.
+QUERY_BUDGET_MODE = os.environ.get(
+    "QUERY_BUDGET_MODE", "raise" if sys.argv[1:2] == ["test"] else "log"
+)
+
+# Description pipeline logging: max chars of payloads/bodies per record, and
+# the share of records kept per event type (unlisted events are all kept;
+# warnings and errors are never sampled out).
+DESCRIPTION_LOG_MAX_BODY = int(os.environ.get("DESCRIPTION_LOG_MAX_BODY", 500))
+DESCRIPTION_LOG_SAMPLING = {
+    "openai.payload": 0.01,
+    "openai.response": 0.01,
+    "llm.output": 0.1,
+    "llm.used": 1.0,
+}
+
 LOGGING = {
     "version": 1,
     "disable_existing_loggers": False,
+    "filters": {
+        "description_sampling": {
+            "()": "baseball.log.SampledEventFilter",
+            "rates": DESCRIPTION_LOG_SAMPLING,
+        },
+    },
     "formatters": {
         "verbose": {
             "format": "[{asctime}] {levelname} {name}: {message}",
             "style": "{",
         },
+        "structured": {
+            "format": "[{asctime}] {levelname} {name} event={event}: {message}",
+            "style": "{",
+        },
         "simple": {
             "format": "{levelname} {message}",
             "style": "{",
@@ -176,6 +313,11 @@ LOGGING = {
             "class": "logging.StreamHandler",
             "formatter": "verbose",
         },
+        # Writes happen on a background thread, off the request path
+        "queued_console": {
+            "class": "baseball.log.QueuedStreamHandler",
+            "formatter": "structured",
+        },
     },
     "root": {
         "handlers": ["console"],
@@ -183,7 +325,8 @@ LOGGING = {
     },
     "loggers": {
         "baseball": {
-            "handlers": ["console"],
+            "handlers": ["queued_console"],
+            "filters": ["description_sampling"],
             "level": "INFO",
             "propagate": False,
         },
@@ -18,19 +18,33 @@ export default function App() {
   const [editError, setEditError] = useState(null);
   const [editLoading, setEditLoading] = useState(false);
   const [sortField, setSortField] = useState('hits');
+  // Per-field [min, max] bounds enforced by the update endpoint, and the
+  // range currently in the table (`observed`), shown as a hint
+  const [limits, setLimits] = useState({ int_fields: {}, float_fields: {}, observed: {} });
+  // ETag of the player being edited, sent back as If-Match
+  const [editEtag, setEditEtag] = useState(null);
 
   useEffect(() => {
     let mounted = true;
     setLoading(true);
-    fetch(apiUrl)
-      .then((res) => {
+    // The list endpoint is cursor-paginated; follow `next` links until exhausted.
+    const fetchAll = async () => {
+      const all = [];
+      let url = apiUrl;
+      while (url && mounted) {
+        const res = await fetch(url);
         if (!res.ok) throw new Error(`HTTP ${res.status}`);
-        return res.json();
-      })
-      .then((data) => {
-        if (!mounted) return;
+        const data = await res.json();
         const list = data.players ?? data;
-        setPlayers(Array.isArray(list) ? list : []);
+        if (Array.isArray(list)) all.push(...list);
+        url = data.next;
+      }
+      return all;
+    };
+    fetchAll()
+      .then((list) => {
+        if (!mounted) return;
+        setPlayers(list);
       })
       .catch((err) => {
         if (!mounted) return;
@@ -46,6 +60,35 @@ export default function App() {
     };
   }, []);
 
+  // Observed bounds follow the data, so refetch them whenever an edit form is opened.
+  useEffect(() => {
+    if (!editPlayerId) return;
+    let mounted = true;
+    setEditEtag(null);
+    fetch(`/api/baseball/players/${editPlayerId}/`)
+      .then((res) => {
+        if (mounted && res.ok) setEditEtag(res.headers.get('ETag'));
+      })
+      .catch(() => {});
+    fetch('/api/baseball/players/limits/')
+      .then((res) => (res.ok ? res.json() : Promise.reject(new Error(`HTTP ${res.status}`))))
+      .then((data) => {
+        if (mounted) setLimits(data);
+      })
+      .catch((err) => {
+        if (mounted) setEditError(`Could not load field limits: ${err.message}`);
+      });
+    return () => {
+      mounted = false;
+    };
+  }, [editPlayerId]);
+
+  const observedHint = (field) => {
+    const [low, high] = limits.observed?.[field] ?? [];
+    if (low == null) return null;
+    return <small className="hint"> (in table: {low}–{high})</small>;
+  };
+
   const fetchDescription = async (player) => {
     if (!player?.id) return;
     // Close edit modal if open
@@ -108,26 +151,6 @@ export default function App() {
   };
 
   const positionOptions = ["LF", "RF", "CF", "1B", "2B", "3B", "SS", "C", "DH", "P"];
-  // Define min/max constants for each field based on dataset
-  const intFields = {
-    games: [0, 3500],
-    at_bat: [0, 14053],
-    hits: [0, 4256],
-    doubles: [8, 746],
-    triples: [4, 177],
-    home_runs: [117, 762],
-    rbi: [418, 2499],
-    walks: [183, 2558],
-    strikeouts: [183, 2597],
-    stolen_bases: [1, 808],
-    caught_stealing: [0, 149],
-  };
-  const floatFields = {
-    batting_average: [0.231, 0.43],
-    slugging_percentage: [0.34, 0.69],
-    on_base_plus_slugging: [0.671, 1.164],
-  };
-
   const handleEditSave = async () => {
     setEditLoading(true);
     setEditError(null);
@@ -135,10 +158,18 @@ export default function App() {
     try {
       const res = await fetch(`/api/baseball/players/${editPlayerId}/update/`, {
         method: 'PUT',
-        headers: { 'Content-Type': 'application/json' },
+        headers: {
+          'Content-Type': 'application/json',
+          ...(editEtag ? { 'If-Match': editEtag } : {}),
+        },
         body: JSON.stringify(body),
       });
       const data = await res.json();
+      if (res.status === 412) {
+        setEditError('This player was changed elsewhere. Reload the page and try again.');
+        setEditLoading(false);
+        return;
+      }
       if (!res.ok) {
         setEditError(data.errors ? Object.values(data.errors).join(' | ') : (data.error || 'Unknown error'));
         setEditLoading(false);
@@ -209,14 +240,14 @@ export default function App() {
                 </select>
               </label>
             </div>
-            {Object.entries(intFields).map(([field, [min, max]]) => (
+            {Object.entries(limits.int_fields).map(([field, [min, max]]) => (
               <div key={field}>
-                <label>{field.replace(/_/g, ' ').toUpperCase()}: <input type="number" name={field} value={editForm[field]} min={min} max={max} onChange={handleEditChange} required /></label>
+                <label>{field.replace(/_/g, ' ').toUpperCase()}: <input type="number" name={field} value={editForm[field]} min={min ?? undefined} max={max ?? undefined} onChange={handleEditChange} required />{observedHint(field)}</label>
               </div>
             ))}
-            {Object.entries(floatFields).map(([field, [min, max]]) => (
+            {Object.entries(limits.float_fields).map(([field, [min, max]]) => (
               <div key={field}>
-                <label>{field.replace(/_/g, ' ').toUpperCase()}: <input type="number" name={field} value={editForm[field]} min={min} max={max} step="0.001" onChange={handleEditChange} required /></label>
+                <label>{field.replace(/_/g, ' ').toUpperCase()}: <input type="number" name={field} value={editForm[field]} min={min ?? undefined} max={max ?? undefined} step="0.001" onChange={handleEditChange} required />{observedHint(field)}</label>
               </div>
             ))}
             {editError && <div className="error">{editError}</div>}